@@ -17,6 +17,10 @@
 
 * :mod:`mpnum.special`: Optimized versions of some routines for special cases
 
+* :mod:`mpnum.blocksparse`: Block-sparse local tensors for abelian symmetries
+
+* :mod:`mpnum.batched`: Batches of MPAs with the same shape and ranks
+
 * :mod:`mpnum.povm`: Matrix product representation of Positive operator valued
   measures (POVM)
 
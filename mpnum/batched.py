@@ -0,0 +1,301 @@
+# encoding: utf-8
+"""Batches of MPAs with the same shape and ranks
+
+Ensembles of states (e.g. trajectories or random samples) often consist of
+many MPAs with identical physical shape and ranks. For small ranks,
+looping over them in Python is dominated by the overhead of many tiny
+BLAS calls. A :class:`BatchedMPArray` stacks the local tensors of all
+MPAs along an additional leading batch axis, i.e. the local tensors have
+the legs ``(batch, left virtual, physical..., right virtual)``. All
+operations then use batched ``np.matmul``, ``np.linalg.svd`` and
+``np.linalg.qr`` on the whole stack.
+
+:func:`dot`, :func:`inner`, :func:`norm`,
+:func:`BatchedMPArray.canonicalize` and :func:`BatchedMPArray.compress`
+are available. :func:`dot` and :func:`inner` also accept an
+:class:`~mpnum.mparray.MPArray` in place of a batch, which is then
+combined with each member of the other batch.
+
+>>> import mpnum.factory as factory
+>>> rng = np.random.RandomState(seed=42)
+>>> mpas = [factory.random_mpa(4, 2, 3, randstate=rng) for _ in range(5)]
+>>> batch = BatchedMPArray.from_mpas(mpas)
+>>> batch.batchsize, batch.ranks
+(5, (2, 3, 2))
+>>> np.allclose(norm(batch), [mp.norm(mpa) for mpa in mpas])
+True
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from six.moves import range, zip
+
+from . import mparray as mp
+
+__all__ = ['BatchedMPArray', 'dot', 'inner', 'norm']
+
+
+class BatchedMPArray(object):
+    """Batch of MPAs whose local tensors carry a leading batch axis
+
+    The local tensors of member ``i`` are ``[lt[i] for lt in self.lt]``.
+
+    .. automethod:: __init__
+
+    """
+
+    def __init__(self, ltens):
+        """
+        :param ltens: List of local tensors with legs ``(batch, left
+            virtual, physical..., right virtual)``
+
+        """
+        self.lt = list(ltens)
+        assert all(lten.shape[0] == self.lt[0].shape[0] for lten in self.lt), \
+            'Batch sizes do not match'
+        for lten, rten in zip(self.lt[:-1], self.lt[1:]):
+            assert lten.shape[-1] == rten.shape[1], 'Virtual legs do not match'
+
+    @classmethod
+    def from_mpas(cls, mpas):
+        """Stack MPAs with the same shape and ranks
+
+        :param mpas: Iterator over :class:`~mpnum.mparray.MPArray`
+
+        """
+        mpas = list(mpas)
+        if not all(mpa.shape == mpas[0].shape and mpa.ranks == mpas[0].ranks
+                   for mpa in mpas):
+            raise ValueError('All MPAs must have the same shape and ranks')
+        return cls([np.stack(ltens)
+                    for ltens in zip(*(mpa.lt for mpa in mpas))])
+
+    def to_mpas(self):
+        """Return the members of the batch as list of
+        :class:`~mpnum.mparray.MPArray`"""
+        return [self[i] for i in range(self.batchsize)]
+
+    def __getitem__(self, index):
+        """Return member ``index`` of the batch as
+        :class:`~mpnum.mparray.MPArray`"""
+        return mp.MPArray([lten[index] for lten in self.lt])
+
+    def __len__(self):
+        return len(self.lt)
+
+    @property
+    def batchsize(self):
+        """Number of MPAs in the batch"""
+        return self.lt[0].shape[0]
+
+    @property
+    def ranks(self):
+        """Tuple of ranks, i.e. the dimensions of the virtual legs"""
+        return tuple(lten.shape[-1] for lten in self.lt[:-1])
+
+    @property
+    def shape(self):
+        """Tuple of physical dimensions of each member"""
+        return tuple(lten.shape[2:-1] for lten in self.lt)
+
+    @property
+    def ndims(self):
+        """Tuple of the number of physical legs on each site"""
+        return tuple(lten.ndim - 3 for lten in self.lt)
+
+    @property
+    def dtype(self):
+        """Data type of the local tensors"""
+        return np.result_type(*self.lt)
+
+    def copy(self):
+        """Returns a deep copy"""
+        return type(self)([lten.copy() for lten in self.lt])
+
+    def conj(self):
+        """Complex conjugate of all members"""
+        return type(self)([lten.conj() for lten in self.lt])
+
+    def canonicalize(self, left=None, right=None):
+        """Brings all members to canonical form in place with batched QR
+        decompositions
+
+        See :func:`mpnum.mparray.MPArray.canonicalize` for the parameters
+        and the exceptions raised. In contrast to
+        :class:`~mpnum.mparray.MPArray`, the canonical form is not
+        tracked: The members are always treated as not canonical, so all
+        requested sites are normalized again, and without arguments, all
+        but the last site are left-normalized.
+
+        """
+        if left is None and right is None:
+            left = 'afull'
+        left = {None: 0, 'afull': len(self) - 1}.get(left, left)
+        right = {None: len(self), 'afull': 1}.get(right, right)
+        left, right = (left + len(self) if left < 0 else left,
+                       right + len(self) if right < 0 else right)
+        if not 0 <= left <= len(self):
+            raise IndexError('len={!r}, left={!r}'.format(len(self), left))
+        if not 0 <= right <= len(self):
+            raise IndexError('len={!r}, right={!r}'.format(len(self), right))
+        if not left < right:
+            raise ValueError("Canonicalization {}:{} invalid"
+                             .format(left, right))
+
+        for site in range(left):
+            lten = self.lt[site]
+            q, r = _qr(lten.reshape((lten.shape[0], -1, lten.shape[-1])))
+            self.lt[site] = q.reshape(lten.shape[:-1] + (-1,))
+            self.lt[site + 1] = _matdot_right(r, self.lt[site + 1])
+        for site in range(len(self) - 1, right - 1, -1):
+            lten = self.lt[site]
+            q, r = _qr(np.swapaxes(lten.reshape(lten.shape[:2] + (-1,)), 1, 2))
+            self.lt[site] = np.swapaxes(q, 1, 2) \
+                .reshape((lten.shape[0], -1) + lten.shape[2:])
+            self.lt[site - 1] = _matdot_left(self.lt[site - 1],
+                                             np.swapaxes(r, 1, 2))
+
+    def compress(self, rank=None, relerr=None, return_truncerr=False):
+        """Compresses all members in place by batched SVD truncation
+
+        All members must keep the same ranks. With ``relerr``, the rank on
+        each bond is the largest rank required by any member, so no member
+        is truncated more than :func:`mpnum.mparray.MPArray.compress`
+        would truncate it. The result is left-canonical.
+
+        :param rank: Maximal rank of the result (default: ``None``)
+        :param relerr: Maximal fraction of discarded singular values,
+            see :func:`mpnum.mparray.MPArray.compress`
+        :param return_truncerr: If ``True``, also return an array of
+            shape ``(batchsize, len(self) - 1)`` with the weight discarded
+            on each bond (default: ``False``)
+        :returns: Array with the overlap :math:`\\langle u \\vert c
+            \\rangle` of each member, see
+            :func:`mpnum.mparray.MPArray.compress`
+
+        """
+        assert (relerr is None) or (0. <= relerr <= 1.), \
+            "relerr={} not allowed".format(relerr)
+        if len(self) == 1:
+            overlap = norm(self)**2
+            truncerrs = np.zeros((self.batchsize, 0))
+            return (overlap, truncerrs) if return_truncerr else overlap
+
+        self.canonicalize(right=1)
+        truncerrs = []
+        for site in range(len(self) - 1):
+            lten = self.lt[site]
+            mat = lten.reshape((lten.shape[0], -1, lten.shape[-1]))
+            u, sv, v = np.linalg.svd(mat, full_matrices=False)
+            rank_t = sv.shape[-1] if rank is None else min(sv.shape[-1], rank)
+            if relerr is not None:
+                svsum = np.cumsum(sv, axis=-1) / np.sum(sv, axis=-1)[:, None]
+                rank_relerr = np.sum(svsum < 1 - relerr, axis=-1) + 1
+                rank_t = min(rank_t, max(rank_relerr))
+
+            truncerrs.append(np.maximum(
+                np.sum(np.abs(mat)**2, axis=(1, 2))
+                - np.sum(sv[:, :rank_t]**2, axis=1), 0.0))
+            self.lt[site] = u[..., :rank_t] \
+                .reshape(lten.shape[:-1] + (rank_t,))
+            self.lt[site + 1] = _matdot_right(
+                sv[:, :rank_t, None] * v[:, :rank_t], self.lt[site + 1])
+
+        lten = self.lt[-1]
+        overlap = np.sum(np.abs(lten)**2, axis=tuple(range(1, lten.ndim)))
+        if return_truncerr:
+            return overlap, np.stack(truncerrs, axis=1)
+        return overlap
+
+
+def _qr(a):
+    """Reduced QR decomposition of a stack of matrices"""
+    try:
+        # Stacked matrices are supported since NumPy 1.22
+        return np.linalg.qr(a)
+    except np.linalg.LinAlgError:
+        q, r = zip(*(np.linalg.qr(mat) for mat in a))
+        return np.stack(q), np.stack(r)
+
+
+def _matdot_right(mat, ltens):
+    """Contract a stack of matrices with the left virtual leg of batched
+    local tensors"""
+    result = np.matmul(mat, ltens.reshape(ltens.shape[:2] + (-1,)))
+    return result.reshape(result.shape[:2] + ltens.shape[2:])
+
+
+def _matdot_left(ltens, mat):
+    """Contract the right virtual leg of batched local tensors with a stack
+    of matrices"""
+    result = np.matmul(ltens.reshape((ltens.shape[0], -1, ltens.shape[-1])),
+                       mat)
+    return result.reshape(ltens.shape[:-1] + (-1,))
+
+
+def _batch_ltens(mpa):
+    """Local tensors of ``mpa`` with a batch axis, which has length one
+    for an :class:`~mpnum.mparray.MPArray`"""
+    if isinstance(mpa, BatchedMPArray):
+        return mpa.lt
+    return [lten[None] for lten in mpa.lt]
+
+
+def dot(mpa1, mpa2):
+    """Contraction of the last physical leg of ``mpa1`` with the first
+    physical leg of ``mpa2`` for each member of the batch
+
+    Same as :func:`mpnum.mparray.dot` with the default ``axes``. One of
+    the arguments may be an :class:`~mpnum.mparray.MPArray`, which is then
+    multiplied with each member of the other argument.
+
+    """
+    assert len(mpa1) == len(mpa2)
+    ltens = []
+    for lt1, lt2 in zip(_batch_ltens(mpa1), _batch_ltens(mpa2)):
+        n1, n2 = lt1.ndim - 4, lt2.ndim - 4
+        mat1 = np.moveaxis(lt1, -2, -1)
+        mat1 = mat1.reshape((lt1.shape[0], -1, lt1.shape[-2]))
+        mat2 = np.moveaxis(lt2, 2, 1)
+        mat2 = mat2.reshape(lt2.shape[:1] + (lt2.shape[2], -1))
+        lten = np.matmul(mat1, mat2)
+        # Legs: batch, left 1, phys 1 (except last), right 1, left 2, phys
+        # 2 (except first), right 2
+        lten = lten.reshape(lten.shape[:1] + lt1.shape[1:-2] + lt1.shape[-1:]
+                            + lt2.shape[1:2] + lt2.shape[3:])
+        axes = ([0, 1, n1 + 3] + list(range(2, n1 + 2))
+                + list(range(n1 + 4, n1 + n2 + 4)) + [n1 + 2, n1 + n2 + 4])
+        lten = lten.transpose(axes)
+        ltens.append(lten.reshape(
+            (lten.shape[0], lten.shape[1] * lten.shape[2]) + lten.shape[3:-2]
+            + (lten.shape[-2] * lten.shape[-1],)))
+    return BatchedMPArray(ltens)
+
+
+def inner(mpa1, mpa2):
+    """Inner product :math:`\\langle \\mathrm{mpa1} \\vert \\mathrm{mpa2}
+    \\rangle` of each member of the batch
+
+    Same as :func:`mpnum.mparray.inner`. One of the arguments may be an
+    :class:`~mpnum.mparray.MPArray`.
+
+    :returns: Array of length ``batchsize``
+
+    """
+    assert len(mpa1) == len(mpa2)
+    # Axes: batch, bond of mpa1, bond of mpa2
+    lvec = np.ones((1, 1, 1))
+    for lt1, lt2 in zip(_batch_ltens(mpa1), _batch_ltens(mpa2)):
+        # Axes: batch, bond of mpa1 & physical legs, bond of mpa2
+        lvec = np.matmul(lvec, lt2.reshape(lt2.shape[:2] + (-1,)))
+        lvec = lvec.reshape((lvec.shape[0], -1, lt2.shape[-1]))
+        mat1 = lt1.conj().reshape((lt1.shape[0], -1, lt1.shape[-1]))
+        lvec = np.matmul(np.swapaxes(mat1, 1, 2), lvec)
+    return lvec[:, 0, 0]
+
+
+def norm(mpa):
+    """Frobenius norm of each member, see :func:`mpnum.mparray.norm`"""
+    return np.sqrt(abs(inner(mpa, mpa)))
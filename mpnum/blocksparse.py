@@ -0,0 +1,575 @@
+# encoding: utf-8
+"""Block-sparse local tensors for abelian symmetries
+
+For models which conserve an abelian quantum number (e.g. the particle
+number, :math:`U(1)`, or a parity, :math:`\\mathbb Z_n`), most entries of
+the local tensors of an MPS or MPO vanish for structural reasons. This
+module stores only the blocks which are allowed by the symmetry.
+
+Each leg of a :class:`BlockSparseTensor` is a :class:`Leg`, which carries
+a charge label for each of its indices and a flow direction (``+1`` for
+incoming, ``-1`` for outgoing legs). A block is allowed if the sum of the
+charges of its legs, weighted by the flows, equals the charge of the
+tensor (modulo ``n`` for :math:`\\mathbb Z_n`).
+
+The local tensors of a :class:`BlockSparseMPArray` have the same leg order
+as the local tensors of an :class:`~mpnum.mparray.MPArray`. The flows are
+``+1`` on the left virtual leg, ``-1`` on the right virtual leg and
+``(+1,)`` (MPS) or ``(+1, -1)`` (MPO) on the physical legs. The local
+tensors have charge zero; the total charge of the represented tensor is
+the label of the rightmost (dummy) virtual leg.
+
+:func:`dot`, :func:`inner`, :func:`norm`,
+:func:`BlockSparseMPArray.canonicalize` and
+:func:`BlockSparseMPArray.compress` operate block by block.
+:func:`mpnum.linalg.eig` accepts a :class:`BlockSparseMPArray` MPO and
+solves the local eigenvalue problems block by block within the charge
+sector of the start vector (e.g. from :func:`product_state`).
+
+>>> labels = [0, 1]  # Particle number of a single site
+>>> psi = np.zeros((2,) * 4)
+>>> psi[0, 0, 1, 1] = psi[0, 1, 0, 1] = psi[1, 1, 0, 0] = 1 / np.sqrt(3)
+>>> mps = from_array(psi, labels, charge=2)
+>>> mps.ranks
+(2, 4, 2)
+>>> truncerrs = mps.compress(relerr=1e-10)
+>>> mps.ranks
+(2, 3, 2)
+>>> round(norm(mps), 6)
+1.0
+>>> np.allclose(mps.to_mparray().to_array(), psi)
+True
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import itertools as it
+
+import numpy as np
+from six.moves import range, zip
+
+from . import mparray as mp
+
+__all__ = ['Leg', 'BlockSparseTensor', 'tensordot', 'fuse', 'split',
+           'BlockSparseMPArray', 'from_array', 'product_state', 'dot',
+           'inner', 'norm']
+
+
+class Leg(object):
+    """Tensor leg with a charge label on each of its indices"""
+
+    def __init__(self, labels, flow=1):
+        """
+        :param labels: Charge label of each index of the leg
+        :param flow: ``+1`` for incoming and ``-1`` for outgoing legs
+
+        """
+        assert flow in (1, -1), 'flow={!r}'.format(flow)
+        self.labels = np.asarray(labels, dtype=int).ravel()
+        self.flow = flow
+        self.charges = tuple(np.unique(self.labels))
+        self._indices = {q: np.flatnonzero(self.labels == q)
+                         for q in self.charges}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return 'Leg({!r}, flow={})'.format(self.labels.tolist(), self.flow)
+
+    def indices(self, charge):
+        """Indices of the leg with the label ``charge``"""
+        return self._indices.get(charge, np.zeros(0, dtype=int))
+
+    def dim(self, charge):
+        """Number of indices with the label ``charge``"""
+        return len(self.indices(charge))
+
+    def dual(self):
+        """The same leg with the opposite flow"""
+        return Leg(self.labels, -self.flow)
+
+    def contractible(self, other):
+        """Whether ``self`` can be contracted with ``other``"""
+        return self.flow == -other.flow and \
+            np.array_equal(self.labels, other.labels)
+
+
+def _reduce(charge, modulus):
+    return charge if modulus is None else charge % modulus
+
+
+class BlockSparseTensor(object):
+    """Tensor which stores only the blocks allowed by an abelian symmetry
+
+    The blocks are stored in the dictionary :attr:`blocks`. Its keys are
+    tuples containing one charge for each leg; the corresponding value
+    has the shape ``tuple(leg.dim(q) for leg, q in zip(legs, key))``.
+    Missing blocks are zero.
+
+    .. automethod:: __init__
+
+    """
+
+    def __init__(self, legs, blocks, modulus=None, charge=0):
+        """
+        :param legs: List of :class:`Leg`
+        :param blocks: Dictionary mapping tuples of charges to arrays
+        :param modulus: ``n`` for a :math:`\\mathbb Z_n` symmetry or
+            ``None`` for :math:`U(1)` (default: ``None``)
+        :param charge: Total charge of the tensor (default: 0)
+
+        """
+        self.legs = list(legs)
+        self.modulus = modulus
+        self.charge = _reduce(charge, modulus)
+        self.blocks = dict(blocks)
+        for key, block in self.blocks.items():
+            assert self.allowed(key), 'Block {!r} not allowed'.format(key)
+            assert block.shape == tuple(leg.dim(q) for leg, q in
+                                        zip(self.legs, key)), \
+                'Block {!r} has shape {!r}'.format(key, block.shape)
+
+    @classmethod
+    def from_dense(cls, array, legs, modulus=None, charge=0):
+        """Extract the allowed blocks from a dense array
+
+        :param np.ndarray array: Dense array
+        :param legs: One :class:`Leg` for each axis of ``array``
+        :param modulus: See :func:`__init__`
+        :param charge: See :func:`__init__`
+        :raises ValueError: If ``array`` has non-zero entries outside
+            of the allowed blocks
+
+        """
+        assert array.shape == tuple(len(leg) for leg in legs), \
+            '{!r} does not match the legs'.format(array.shape)
+        result = cls(legs, {}, modulus, charge)
+        for key in it.product(*(leg.charges for leg in legs)):
+            if result.allowed(key):
+                result.blocks[key] = array[result._index(key)]
+        if not np.allclose(result.to_dense(), array):
+            raise ValueError('array does not conserve the charge {!r}'
+                             .format(charge))
+        return result
+
+    def allowed(self, key):
+        """Whether the block ``key`` is allowed by the symmetry"""
+        total = sum(leg.flow * q for leg, q in zip(self.legs, key))
+        return _reduce(total - self.charge, self.modulus) == 0
+
+    def _index(self, key):
+        return np.ix_(*(leg.indices(q) for leg, q in zip(self.legs, key)))
+
+    @property
+    def shape(self):
+        return tuple(len(leg) for leg in self.legs)
+
+    @property
+    def ndim(self):
+        return len(self.legs)
+
+    @property
+    def dtype(self):
+        return np.result_type(*self.blocks.values()) if self.blocks \
+            else np.float_
+
+    @property
+    def size(self):
+        """Number of stored entries"""
+        return sum(block.size for block in self.blocks.values())
+
+    def to_dense(self):
+        """Return the tensor as dense array"""
+        result = np.zeros(self.shape, dtype=self.dtype)
+        for key, block in self.blocks.items():
+            result[self._index(key)] = block
+        return result
+
+    def copy(self):
+        """Returns a deep copy"""
+        blocks = {key: block.copy() for key, block in self.blocks.items()}
+        return type(self)(self.legs, blocks, self.modulus, self.charge)
+
+    def conj(self):
+        """Complex conjugate; reverses the flows of all legs"""
+        blocks = {key: block.conj() for key, block in self.blocks.items()}
+        return type(self)([leg.dual() for leg in self.legs], blocks,
+                          self.modulus, -self.charge)
+
+    def transpose(self, axes):
+        """Permute the legs"""
+        blocks = {tuple(key[i] for i in axes): block.transpose(axes)
+                  for key, block in self.blocks.items()}
+        return type(self)([self.legs[i] for i in axes], blocks,
+                          self.modulus, self.charge)
+
+    def __mul__(self, fact):
+        if not np.isscalar(fact):
+            return NotImplemented
+        blocks = {key: fact * block for key, block in self.blocks.items()}
+        return type(self)(self.legs, blocks, self.modulus, self.charge)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor):
+        return self * (1 / divisor)
+
+    __div__ = __truediv__
+
+
+def tensordot(a, b, axes):
+    """Block-wise :func:`numpy.tensordot` of two :class:`BlockSparseTensor`
+
+    :param axes: Pair of sequences of axes of ``a`` and ``b`` to contract
+    :returns: :class:`BlockSparseTensor` with the remaining legs of ``a``
+        followed by the remaining legs of ``b``
+
+    """
+    axes_a, axes_b = ([ax % t.ndim for ax in ax_list]
+                      for t, ax_list in zip((a, b), axes))
+    if a.modulus != b.modulus:
+        raise ValueError('Cannot contract tensors with moduli {!r} and {!r}'
+                         .format(a.modulus, b.modulus))
+    for ax_a, ax_b in zip(axes_a, axes_b):
+        if not a.legs[ax_a].contractible(b.legs[ax_b]):
+            raise ValueError('Cannot contract leg {} with leg {}'
+                             .format(ax_a, ax_b))
+    free_a = [i for i in range(a.ndim) if i not in axes_a]
+    free_b = [i for i in range(b.ndim) if i not in axes_b]
+
+    blocks_b = {}
+    for key, block in b.blocks.items():
+        ckey = tuple(key[i] for i in axes_b)
+        blocks_b.setdefault(ckey, []).append((key, block))
+
+    blocks = {}
+    for key_a, block_a in a.blocks.items():
+        ckey = tuple(key_a[i] for i in axes_a)
+        for key_b, block_b in blocks_b.get(ckey, ()):
+            key = tuple(key_a[i] for i in free_a) + \
+                tuple(key_b[i] for i in free_b)
+            block = np.tensordot(block_a, block_b, axes=(axes_a, axes_b))
+            if key in blocks:
+                blocks[key] = blocks[key] + block
+            else:
+                blocks[key] = block
+
+    legs = [a.legs[i] for i in free_a] + [b.legs[i] for i in free_b]
+    return BlockSparseTensor(legs, blocks, a.modulus, a.charge + b.charge)
+
+
+def fuse(t, axis):
+    """Combine the legs ``axis`` and ``axis + 1`` into one leg
+
+    The index of the new leg runs over both old indices in C order, i.e.
+    the result matches ``t.to_dense()`` reshaped accordingly.
+
+    """
+    leg1, leg2 = t.legs[axis:axis + 2]
+    assert leg1.flow == leg2.flow, 'Cannot fuse legs with different flows'
+    labels = _reduce(leg1.labels[:, None] + leg2.labels[None, :], t.modulus)
+    leg = Leg(labels, leg1.flow)
+
+    blocks = {}
+    for key, block in t.blocks.items():
+        q1, q2 = key[axis:axis + 2]
+        q = _reduce(q1 + q2, t.modulus)
+        new_key = key[:axis] + (q,) + key[axis + 2:]
+        flat = (leg1.indices(q1)[:, None] * len(leg2)
+                + leg2.indices(q2)[None, :]).ravel()
+        pos = np.searchsorted(leg.indices(q), flat)
+        shape = block.shape[:axis] + (len(flat),) + block.shape[axis + 2:]
+        if new_key not in blocks:
+            new_shape = shape[:axis] + (leg.dim(q),) + shape[axis + 1:]
+            blocks[new_key] = np.zeros(new_shape, dtype=block.dtype)
+        blocks[new_key][(slice(None),) * axis + (pos,)] = block.reshape(shape)
+
+    legs = t.legs[:axis] + [leg] + t.legs[axis + 2:]
+    return BlockSparseTensor(legs, blocks, t.modulus, t.charge)
+
+
+def split(t, nr_row_legs, rank=None, relerr=None, absorb='right'):
+    """Block-wise SVD of ``t`` interpreted as matrix
+
+    :param nr_row_legs: The first ``nr_row_legs`` legs form the rows
+    :param rank: Maximal number of singular values to keep in total
+    :param relerr: Maximal fraction of discarded singular values (same
+        convention as :func:`mpnum.mparray.MPArray.compress`)
+    :param absorb: ``'right'`` (``'left'``) to multiply the singular
+        values into the second (first) factor
+    :returns: ``u, v, truncerr``; ``u`` has the row legs and a new
+        outgoing leg, ``v`` has a new incoming leg and the column legs.
+        ``truncerr`` is the sum of the discarded squared singular
+        values.
+
+    """
+    row_legs, col_legs = t.legs[:nr_row_legs], t.legs[nr_row_legs:]
+    sectors = {}
+    for key in t.blocks:
+        q = _reduce(sum(leg.flow * c for leg, c in
+                        zip(row_legs, key[:nr_row_legs])), t.modulus)
+        row_keys, col_keys = sectors.setdefault(q, (set(), set()))
+        row_keys.add(key[:nr_row_legs])
+        col_keys.add(key[nr_row_legs:])
+
+    def dims(legs, key):
+        return tuple(leg.dim(c) for leg, c in zip(legs, key))
+
+    svds = []
+    for q in sorted(sectors):
+        row_keys, col_keys = (sorted(keys) for keys in sectors[q])
+        row_sizes = [int(np.prod(dims(row_legs, k))) for k in row_keys]
+        col_sizes = [int(np.prod(dims(col_legs, k))) for k in col_keys]
+        row_pos = np.cumsum([0] + row_sizes)
+        col_pos = np.cumsum([0] + col_sizes)
+        matrix = np.zeros((row_pos[-1], col_pos[-1]), dtype=t.dtype)
+        for (i, rk), (j, ck) in it.product(enumerate(row_keys),
+                                           enumerate(col_keys)):
+            block = t.blocks.get(rk + ck)
+            if block is not None:
+                matrix[row_pos[i]:row_pos[i + 1], col_pos[j]:col_pos[j + 1]] \
+                    = block.reshape((row_sizes[i], col_sizes[j]))
+        u, sv, v = np.linalg.svd(matrix, full_matrices=False)
+        svds.append((q, row_keys, row_pos, u, sv, v, col_keys, col_pos))
+
+    # Keep the largest singular values across all sectors
+    all_sv = np.concatenate([s[4] for s in svds]) if svds else np.zeros(0)
+    order = np.argsort(-all_sv, kind='mergesort')
+    rank_t = len(all_sv) if rank is None else min(rank, len(all_sv))
+    if relerr is not None and all_sv.sum() > 0:
+        svsum = np.cumsum(all_sv[order]) / np.sum(all_sv)
+        rank_t = min(rank_t, np.searchsorted(svsum, 1 - relerr) + 1)
+    keep = np.zeros(len(all_sv), dtype=bool)
+    keep[order[:max(rank_t, 1)]] = True
+    truncerr = np.sum(all_sv[~keep]**2)
+
+    labels, u_blocks, v_blocks = [], {}, {}
+    offset = 0
+    for q, row_keys, row_pos, u, sv, v, col_keys, col_pos in svds:
+        sel = keep[offset:offset + len(sv)]
+        offset += len(sv)
+        if not sel.any():
+            continue
+        u, sv, v = u[:, sel], sv[sel], v[sel]
+        if absorb == 'right':
+            v = sv[:, None] * v
+        else:
+            u = u * sv[None, :]
+        labels += [q] * len(sv)
+        for i, rk in enumerate(row_keys):
+            u_blocks[rk + (q,)] = u[row_pos[i]:row_pos[i + 1]].reshape(
+                dims(row_legs, rk) + (len(sv),))
+        for j, ck in enumerate(col_keys):
+            v_blocks[(q,) + ck] = v[:, col_pos[j]:col_pos[j + 1]].reshape(
+                (len(sv),) + dims(col_legs, ck))
+
+    u = BlockSparseTensor(row_legs + [Leg(labels, -1)], u_blocks, t.modulus)
+    v = BlockSparseTensor([Leg(labels, 1)] + col_legs, v_blocks, t.modulus,
+                          t.charge)
+    return u, v, truncerr
+
+
+class BlockSparseMPArray(object):
+    """Matrix product array with :class:`BlockSparseTensor` local tensors
+
+    Only a few operations of :class:`~mpnum.mparray.MPArray` are available.
+    Use :func:`to_mparray` to convert to a dense representation.
+
+    .. automethod:: __init__
+
+    """
+
+    def __init__(self, ltens):
+        """
+        :param ltens: List of :class:`BlockSparseTensor` with legs in the
+            same order as the local tensors of
+            :class:`~mpnum.mparray.MPArray`
+
+        """
+        self.lt = list(ltens)
+        for lten, rten in zip(self.lt[:-1], self.lt[1:]):
+            assert lten.legs[-1].contractible(rten.legs[0]), \
+                'Virtual legs do not match'
+
+    def __len__(self):
+        return len(self.lt)
+
+    @property
+    def ranks(self):
+        """Tuple of ranks, i.e. the dimensions of the virtual legs"""
+        return tuple(len(lten.legs[-1]) for lten in self.lt[:-1])
+
+    @property
+    def ndims(self):
+        """Tuple of the number of physical legs on each site"""
+        return tuple(lten.ndim - 2 for lten in self.lt)
+
+    @property
+    def charge(self):
+        """Total charge, i.e. the label of the rightmost virtual leg"""
+        return self.lt[-1].legs[-1].labels[0]
+
+    @property
+    def size(self):
+        """Number of stored entries in all local tensors"""
+        return sum(lten.size for lten in self.lt)
+
+    def copy(self):
+        """Returns a deep copy"""
+        return type(self)([lten.copy() for lten in self.lt])
+
+    def to_mparray(self):
+        """Return a dense :class:`~mpnum.mparray.MPArray`"""
+        return mp.MPArray([lten.to_dense() for lten in self.lt])
+
+    def canonicalize(self, left=None, right=None):
+        """Brings the MPA to canonical form in place, block by block
+
+        See :func:`mpnum.mparray.MPArray.canonicalize` for the parameters.
+
+        """
+        if left == 'afull':
+            left = len(self) - 1
+        if right == 'afull':
+            right = 1
+        left = 0 if left is None else left
+        right = len(self) if right is None else right
+        for site in range(left):
+            lten = self.lt[site]
+            u, v, _ = split(lten, lten.ndim - 1)
+            self.lt[site] = u
+            self.lt[site + 1] = tensordot(v, self.lt[site + 1], ((1,), (0,)))
+        for site in range(len(self) - 1, max(right, 1) - 1, -1):
+            u, v, _ = split(self.lt[site], 1, absorb='left')
+            self.lt[site] = v
+            lten = self.lt[site - 1]
+            self.lt[site - 1] = tensordot(lten, u, ((lten.ndim - 1,), (0,)))
+
+    def compress(self, rank=None, relerr=None):
+        """Compresses the MPA in place by block-wise SVD truncation
+
+        :param rank: Maximal rank of the result
+        :param relerr: Maximal fraction of discarded singular values on
+            each bond, see :func:`mpnum.mparray.MPArray.compress`
+        :returns: Array with the discarded weight on each bond
+
+        The result is left-canonical.
+
+        """
+        self.canonicalize(right=1)
+        truncerrs = []
+        for site in range(len(self) - 1):
+            lten = self.lt[site]
+            u, v, truncerr = split(lten, lten.ndim - 1, rank, relerr)
+            self.lt[site] = u
+            self.lt[site + 1] = tensordot(v, self.lt[site + 1], ((1,), (0,)))
+            truncerrs.append(truncerr)
+        return np.array(truncerrs)
+
+
+def from_array(array, labels, ndims=1, modulus=None, charge=0):
+    """Create a :class:`BlockSparseMPArray` from a dense array
+
+    :param np.ndarray array: Dense array in local form with ``ndims``
+        physical legs on each site
+    :param labels: Charge labels of the indices of a physical leg (the
+        same on all physical legs)
+    :param ndims: Number of physical legs per site, 1 (MPS) or 2 (MPO)
+    :param modulus: ``n`` for :math:`\\mathbb Z_n` or ``None`` for
+        :math:`U(1)` (default: ``None``)
+    :param charge: Total charge of ``array`` (default: 0)
+    :raises ValueError: If ``array`` does not have charge ``charge``
+
+    As :func:`mpnum.mparray.MPArray.from_array`, this function does not
+    truncate; use :func:`BlockSparseMPArray.compress` to reduce the ranks.
+
+    """
+    assert ndims in (1, 2), 'ndims={!r} not supported'.format(ndims)
+    assert array.ndim % ndims == 0
+    phys_legs = [Leg(labels, 1), Leg(labels, -1)][:ndims]
+    legs = [Leg([0], 1)] + phys_legs * (array.ndim // ndims) \
+        + [Leg([_reduce(charge, modulus)], -1)]
+    rest = BlockSparseTensor.from_dense(array[None, ..., None], legs, modulus)
+
+    ltens = []
+    while rest.ndim > 2 + ndims:
+        u, rest, _ = split(rest, 1 + ndims)
+        ltens.append(u)
+    ltens.append(rest)
+    return BlockSparseMPArray(ltens)
+
+
+def product_state(indices, labels, modulus=None):
+    """Create a :class:`BlockSparseMPArray` of a product of basis vectors
+
+    :param indices: Index of the basis vector on each site
+    :param labels: Charge labels of the indices of the physical leg (the
+        same on all sites)
+    :param modulus: ``n`` for :math:`\\mathbb Z_n` or ``None`` for
+        :math:`U(1)` (default: ``None``)
+    :returns: MPS with rank one whose charge is the sum of the labels of
+        ``indices``
+
+    >>> mps = product_state([1, 0, 1, 0], labels=[0, 1])
+    >>> mps.ranks, mps.charge
+    ((1, 1, 1), 2)
+
+    """
+    phys = Leg(labels, 1)
+    ltens, charge = [], 0
+    for index in indices:
+        label = phys.labels[index]
+        new_charge = _reduce(charge + label, modulus)
+        block = np.zeros((1, phys.dim(label), 1))
+        block[0, np.flatnonzero(phys.indices(label) == index), 0] = 1
+        legs = [Leg([charge], 1), phys, Leg([new_charge], -1)]
+        ltens.append(BlockSparseTensor(
+            legs, {(charge, label, new_charge): block}, modulus))
+        charge = new_charge
+    return BlockSparseMPArray(ltens)
+
+
+def dot(mpa1, mpa2):
+    """Block-wise contraction of the last physical leg of ``mpa1`` with the
+    first physical leg of ``mpa2`` on each site
+
+    Same as :func:`mpnum.mparray.dot` with the default ``axes``.
+
+    """
+    assert len(mpa1) == len(mpa2)
+    ltens = []
+    for lt1, lt2 in zip(mpa1.lt, mpa2.lt):
+        lten = tensordot(lt1, lt2, ((lt1.ndim - 2,), (1,)))
+        # Legs: left 1, phys 1 (except last), right 1, left 2, phys 2
+        # (except first), right 2
+        n1, n2 = lt1.ndim - 3, lt2.ndim - 3
+        axes = ([0, n1 + 2] + list(range(1, n1 + 1))
+                + list(range(n1 + 3, n1 + n2 + 3)) + [n1 + 1, n1 + n2 + 3])
+        lten = lten.transpose(axes)
+        lten = fuse(fuse(lten, lten.ndim - 2), 0)
+        ltens.append(lten)
+    return BlockSparseMPArray(ltens)
+
+
+def inner(mpa1, mpa2):
+    """Block-wise inner product :math:`\\langle \\mathrm{mpa1} \\vert
+    \\mathrm{mpa2} \\rangle` with complex conjugation of ``mpa1``
+
+    Same as :func:`mpnum.mparray.inner`.
+
+    """
+    assert len(mpa1) == len(mpa2)
+    env = None
+    for lt1, lt2 in zip(mpa1.lt, mpa2.lt):
+        if env is not None:
+            lt2 = tensordot(env, lt2, ((1,), (0,)))
+        axes = tuple(range(lt2.ndim - 1))
+        env = tensordot(lt1.conj(), lt2, (axes, axes))
+    return env.to_dense()[0, 0]
+
+
+def norm(mpa):
+    """Frobenius norm, see :func:`mpnum.mparray.norm`"""
+    return np.sqrt(abs(inner(mpa, mpa)))
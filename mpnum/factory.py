@@ -19,7 +19,7 @@ from .mpstruct import LocalTensors
 
 
 __all__ = ['eye', 'random_local_ham', 'random_mpa', 'random_mpdo',
-           'random_mps', 'random_mpo', 'zero', 'diagonal_mpa']
+           'random_mps', 'random_mpo', 'zero', 'diagonal_mpa', 'from_function']
 
 
 def _zrandn(shape, randstate=None):
@@ -234,7 +234,7 @@ def random_mpa(sites, ldim, rank, randstate=None, normalized=False,
     randfun = ft.partial(_randfuncs[dtype], randstate=randstate)
     mpa = _generate(sites, ldim, rank, randfun, force_rank)
     if normalized:
-        mpa /= mp.norm(mpa.copy())
+        mpa /= mp.norm(mpa)
     return mpa
 
 
@@ -308,6 +308,143 @@ def diagonal_mpa(entries, sites):
     return mp.MPArray(LocalTensors(ltens, cform=(sites - 1, sites)))
 
 
+def from_function(func, shape, rank, tol=None, max_sweeps=8,
+                  randstate=None, relerr=None):
+    """Returns an MPA which interpolates a function of many indices
+    (tensor-train cross interpolation)
+
+    The MPA is built from the values of ``func`` on a few fibers of the
+    full array, which are selected by maximum-volume pivoting
+    [:ref:`OT10 <OT10>`]. Each sweep queries :math:`O(N d D^2)` entries,
+    so the full array is never built. After the last sweep, the ranks
+    are reduced to those which the result needs by SVD compression.
+
+    :param func: Function which takes an integer array of shape ``(n,
+        len(shape))`` and returns the ``n`` entries at these indices
+    :param shape: Dimension of the physical leg on each site
+    :param rank: Maximal rank of the result, i.e. number of pivots per
+        bond during the sweeps
+    :param tol: Stop after a sweep if the result changed by less than
+        ``tol`` times its norm (default: ``None``, i.e. do
+        ``max_sweeps`` sweeps)
+    :param max_sweeps: Maximal number of sweeps; a sweep goes from left
+        to right or from right to left (default: 8)
+    :param randstate: ``numpy.random.RandomState`` instance or ``None``
+        for the random initial pivots
+    :param relerr: Maximal fraction of discarded singular values in the
+        final compression, see :func:`mpnum.mparray.MPArray.compress`
+        (default: ``None``, i.e. only singular values at the level of
+        rounding errors are discarded)
+    :returns: :class:`~mpnum.mparray.MPArray` with one physical leg per
+        site which equals ``func`` if its ranks are at most ``rank``
+
+    >>> func = lambda idx: 1.0 / (1 + idx.sum(axis=1))
+    >>> mpa = from_function(func, [4] * 8, 8, tol=1e-10,
+    ...                     randstate=np.random.RandomState(seed=5))
+    >>> idx = np.indices([4] * 8).reshape((8, -1)).T
+    >>> bool(abs(mpa.to_array().ravel() - func(idx)).max() < 1e-6)
+    True
+
+    """
+    randstate = np.random if randstate is None else randstate
+    shape = tuple(shape)
+    nr_sites = len(shape)
+    cumdims = np.cumprod((1,) + shape)
+    ranks = [min(rank, cumdims[k], cumdims[-1] // cumdims[k])
+             for k in range(1, nr_sites)]
+    # lpivots[k] (rpivots[k]): Indices on sites [:k] ([k:]) selected for
+    # the virtual leg left of site k
+    lpivots = [np.zeros((1, 0), dtype=int)] + [None] * nr_sites
+    rpivots = [None] + [
+        np.stack([randstate.randint(dim, size=r) for dim in shape[k:]], 1)
+        for k, r in zip(range(1, nr_sites), ranks)
+    ] + [np.zeros((1, 0), dtype=int)]
+
+    mpa = None
+    for sweep in range(max_sweeps):
+        ltens = []
+        to_right = sweep % 2 == 0
+        sites = range(nr_sites) if to_right else range(nr_sites - 1, -1, -1)
+        for site in sites:
+            fiber = _cross_fiber(func, lpivots[site], shape[site],
+                                 rpivots[site + 1])
+            if site == (nr_sites - 1 if to_right else 0):
+                ltens.append(fiber)
+                break
+            if to_right:
+                mat = fiber.reshape((-1, fiber.shape[-1]))
+            else:
+                mat = fiber.reshape((fiber.shape[0], -1)).T
+            q, _ = np.linalg.qr(mat)
+            rows = _maxvol(q)
+            interp = np.linalg.solve(q[rows].T, q.T).T
+            if to_right:
+                left, phys = np.unravel_index(rows, fiber.shape[:2])
+                lpivots[site + 1] = np.hstack(
+                    (lpivots[site][left], phys[:, None]))
+                ltens.append(interp.reshape(fiber.shape[:2] + (-1,)))
+            else:
+                phys, right = np.unravel_index(rows, fiber.shape[1:])
+                rpivots[site] = np.hstack(
+                    (phys[:, None], rpivots[site + 1][right]))
+                ltens.append(interp.T.reshape((-1,) + fiber.shape[1:]))
+
+        new_mpa = mp.MPArray(ltens if to_right else ltens[::-1])
+        converged = tol is not None and mpa is not None and \
+            mp.normdist(new_mpa, mpa) <= tol * mp.norm(new_mpa)
+        mpa = new_mpa
+        if converged:
+            break
+
+    if relerr is None:
+        relerr = max(mpa.ranks + (1,)) * np.finfo(float).eps
+    mpa.compress('svd', relerr=relerr)
+    return mpa
+
+
+def _cross_fiber(func, lpivots, dim, rpivots):
+    """Evaluate ``func`` on all indices composed of a row of ``lpivots``,
+    an index of the physical leg of dimension ``dim`` and a row of
+    ``rpivots``
+
+    :returns: Array of shape ``(len(lpivots), dim, len(rpivots))``
+
+    """
+    shape = (len(lpivots), dim, len(rpivots))
+    idx = np.concatenate([
+        np.broadcast_to(lpivots[:, None, None, :],
+                        shape + lpivots.shape[1:]),
+        np.broadcast_to(np.arange(dim)[None, :, None, None], shape + (1,)),
+        np.broadcast_to(rpivots[None, None, :, :], shape + rpivots.shape[1:]),
+    ], axis=-1)
+    values = np.asarray(func(idx.reshape((-1, idx.shape[-1]))))
+    return values.reshape(shape)
+
+
+def _maxvol(mat, tol=1.05, max_iter=100):
+    """Rows of a tall matrix which span a submatrix of (nearly) maximal
+    volume, i.e. absolute value of the determinant
+
+    :param mat: Matrix of shape ``(n, r)`` with ``n >= r`` and full
+        column rank
+    :param tol: Stop if no entry of ``mat`` times the inverse of the
+        submatrix exceeds ``tol`` in absolute value
+    :returns: Array of ``r`` row indices
+
+    """
+    nr_rows, nr_cols = mat.shape
+    # Start with the pivots of a QR decomposition with column pivoting
+    _, _, rows = qr(mat.T, mode='economic', pivoting=True)
+    rows = rows[:nr_cols]
+    for _ in range(max_iter):
+        coeff = np.linalg.solve(mat[rows].T, mat.T).T
+        row, col = np.unravel_index(np.argmax(np.abs(coeff)), coeff.shape)
+        if abs(coeff[row, col]) <= tol:
+            break
+        rows[col] = row
+    return rows
+
+
 #########################
 #  More physical stuff  #
 #########################
@@ -340,9 +477,7 @@ def random_mpo(sites, ldim, rank, randstate=None, hermitian=False,
         ltens = (l + l.swapaxes(1, 2).conj() for l in mpo.lt)
         mpo = mp.MPArray(ltens)
     if normalized:
-        # we do this with a copy to ensure the returned state is not
-        # normalized
-        mpo /= mp.norm(mpo.copy())
+        mpo /= mp.norm(mpo)
 
     return mpo
 
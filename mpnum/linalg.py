@@ -11,11 +11,15 @@ from __future__ import absolute_import, division, print_function
 
 import functools as ft
 import itertools as it
+import time
+from multiprocessing.pool import ThreadPool
+
 import numpy as np
 from scipy import sparse as sp
 
 from six.moves import range
 
+from . import blocksparse
 from . import mparray as mp
 from . import utils
 from ._named_ndarray import named_ndarray
@@ -86,13 +90,15 @@ def _eig_leftvec_add(leftvec, mpo_lten, mps_lten, mps_lten2=None):
     return leftvec
 
 
-def _eig_rightvec_add(rightvec, mpo_lten, mps_lten):
+def _eig_rightvec_add(rightvec, mpo_lten, mps_lten, mps_lten2=None):
     """Add one column to the right vector.
 
     :param rightvec: existing right vector
         It has three indices: mps bond, mpo bond, complex conjugate mps bond
     :param op_lten: Local tensor of the MPO
     :param mps_lten: Local tensor of the current MPS eigenstate
+    :param mps_lten2: Local tensor to use in place of ``mps_lten`` for the
+        complex conjugate row (default: ``mps_lten``)
 
     This does the same thing as _eig_leftvec_add(), except that
     'left' and 'right' are exchanged in the contractions (but not in
@@ -105,6 +111,8 @@ def _eig_rightvec_add(rightvec, mpo_lten, mps_lten):
     rightvec = named_ndarray(rightvec, rightvec_names)
     mpo_lten = named_ndarray(mpo_lten, mpo_names)
     mps_lten = named_ndarray(mps_lten, mps_names)
+    mps_lten2 = mps_lten if mps_lten2 is None else named_ndarray(mps_lten2,
+                                                                 mps_names)
 
     contract_mps = (('mps_bond', 'right_mps_bond'),)
     rightvec = rightvec.tensordot(mps_lten, contract_mps)
@@ -118,7 +126,7 @@ def _eig_rightvec_add(rightvec, mpo_lten, mps_lten):
     contract_cc_mps = (
         ('cc_mps_bond', 'right_mps_bond'),
         ('phys_row', 'phys'))
-    rightvec = rightvec.tensordot(mps_lten.conj(), contract_cc_mps)
+    rightvec = rightvec.tensordot(mps_lten2.conj(), contract_cc_mps)
     rename_mps_mpo = (
         ('left_mpo_bond', 'mpo_bond'),
         ('left_mps_bond', 'cc_mps_bond'))
@@ -151,28 +159,51 @@ def _eig_rightvec_add_mps(rv, lt1, lt2):
     return rv
 
 
+def _eig_sum_map(func, args, pool=None):
+    """Apply ``func`` to each item in ``args``, in ``pool`` if given
+
+    :param pool: :class:`multiprocessing.pool.ThreadPool` or ``None``
+    :returns: List of results in the order of ``args``
+
+    The results do not depend on the number of worker threads because
+    each item is processed independently.
+
+    """
+    if pool is None:
+        return [func(arg) for arg in args]
+    return pool.map(func, args)
+
+
 def _eig_sum_leftvec_add(
-        mpas, mpas_ndims, leftvec_out, leftvec, pos, mps_lten):
+        mpas, mpas_ndims, leftvec_out, leftvec, pos, mps_lten, pool=None):
     """Add one column to the left vector (MPA list dispatching)"""
-    for i, mpa, ndims, lv in zip(it.count(), mpas, mpas_ndims, leftvec):
+    def add(args):
+        mpa, ndims, lv = args
         if ndims == 2:
-            leftvec_out[i] = _eig_leftvec_add(lv, mpa.lt[pos], mps_lten)
+            return _eig_leftvec_add(lv, mpa.lt[pos], mps_lten)
         elif ndims == 1:
-            leftvec_out[i] = _eig_leftvec_add_mps(lv, mpa.lt[pos], mps_lten)
+            return _eig_leftvec_add_mps(lv, mpa.lt[pos], mps_lten)
         else:
             raise ValueError('ndims = {!r} not supported'.format(ndims))
 
+    leftvec_out[:] = _eig_sum_map(add, list(zip(mpas, mpas_ndims, leftvec)),
+                                  pool)
+
 
 def _eig_sum_rightvec_add(
-        mpas, mpas_ndims, rightvec_out, rightvec, pos, mps_lten):
+        mpas, mpas_ndims, rightvec_out, rightvec, pos, mps_lten, pool=None):
     """Add one column to the right vector (MPA list dispatching)"""
-    for i, mpa, ndims, rv in zip(it.count(), mpas, mpas_ndims, rightvec):
+    def add(args):
+        mpa, ndims, rv = args
         if ndims == 2:
-            rightvec_out[i] = _eig_rightvec_add(rv, mpa.lt[pos], mps_lten)
+            return _eig_rightvec_add(rv, mpa.lt[pos], mps_lten)
         elif ndims == 1:
-            rightvec_out[i] = _eig_rightvec_add_mps(rv, mpa.lt[pos], mps_lten)
+            return _eig_rightvec_add_mps(rv, mpa.lt[pos], mps_lten)
         else:
             raise ValueError('ndims = {!r} not supported'.format(ndims))
+
+    rightvec_out[:] = _eig_sum_map(add, list(zip(mpas, mpas_ndims, rightvec)),
+                                   pool)
     return rightvec
 
 
@@ -237,8 +268,52 @@ def _eig_local_op(leftvec, mpo_ltens, rightvec):
     return op
 
 
-def _eig_local_op_mps(lv, ltens, rv):
-    """Local operator contribution from an MPS"""
+def _eig_local_op_linear(leftvec, mpo_ltens, rightvec):
+    """Create the local operator of :func:`_eig_local_op` as matrix-free
+    :class:`scipy.sparse.linalg.LinearOperator`
+
+    Parameters: See :func:`_eig_local_op`.
+
+    Instead of contracting ``leftvec``, ``mpo_ltens`` and ``rightvec``
+    into a dense matrix of size :math:`(D^2 d^k)^2`, we apply them one
+    after another to the input vector. For MPS rank :math:`D`, MPO
+    rank :math:`D_W` and local dimension :math:`d`, one product with
+    the operator costs :math:`O(D^3 D_W d + D^2 D_W^2 d^2)` operations
+    per site. The dense operator is never built.
+
+    """
+    mpo_ltens = list(mpo_ltens)
+    nr_sites = len(mpo_ltens)
+    # Shape of the local MPS tensor the operator acts on
+    vec_shape = ((leftvec.shape[0],) + tuple(lt.shape[2] for lt in mpo_ltens)
+                 + (rightvec.shape[0],))
+    out_shape = ((leftvec.shape[2],) + tuple(lt.shape[1] for lt in mpo_ltens)
+                 + (rightvec.shape[2],))
+    dtype = np.result_type(leftvec, rightvec, *mpo_ltens)
+
+    def matvec(vec):
+        vec = vec.reshape(vec_shape)
+        # op axes: 0: left mpo bond, 1: left cc mps bond,
+        # 2..nr_sites + 1: physical legs, nr_sites + 2: right mps bond
+        op = np.tensordot(leftvec, vec, axes=(0, 0))
+        for pos, lten in enumerate(mpo_ltens):
+            # Contract mpo bond and physical column leg ...
+            op = np.tensordot(op, lten, axes=((0, 2 + pos), (0, 2)))
+            # ... and move the new mpo bond and physical row leg into place
+            op = np.moveaxis(op, (nr_sites + 2, nr_sites + 1), (0, pos + 2))
+        # op axes: 0: left cc mps bond, 1..nr_sites: physical legs,
+        # nr_sites + 1: right cc mps bond
+        op = np.tensordot(op, rightvec, axes=((0, nr_sites + 2), (1, 0)))
+        return op.ravel()
+
+    return sp.linalg.LinearOperator(
+        (int(np.prod(out_shape)), int(np.prod(vec_shape))), matvec=matvec,
+        dtype=dtype)
+
+
+def _eig_local_vec_mps(lv, ltens, rv):
+    r"""Local vector :math:`v` such that an MPS contributes :math:`\vert v
+    \rangle \langle v \vert` to the local operator"""
     # MPS 1 / ltens: Interpreted as |psiXpsi| part of the operator
     # MPS 2: The current eigvectector candidate
     op = lv.T
@@ -255,15 +330,58 @@ def _eig_local_op_mps(lv, ltens, rv):
         # op axes: 0: mps2 bond, 1: physical legs, 2: mps1 bond
     op = np.tensordot(op, rv, axes=(2, 0))
     # op axes: 0: mps2 bond, 1: physical legs, 2: mps2 bond
-    op = np.outer(op.conj(), op)
+    return op.ravel()
+
+
+def _eig_local_op_mps(lv, ltens, rv):
+    """Local operator contribution from an MPS"""
+    vec = _eig_local_vec_mps(lv, ltens, rv)
+    op = np.outer(vec.conj(), vec)
     # op axes:
     # 0: (0a: left cc mps2 bond, 0b: physical row leg, 0c: right cc mps2 bond),
     # 1: (1a: left mps2 bond, 1b: physical column leg, 1c: right mps2 bond)
     return op
 
 
+def _eig_local_op_mps_linear(lv, ltens, rv):
+    """Local operator contribution from an MPS as matrix-free
+    :class:`scipy.sparse.linalg.LinearOperator`
+
+    Only the local vector from :func:`_eig_local_vec_mps` is stored and
+    applied as rank-one update.
+
+    """
+    vec = _eig_local_vec_mps(lv, ltens, rv)
+    vec_conj = vec.conj()
+
+    def matvec(x):
+        return vec_conj * np.dot(vec, x.ravel())
+
+    return sp.linalg.LinearOperator((vec.size,) * 2, matvec=matvec,
+                                    dtype=vec.dtype)
+
+
+def _eig_local_op_sum_linear(ops, pool=None):
+    """Sum of matrix-free local operators
+
+    :param ops: List of :class:`scipy.sparse.linalg.LinearOperator`
+    :param pool: Apply the summands in this
+        :class:`multiprocessing.pool.ThreadPool` (default: ``None``)
+    :returns: :class:`scipy.sparse.linalg.LinearOperator` which applies
+        each summand to the input vector and adds up the results
+
+    """
+    def matvec(x):
+        x = x.ravel()
+        # Add up in a fixed order to obtain reproducible results
+        return sum(_eig_sum_map(lambda op: op.matvec(x), ops, pool))
+
+    dtype = np.result_type(*(op.dtype for op in ops))
+    return sp.linalg.LinearOperator(ops[0].shape, matvec=matvec, dtype=dtype)
+
+
 def _eig_minimize_locally(leftvec, mpo_ltens, rightvec, eigvec_ltens,
-                          eigs):
+                          eigs, matfree=False, max_rank=None):
     """Perform the local eigenvalue minimization on few sites
 
     Return a new (expectedly smaller) eigenvalue and a new local
@@ -275,7 +393,15 @@ def _eig_minimize_locally(leftvec, mpo_ltens, rightvec, eigvec_ltens,
     :param rightvec: Right vector
         Three indices: mps bond, mpo bond, complex conjugate mps bond
     :param eigvec_ltens: List of local tensors of the MPS eigenvector
-    :returns: mineigval, mineigval_eigvec_lten
+    :param matfree: Pass a matrix-free operator from
+        :func:`_eig_local_op_linear` to ``eigs`` instead of a dense
+        matrix (default: ``False``)
+    :param max_rank: Rank to compress the result to if
+        ``len(eigvec_ltens) > 1`` (default: largest current rank)
+    :returns: mineigval, mineigval_eigvec_lten, truncerr
+
+    ``truncerr`` is an array with the weight discarded on each of the
+    ``len(eigvec_ltens) - 1`` inner bonds when compressing the result.
 
     See [:ref:`Sch11 <Sch11>`, arXiv version, Fig. 42 on p. 67].  This method
     computes the operator ('op'), defined by everything except the
@@ -290,17 +416,19 @@ def _eig_minimize_locally(leftvec, mpo_ltens, rightvec, eigvec_ltens,
     Middle row: MPO matrices with row (column) indices to bottom (top)
 
     """
-    op = _eig_local_op(leftvec, list(mpo_ltens), rightvec)
-    return _eig_minimize_locally2(op, list(eigvec_ltens), eigs)
+    local_op = _eig_local_op_linear if matfree else _eig_local_op
+    op = local_op(leftvec, list(mpo_ltens), rightvec)
+    return _eig_minimize_locally2(op, list(eigvec_ltens), eigs, max_rank)
 
 
-def _eig_minimize_locally2(local_op, eigvec_ltens, eigs):
+def _eig_minimize_locally2(local_op, eigvec_ltens, eigs, max_rank=None):
     """Implement the main part of :func:`_eig_minimize_locally`
 
     See :func:`_eig_minimize_locally` for a description.
 
     """
-    eigvec_rank = max(lten.shape[0] for lten in eigvec_ltens)
+    eigvec_rank = max(lten.shape[0] for lten in eigvec_ltens) \
+        if max_rank is None else max_rank
     eigvec_lten = eigvec_ltens[0]
     for lten in eigvec_ltens[1:]:
         eigvec_lten = utils.matdot(eigvec_lten, lten)
@@ -318,40 +446,477 @@ def _eig_minimize_locally2(local_op, eigvec_ltens, eigs):
     eigvec_lten = eigvec.reshape(eigvec_lten.shape)
     if len(eigvec_ltens) == 1:
         eigvec_lten = (eigvec_lten,)
+        truncerr = np.zeros(0)
     else:
         # If we minimize on multiple sites, we must compress to the
         # desired rank.
         #
-        # TODO: Return the truncation error.
-        #
         # "the truncation error of conventional DMRG [...] has emerged
         # as a highly reliable tool for gauging the quality of
         # results" [Sch11, Sec. 6.4, p. 74]
         eigvec_lten = mp.MPArray.from_array(eigvec_lten, 1, has_virtual=True)
-        eigvec_lten.compress(method='svd', rank=eigvec_rank)
+        _, truncerr = eigvec_lten.compress(method='svd', rank=eigvec_rank,
+                                           return_truncerr=True)
         eigvec_lten = eigvec_lten.lt
-    return eigval, eigvec_lten
+    return eigval, eigvec_lten, truncerr
 
 
 def _eig_sum_minimize_locally(
-        mpas, mpas_ndims, leftvec, pos, rightvec, eigvec_ltens, eigs):
+        mpas, mpas_ndims, leftvec, pos, rightvec, eigvec_ltens, eigs,
+        matfree=False, pool=None):
     """Local minimization (MPA list dispatching)"""
     # Our task is quite simple: Compute the local operator for each
     # contribution in the sum and sum the results, then minimize.
-    op = 0
-    for mpa, ndims, lv, rv in zip(mpas, mpas_ndims, leftvec, rightvec):
+    if matfree:
+        local_op, local_op_mps = _eig_local_op_linear, _eig_local_op_mps_linear
+    else:
+        local_op, local_op_mps = _eig_local_op, _eig_local_op_mps
+
+    def summand(args):
+        mpa, ndims, lv, rv = args
         if ndims == 2:
-            op += _eig_local_op(lv, list(mpa.lt[pos]), rv)
+            return local_op(lv, list(mpa.lt[pos]), rv)
         elif ndims == 1:
-            op += _eig_local_op_mps(lv, list(mpa.lt[pos]), rv)
+            return local_op_mps(lv, list(mpa.lt[pos]), rv)
         else:
             raise ValueError('ndims = {!r} not supported'.format(ndims))
 
+    ops = _eig_sum_map(summand,
+                       list(zip(mpas, mpas_ndims, leftvec, rightvec)), pool)
+    op = _eig_local_op_sum_linear(ops, pool) if matfree else sum(ops)
     return _eig_minimize_locally2(op, list(eigvec_ltens), eigs)
 
 
+def _eig_expand_right(leftvec, mpo_lten, eigvec_lten, next_lten, alpha,
+                      max_rank):
+    """Subspace expansion of a local tensor towards the right
+
+    :param leftvec: Left vector
+        Three indices: mps bond, mpo bond, complex conjugate mps bond
+    :param mpo_lten: Local tensor of the MPO
+    :param eigvec_lten: Local tensor of the MPS eigenvector after the
+        local minimization
+    :param next_lten: Local tensor of the MPS eigenvector on the next
+        site to the right
+    :param alpha: Mixing factor of the expansion term
+    :param max_rank: Rank of the result on the bond between the two sites
+    :returns: Left-canonical local tensor, new local tensor for the
+        next site
+
+    The expansion term is the left vector and the MPO applied to the
+    local tensor [:ref:`HMSW15 <HMSW15>`]. It is
+    appended to the local tensor along the right bond, which adds
+    directions reachable by the MPO to the basis of the right bond. The
+    corresponding block of ``next_lten`` is zero, so the state is not
+    changed before truncation to ``max_rank``.
+
+    """
+    # exp axes: 0: mpo bond, 1: cc mps bond, 2: physical leg,
+    # 3: right mps bond
+    exp = np.tensordot(leftvec, eigvec_lten, axes=(0, 0))
+    # exp axes: 0: cc mps bond, 1: right mps bond, 2: physical leg,
+    # 3: right mpo bond
+    exp = np.tensordot(exp, mpo_lten, axes=((0, 2), (0, 2)))
+    exp = exp.transpose(0, 2, 3, 1)
+    exp = exp.reshape(exp.shape[:2] + (-1,))
+    expanded = np.concatenate((eigvec_lten, alpha * exp), axis=-1)
+
+    # The rank cannot usefully exceed the dimension of the right part.
+    max_rank = min(max_rank, int(np.prod(next_lten.shape[1:])))
+    u, sv, v = utils.truncated_svd(
+        expanded.reshape((-1, expanded.shape[-1])), max_rank)
+    eigvec_lten = u.reshape(eigvec_lten.shape[:-1] + (-1,))
+    next_lten = utils.matdot(sv[:, None] * v[:, :next_lten.shape[0]],
+                             next_lten)
+    return eigvec_lten, next_lten
+
+
+def _eig_expand_left(rightvec, mpo_lten, eigvec_lten, prev_lten, alpha,
+                     max_rank):
+    """Subspace expansion of a local tensor towards the left
+
+    :param rightvec: Right vector
+        Three indices: mps bond, mpo bond, complex conjugate mps bond
+    :param prev_lten: Local tensor of the MPS eigenvector on the next
+        site to the left
+
+    Remaining parameters: See :func:`_eig_expand_right`.
+
+    :returns: New local tensor for the previous site, right-canonical
+        local tensor
+
+    """
+    # exp axes: 0: left mps bond, 1: physical leg, 2: mpo bond,
+    # 3: cc mps bond
+    exp = np.tensordot(eigvec_lten, rightvec, axes=(2, 0))
+    # exp axes: 0: left mpo bond, 1: physical leg, 2: left mps bond,
+    # 3: cc mps bond
+    exp = np.tensordot(mpo_lten, exp, axes=((2, 3), (1, 2)))
+    exp = exp.transpose(0, 2, 1, 3)
+    exp = exp.reshape((-1,) + exp.shape[2:])
+    expanded = np.concatenate((eigvec_lten, alpha * exp), axis=0)
+
+    # The rank cannot usefully exceed the dimension of the left part.
+    max_rank = min(max_rank, int(np.prod(prev_lten.shape[:-1])))
+    u, sv, v = utils.truncated_svd(
+        expanded.reshape((expanded.shape[0], -1)), max_rank)
+    eigvec_lten = v.reshape((-1,) + eigvec_lten.shape[1:])
+    prev_lten = utils.matdot(prev_lten,
+                             u[:prev_lten.shape[-1], :] * sv[None, :])
+    return prev_lten, eigvec_lten
+
+
+def _eig_schedule(value, num_sweep):
+    """Value of a parameter given per sweep
+
+    :param value: ``None``, a scalar or a sequence with one entry per
+        sweep. The last entry is used for all remaining sweeps.
+    :param int num_sweep: Number of the current sweep
+    :returns: Value for the current sweep
+
+    """
+    if value is None or np.isscalar(value):
+        return value
+    value = tuple(value)
+    return value[min(num_sweep, len(value) - 1)]
+
+
+def _eig_sweep_finished(history, eigvals, truncerrs, start_time, eigvec,
+                        last_eigvec, eigval_tol, overlap_tol):
+    """Record the diagnostics of one sweep and check for convergence
+
+    :param list history: Records of the previous sweeps, the record of
+        the current sweep is appended
+    :param eigvals: Eigenvalues of all local minimizations of the sweep
+    :param truncerrs: Truncation errors of all local minimizations of the
+        sweep
+    :param start_time: Value of :func:`time.time()` at the beginning of
+        the sweep
+    :param eigvec: Current eigenvector
+    :param last_eigvec: Eigenvector at the end of the previous sweep or
+        ``None``
+    :param eigval_tol: See :func:`eig`
+    :param overlap_tol: See :func:`eig`
+    :returns: ``True`` if the sweeps have converged
+
+    """
+    overlap = None
+    if isinstance(eigvec, blocksparse.BlockSparseMPArray):
+        inner = blocksparse.inner
+    else:
+        inner = mp.inner
+    if last_eigvec is not None:
+        overlap = abs(inner(last_eigvec, eigvec))
+    truncerrs = np.array(truncerrs).reshape((len(truncerrs), -1))
+    history.append({
+        'eigvals': np.array(eigvals),
+        'truncerrs': truncerrs,
+        'truncerr': truncerrs.sum(),
+        'overlap': overlap,
+        'time': time.time() - start_time,
+    })
+
+    if len(history) < 2 or (eigval_tol is None and overlap_tol is None):
+        return False
+    if eigval_tol is not None:
+        eigval_change = abs(history[-1]['eigvals'][-1]
+                            - history[-2]['eigvals'][-1])
+        if eigval_change > eigval_tol:
+            return False
+    if overlap_tol is not None and 1 - overlap > overlap_tol:
+        return False
+    return True
+
+
+class _EigBlockSparseEnvironments(object):
+    """Left and right vectors of :func:`eig` for block-sparse MPAs
+
+    Block-sparse analogue of :class:`mpnum.mparray.Environments` for
+    ``<eigvec| mpo |eigvec>``. The legs of the vectors are ordered as for
+    :func:`_eig_leftvec_add`: mps bond, mpo bond, complex conjugate mps
+    bond. Call :func:`changed` after replacing local tensors of
+    ``eigvec``.
+
+    """
+
+    def __init__(self, eigvec, mpo):
+        self._eigvec, self._mpo = eigvec, mpo
+        lten, mpo_lten = eigvec.lt[0], mpo.lt[0]
+        legs = [lten.legs[0].dual(), mpo_lten.legs[0].dual(), lten.legs[0]]
+        self._leftvecs = [blocksparse.BlockSparseTensor(
+            legs, {(0, 0, 0): np.ones((1, 1, 1))}, lten.modulus)]
+        lten, mpo_lten = eigvec.lt[-1], mpo.lt[-1]
+        legs = [lten.legs[-1].dual(), mpo_lten.legs[-1].dual(),
+                lten.legs[-1]]
+        key = (eigvec.charge, mpo.charge, eigvec.charge)
+        # _rightvecs[i] is the right vector of the last i sites
+        self._rightvecs = [blocksparse.BlockSparseTensor(
+            legs, {key: np.ones((1, 1, 1))}, lten.modulus)]
+
+    def left(self, pos):
+        """Left vector of the sites ``[:pos]``"""
+        while len(self._leftvecs) <= pos:
+            site = len(self._leftvecs) - 1
+            self._leftvecs.append(_eig_bs_leftvec_add(
+                self._leftvecs[-1], self._mpo.lt[site],
+                self._eigvec.lt[site]))
+        return self._leftvecs[pos]
+
+    def right(self, pos):
+        """Right vector of the sites ``[pos:]``"""
+        nr_sites = len(self._eigvec)
+        while len(self._rightvecs) <= nr_sites - pos:
+            site = nr_sites - len(self._rightvecs)
+            self._rightvecs.append(_eig_bs_rightvec_add(
+                self._rightvecs[-1], self._mpo.lt[site],
+                self._eigvec.lt[site]))
+        return self._rightvecs[nr_sites - pos]
+
+    def changed(self, start, stop):
+        """Discard the vectors which depend on the sites ``[start:stop]``"""
+        del self._leftvecs[start + 1:]
+        del self._rightvecs[len(self._eigvec) - stop + 1:]
+
+
+def _eig_bs_leftvec_add(leftvec, mpo_lten, mps_lten):
+    """Block-sparse version of :func:`_eig_leftvec_add`"""
+    # Legs: mpo bond, cc mps bond, physical leg, right mps bond
+    res = blocksparse.tensordot(leftvec, mps_lten, ((0,), (0,)))
+    # Legs: cc mps bond, right mps bond, physical leg, right mpo bond
+    res = blocksparse.tensordot(res, mpo_lten, ((0, 2), (0, 2)))
+    return blocksparse.tensordot(res, mps_lten.conj(), ((0, 2), (0, 1)))
+
+
+def _eig_bs_rightvec_add(rightvec, mpo_lten, mps_lten):
+    """Block-sparse version of :func:`_eig_rightvec_add`"""
+    # Legs: left mps bond, physical leg, mpo bond, cc mps bond
+    res = blocksparse.tensordot(mps_lten, rightvec, ((2,), (0,)))
+    # Legs: left mpo bond, physical leg, left mps bond, cc mps bond
+    res = blocksparse.tensordot(mpo_lten, res, ((2, 3), (1, 2)))
+    res = blocksparse.tensordot(res, mps_lten.conj(), ((1, 3), (1, 2)))
+    return res.transpose((1, 0, 2))
+
+
+def _eig_bs_local_op(leftvec, mpo_ltens, rightvec, legs, modulus):
+    """Local operator of :func:`eig` for block-sparse MPAs
+
+    The operator acts on the allowed blocks of a tensor with charge zero
+    and ``legs``, i.e. the product of the local tensors of the
+    eigenvector on the sites of ``mpo_ltens``. The blocks are stacked
+    into a vector in the order of ``keys``.
+
+    :returns: ``op, keys, shapes`` where ``op`` is a
+        :class:`scipy.sparse.linalg.LinearOperator`
+
+    """
+    zero = blocksparse.BlockSparseTensor(legs, {}, modulus)
+    keys = [key for key in it.product(*(leg.charges for leg in legs))
+            if zero.allowed(key)]
+    shapes = [tuple(leg.dim(q) for leg, q in zip(legs, key)) for key in keys]
+    offsets = np.cumsum([0] + [int(np.prod(shape)) for shape in shapes])
+    dtype = np.result_type(leftvec.dtype, rightvec.dtype,
+                           *(lten.dtype for lten in mpo_ltens))
+
+    def matvec(vec):
+        blocks = {key: vec[start:stop].reshape(shape) for key, shape, start,
+                  stop in zip(keys, shapes, offsets[:-1], offsets[1:])}
+        # Legs: mpo bond, cc mps bond, physical legs, right mps bond
+        res = blocksparse.tensordot(
+            leftvec, blocksparse.BlockSparseTensor(legs, blocks, modulus),
+            ((0,), (0,)))
+        for mpo_lten in mpo_ltens:
+            # Legs: cc mps bond, physical legs (all but the current one),
+            # right mps bond, physical legs (done), mpo bond
+            res = blocksparse.tensordot(res, mpo_lten, ((0, 2), (0, 2)))
+            # Move mpo bond to the front and the cc mps bond after the
+            # remaining physical legs
+            axes = [res.ndim - 1, 0] + list(range(1, res.ndim - 1))
+            res = res.transpose(axes)
+        # Legs: mpo bond, cc mps bond, right mps bond, physical legs
+        res = blocksparse.tensordot(res, rightvec, ((2, 0), (0, 1)))
+        # Legs: cc mps bond, physical legs, cc mps bond
+        result = np.zeros(offsets[-1], dtype=np.result_type(dtype, vec))
+        for key, start, stop in zip(keys, offsets[:-1], offsets[1:]):
+            block = res.blocks.get(key)
+            if block is not None:
+                result[start:stop] = block.ravel()
+        return result
+
+    op = sp.linalg.LinearOperator((offsets[-1],) * 2, matvec=matvec,
+                                  dtype=dtype)
+    return op, keys, shapes
+
+
+def _eig_bs_minimize_locally(leftvec, mpo_ltens, rightvec, eigvec_ltens,
+                             eigs, max_rank, absorb):
+    """Block-sparse version of :func:`_eig_minimize_locally`
+
+    :param absorb: ``'right'`` or ``'left'``: The local tensor of the
+        result on the rightmost or leftmost site is not canonical (see
+        :func:`mpnum.blocksparse.split`)
+    :returns: mineigval, mineigval_eigvec_ltens, truncerr
+
+    """
+    eigvec_lten = eigvec_ltens[0]
+    for lten in eigvec_ltens[1:]:
+        eigvec_lten = blocksparse.tensordot(eigvec_lten, lten,
+                                            ((eigvec_lten.ndim - 1,), (0,)))
+    op, keys, shapes = _eig_bs_local_op(leftvec, mpo_ltens, rightvec,
+                                        eigvec_lten.legs, eigvec_lten.modulus)
+    v0 = np.concatenate([eigvec_lten.blocks[key].ravel()
+                         if key in eigvec_lten.blocks
+                         else np.zeros(int(np.prod(shape)))
+                         for key, shape in zip(keys, shapes)])
+    # ARPACK needs at least three states, but the charge sector may have
+    # fewer. Acting on ``reps`` copies of the sector repeats each
+    # eigenvalue ``reps`` times and leaves the selection to ``eigs``.
+    reps = -(-3 // op.shape[0])
+    if reps > 1:
+        op = _eig_bs_repeat(op, reps)
+        v0 = np.tile(v0, reps)
+    eigval, eigvec = eigs(op, v0=v0 if v0.any() else None)
+    if eigvec.ndim == 2:
+        if eigval.shape != (1,) or eigvec.shape[1] != 1:
+            raise ValueError('eigs() must return exactly one eigenvalue')
+        eigvec = eigvec[:, 0]
+    eigval = eigval.flat[0]
+    if reps > 1:
+        # Each copy is zero or an eigenvector for the same eigenvalue
+        eigvec = eigvec.reshape((reps, -1))
+        eigvec = eigvec[np.argmax(np.linalg.norm(eigvec, axis=1))]
+        eigvec = eigvec / np.linalg.norm(eigvec)
+
+    offsets = np.cumsum([0] + [int(np.prod(shape)) for shape in shapes])
+    blocks = {key: eigvec[start:stop].reshape(shape) for key, shape, start,
+              stop in zip(keys, shapes, offsets[:-1], offsets[1:])}
+    rest = blocksparse.BlockSparseTensor(eigvec_lten.legs, blocks,
+                                         eigvec_lten.modulus)
+    ltens, truncerr = [], []
+    if absorb == 'right':
+        for _ in eigvec_ltens[1:]:
+            u, rest, err = blocksparse.split(rest, 2, rank=max_rank)
+            ltens.append(u)
+            truncerr.append(err)
+        ltens.append(rest)
+    else:
+        for _ in eigvec_ltens[1:]:
+            rest, v, err = blocksparse.split(rest, rest.ndim - 2,
+                                             rank=max_rank, absorb='left')
+            ltens.insert(0, v)
+            truncerr.insert(0, err)
+        ltens.insert(0, rest)
+    return eigval, ltens, np.array(truncerr)
+
+
+def _eig_bs_repeat(op, reps):
+    """Local operator ``op`` acting on ``reps`` copies of its domain"""
+    size = op.shape[0]
+
+    def matvec(vec):
+        return np.concatenate([op.matvec(part) for part in
+                               np.reshape(vec, (reps, size))])
+
+    return sp.linalg.LinearOperator((reps * size,) * 2, matvec=matvec,
+                                    dtype=op.dtype)
+
+
+def _eig_bs_move_center(eigvec, center, start, stop):
+    """Move the non-canonical site of ``eigvec`` from ``center`` into the
+    sites ``[start:stop]``
+
+    :returns: New position of the non-canonical site
+
+    """
+    while center < start:
+        lten = eigvec.lt[center]
+        u, v, _ = blocksparse.split(lten, lten.ndim - 1)
+        eigvec.lt[center] = u
+        eigvec.lt[center + 1] = blocksparse.tensordot(
+            v, eigvec.lt[center + 1], ((1,), (0,)))
+        center += 1
+    while center >= stop:
+        u, v, _ = blocksparse.split(eigvec.lt[center], 1, absorb='left')
+        eigvec.lt[center] = v
+        lten = eigvec.lt[center - 1]
+        eigvec.lt[center - 1] = blocksparse.tensordot(
+            lten, u, ((lten.ndim - 1,), (0,)))
+        center -= 1
+    return center
+
+
+def _eig_blocksparse(mpo, num_sweeps, var_sites, startvec, eigs, eigval_tol,
+                     overlap_tol, return_history, rank_schedule):
+    """Implement :func:`eig` for a
+    :class:`~mpnum.blocksparse.BlockSparseMPArray`
+
+    The sweeps are the same as in :func:`eig`. The non-canonical site of
+    the eigenvector is tracked in ``center`` because
+    :class:`~mpnum.blocksparse.BlockSparseMPArray` does not keep track of
+    its canonical form.
+
+    """
+    if startvec is None:
+        raise ValueError('Block-sparse MPOs require a block-sparse startvec, '
+                         'which fixes the charge sector')
+    assert mpo.charge == 0, 'The MPO must conserve the charge'
+    if var_sites == 1 or rank_schedule is None:
+        # The rank of eigvec can only grow beyond the rank of the start
+        # vector if var_sites > 1 and rank_schedule is given
+        ranks = startvec.ranks
+        if any(rank12 == (1, 1)
+               for rank12 in zip((1,) + ranks, ranks + (1,))):
+            raise ValueError(
+                'startvec must not contain two consecutive ranks 1 unless '
+                'var_sites > 1 and rank_schedule is given, ranks including '
+                'dummy values = (1,) + {!r} + (1,)'.format(ranks))
+    nr_sites = len(mpo)
+    eigvec = startvec.copy()
+    eigvec.canonicalize(right=1)
+    center = 0
+    envs = _EigBlockSparseEnvironments(eigvec, mpo)
+
+    history = []
+    track_overlap = overlap_tol is not None or return_history
+    default_rank = max(eigvec.ranks)
+    for num_sweep in range(num_sweeps):
+        start_time = time.time()
+        eigvals, truncerrs = [], []
+        last_eigvec = eigvec.copy() if track_overlap and num_sweep > 0 \
+            else None
+        max_rank = _eig_schedule(rank_schedule, num_sweep) or default_rank
+        positions = [(pos, 'right') for pos in
+                     range(nr_sites - var_sites + 1) if pos > 0 or
+                     num_sweep == 0]
+        positions += [(pos, 'left') for pos in
+                      reversed(range(nr_sites - var_sites))]
+        for pos, absorb in positions:
+            pos_end = pos + var_sites
+            new_center = _eig_bs_move_center(eigvec, center, pos, pos_end)
+            if new_center != center:
+                envs.changed(min(center, new_center),
+                             max(center, new_center) + 1)
+            eigval, eigvec_ltens, truncerr = _eig_bs_minimize_locally(
+                envs.left(pos), mpo.lt[pos:pos_end], envs.right(pos_end),
+                eigvec.lt[pos:pos_end], eigs, max_rank, absorb)
+            eigvals.append(eigval)
+            truncerrs.append(truncerr)
+            eigvec.lt[pos:pos_end] = eigvec_ltens
+            envs.changed(pos, pos_end)
+            center = pos_end - 1 if absorb == 'right' else pos
+
+        if _eig_sweep_finished(history, eigvals, truncerrs, start_time, eigvec,
+                               last_eigvec, eigval_tol, overlap_tol):
+            break
+
+    if return_history:
+        return eigval, eigvec, history
+    return eigval, eigvec
+
+
 def eig(mpo, num_sweeps, var_sites=2,
-        startvec=None, startvec_rank=None, randstate=None, eigs=None):
+        startvec=None, startvec_rank=None, randstate=None, eigs=None,
+        matfree=False, eigval_tol=None, overlap_tol=None,
+        return_history=False, rank_schedule=None, expansion=None):
     r"""Iterative search for MPO eigenvalues
 
     .. note::
@@ -376,18 +941,57 @@ def eig(mpo, num_sweeps, var_sites=2,
     :code:`var_sites > 1`, it is called "multi-site DMRG".
 
     :param MPArray mpo: A matrix product operator (MPA with two physical legs)
-    :param int num_sweeps: Number of sweeps to do (required)
+    :param int num_sweeps: Maximal number of sweeps to do (required)
     :param int var_sites: Number of neighbouring sites to be varied
         simultaneously
     :param startvec: Initial guess for eigenvector (default: random MPS with
         rank `startvec_rank`)
-    :param startvec_rank: Rank of random start vector (required and
-        used only if no start vector is given)
+    :param startvec_rank: Rank of random start vector (used only if no
+        start vector is given; default: first entry of
+        ``rank_schedule``; one of the two is required in this case)
     :param randstate: ``numpy.random.RandomState`` instance or ``None``
     :param eigs: Function which computes one eigenvector of the local
         eigenvalue problem on :code:`var_sites` sites
-
-    :returns: eigval, eigvec_mpa
+    :param rank_schedule: Maximal rank of the eigenvector, either a
+        single integer or a sequence with one entry per sweep, e.g.
+        ``(16, 64, 256)``. The last entry is used for all remaining
+        sweeps. (default: largest rank of the start vector)
+    :param expansion: Mixing factor :math:`\alpha` for the subspace
+        expansion of single-site updates, either a single float or one
+        value per sweep as for ``rank_schedule``. Requires
+        :code:`var_sites = 1`. (default: ``None``, no expansion)
+    :param matfree: If ``True``, pass the local operator to :code:`eigs`
+        as :class:`scipy.sparse.linalg.LinearOperator` which applies the
+        left vector, the MPO tensors and the right vector one after
+        another. This avoids building the dense local operator of size
+        :math:`(D^2 d^k)^2` for rank :math:`D`, local dimension :math:`d`
+        and :code:`k = var_sites`. (default: ``False``)
+    :param eigval_tol: Stop sweeping if the eigenvalue changed by at most
+        this value during the last sweep (default: ``None``)
+    :param overlap_tol: Stop sweeping if :math:`1 - \vert \langle
+        \psi_\mathrm{last} \vert \psi \rangle \vert` is at most this
+        value, where :math:`\vert \psi_\mathrm{last} \rangle` is the
+        eigenvector after the previous sweep (default: ``None``)
+    :param return_history: Also return a list with one dict of
+        diagnostics per sweep (default: ``False``)
+
+    :returns: eigval, eigvec_mpa or, if ``return_history`` is ``True``,
+        eigval, eigvec_mpa, history
+
+    If both ``eigval_tol`` and ``overlap_tol`` are given, both criteria
+    must be satisfied to stop before :code:`num_sweeps` sweeps have been
+    done. Each entry of ``history`` contains the following keys:
+
+    - ``'eigvals'``: Eigenvalues from the local minimizations in the
+      order they have been performed
+    - ``'truncerrs'``: Array of shape :code:`(len(eigvals), var_sites -
+      1)` with the weight discarded on each bond when compressing the
+      results of the local minimizations; the first column refers to the
+      leftmost bond of the local update
+    - ``'truncerr'``: Total weight discarded during the sweep
+    - ``'overlap'``: :math:`\vert \langle \psi_\mathrm{last} \vert
+      \psi \rangle \vert` as above (``None`` for the first sweep)
+    - ``'time'``: Wall time of the sweep in seconds
 
     The :code:`eigs` parameter defaults to
 
@@ -404,6 +1008,32 @@ def eig(mpo, num_sweeps, var_sites=2,
     parameter of :code:`eigsh()`. Otherwise, :code:`eigsh()` will work
     at machine precision which is rarely necessary.
 
+    Single-site updates (:code:`var_sites = 1`) cannot increase the rank
+    of the eigenvector by themselves. Supplying ``expansion`` enables
+    the subspace expansion of [HMSW15]_: After each local update, the
+    local tensor is enlarged by :math:`\alpha` times the left (right)
+    vector and the MPO applied to it, and the new bond is truncated to
+    the rank given by ``rank_schedule``. This lets the rank grow
+    according to ``rank_schedule`` at roughly the cost of single-site
+    updates. Typical values of :math:`\alpha` are between
+    :math:`10^{-4}` and :math:`10^{-1}` (relative to the norm of the
+    MPO); it is advisable to decrease :math:`\alpha` in later sweeps.
+    For :code:`var_sites > 1`, the rank of the eigenvector grows
+    according to ``rank_schedule`` without expansion.
+
+    :code:`mpo` can also be a
+    :class:`~mpnum.blocksparse.BlockSparseMPArray` with charge zero. In
+    this case, a block-sparse ``startvec`` is required (e.g. from
+    :func:`mpnum.blocksparse.product_state`); its charge selects the
+    sector in which the eigenvector is searched. The local operator is
+    always applied block by block as
+    :class:`scipy.sparse.linalg.LinearOperator`, so :code:`matfree` has
+    no effect. :code:`startvec_rank`, :code:`randstate` and
+    :code:`expansion` are not supported. If :code:`var_sites = 1` or no
+    ``rank_schedule`` is given, the rank cannot grow and ``startvec``
+    must not contain two consecutive ranks 1 (including the dummy ranks
+    at the ends).
+
     .. note::
 
        One should keep in mind that a variational method (such as the
@@ -420,10 +1050,10 @@ def eig(mpo, num_sweeps, var_sites=2,
 
     .. code::plain
 
-       leftvecs[i] is L_{i-1}  \
-       rightvecs[i] is R_{i}   |  See Fig. 38 and Eq. (191) on p. 62.
-       mpo[i] is W_{i}         /
-       eigvec[i] is M_{i}         This is just the MPS matrix.
+       envs.left(i) is L_{i-1}      \
+       envs.right(i + 1) is R_{i}   |  See Fig. 38 and Eq. (191) on p. 62.
+       mpo[i] is W_{i}              /
+       eigvec[i] is M_{i}              This is just the MPS matrix.
 
     :code:`Psi^A_{i-1}` and :code:`Psi^B_{i}` are identity matrices because of
     normalization. (See Fig. 42 on p. 67 and the text; see also
@@ -432,16 +1062,11 @@ def eig(mpo, num_sweeps, var_sites=2,
     """
     # Possible TODOs:
     #  - Can we refactor this function into several shorter functions?
-    #  - compute the overlap between 'eigvec' from successive iterations
-    #    to check whether we have converged
     #  - compute var(H) = <psi| H^2 |psi> - (<psi| H |psi>)^2 every n-th
     #    iteration to check whether we have converged (this criterion is
     #    better but more expensive to compute)
     #  - increase the rank of 'eigvec' if var(H) remains above
     #    a given threshold
-    #  - for multi-site updates, track the error in the SVD truncation
-    #    (see comment there why)
-    #  - return these details for tracking errors in larger computations
 
     if eigs is None:
         eigs = ft.partial(sp.linalg.eigsh, k=1, tol=1e-6, which='LM')
@@ -450,8 +1075,22 @@ def eig(mpo, num_sweeps, var_sites=2,
     assert nr_sites - var_sites > 0, (
         'Require ({} =) nr_sites > var_sites (= {})'
         .format(nr_sites, var_sites))
+    if expansion is not None and var_sites != 1:
+        raise ValueError('expansion requires var_sites = 1')
+    if isinstance(mpo, blocksparse.BlockSparseMPArray):
+        if expansion is not None:
+            raise ValueError('expansion is not supported for block-sparse '
+                             'MPOs')
+        if startvec_rank is not None or randstate is not None:
+            raise ValueError('startvec_rank and randstate are not supported '
+                             'for block-sparse MPOs, supply startvec')
+        return _eig_blocksparse(mpo, num_sweeps, var_sites, startvec, eigs,
+                                eigval_tol, overlap_tol, return_history,
+                                rank_schedule)
 
     if startvec is None:
+        if startvec_rank is None:
+            startvec_rank = _eig_schedule(rank_schedule, 0)
         if startvec_rank is None:
             raise ValueError('`startvec_rank` required if `startvec` is None')
         if startvec_rank == 1:
@@ -483,28 +1122,30 @@ def eig(mpo, num_sweeps, var_sites=2,
     #
     #   range(pos, pos_end),  pos_end = pos + var_sites
     #
-    # leftvecs[pos] and rightvecs[pos] contain the vectors needed to
-    # construct that operator for that. Therefore, leftvecs[pos] is
-    # constructed from matrices on
-    #
-    #   range(0, pos - 1)
+    # envs.left(pos) and envs.right(pos_end) contain the vectors needed to
+    # construct that operator for that. They are constructed from
+    # matrices on
     #
-    # and rightvecs[pos] is constructed from matrices on
+    #   range(0, pos) and range(pos_end, nr_sites),
     #
-    #   range(pos_end, nr_sites),  pos_end = pos + var_sites
+    # respectively, and only recomputed if these matrices have changed.
     eigvec = startvec
     eigvec.canonicalize(right=1)
-    leftvecs = [np.array(1, ndmin=3)] + [None] * (nr_sites - var_sites)
-    rightvecs = [None] * (nr_sites - var_sites) + [np.array(1, ndmin=3)]
-    for pos in reversed(range(nr_sites - var_sites)):
-        rightvecs[pos] = _eig_rightvec_add(rightvecs[pos + 1],
-                                           mpo.lt[pos + var_sites],
-                                           eigvec.lt[pos + var_sites])
+    envs = mp.Environments(eigvec, mpo)
 
     # The iteration pattern is very similar to
     # :func:`mpnum.mparray.MPArray._adapt_to()`. See there for more
     # comments.
+    history = []
+    track_overlap = overlap_tol is not None or return_history
+    default_rank = max(eigvec.ranks)
     for num_sweep in range(num_sweeps):
+        start_time = time.time()
+        eigvals, truncerrs = [], []
+        last_eigvec = eigvec.copy() if track_overlap and num_sweep > 0 \
+            else None
+        max_rank = _eig_schedule(rank_schedule, num_sweep) or default_rank
+        alpha = _eig_schedule(expansion, num_sweep)
         # Sweep from left to right
         for pos in range(nr_sites - var_sites + 1):
             if pos == 0 and num_sweep > 0:
@@ -513,14 +1154,20 @@ def eig(mpo, num_sweeps, var_sites=2,
 
             if pos > 0:
                 eigvec.canonicalize(left=pos)
-                rightvecs[pos - 1] = None
-                leftvecs[pos] = _eig_leftvec_add(
-                    leftvecs[pos - 1], mpo.lt[pos - 1], eigvec.lt[pos - 1])
             pos_end = pos + var_sites
-            eigval, eigvec_lten = _eig_minimize_locally(
-                leftvecs[pos], mpo.lt[pos:pos_end], rightvecs[pos],
-                eigvec.lt[pos:pos_end], eigs)
-            eigvec.lt[pos:pos_end] = eigvec_lten
+            eigval, eigvec_lten, truncerr = _eig_minimize_locally(
+                envs.left(pos), mpo.lt[pos:pos_end], envs.right(pos_end),
+                eigvec.lt[pos:pos_end], eigs, matfree, max_rank)
+            eigvals.append(eigval)
+            truncerrs.append(truncerr)
+            if alpha is not None and pos_end < nr_sites:
+                eigvec_lten = _eig_expand_right(
+                    envs.left(pos), mpo.lt[pos], eigvec_lten[0],
+                    eigvec.lt[pos_end], alpha, max_rank)
+                eigvec.lt.update(slice(pos, pos_end + 1), eigvec_lten,
+                                 canonicalization=('left', None))
+            else:
+                eigvec.lt[pos:pos_end] = eigvec_lten
 
         # Sweep from right to left (don't do last site again)
         for pos in reversed(range(nr_sites - var_sites)):
@@ -528,19 +1175,33 @@ def eig(mpo, num_sweeps, var_sites=2,
             if pos < nr_sites - var_sites:
                 # We always do this, because we don't do the last site again.
                 eigvec.canonicalize(right=pos_end)
-                leftvecs[pos + 1] = None
-                rightvecs[pos] = _eig_rightvec_add(
-                    rightvecs[pos + 1], mpo.lt[pos_end], eigvec.lt[pos_end])
-            eigval, eigvec_lten = _eig_minimize_locally(
-                leftvecs[pos], mpo.lt[pos:pos_end], rightvecs[pos],
-                eigvec.lt[pos:pos_end], eigs)
-            eigvec.lt[pos:pos_end] = eigvec_lten
-
+            eigval, eigvec_lten, truncerr = _eig_minimize_locally(
+                envs.left(pos), mpo.lt[pos:pos_end], envs.right(pos_end),
+                eigvec.lt[pos:pos_end], eigs, matfree, max_rank)
+            eigvals.append(eigval)
+            truncerrs.append(truncerr)
+            if alpha is not None and pos > 0:
+                eigvec_lten = _eig_expand_left(
+                    envs.right(pos_end), mpo.lt[pos], eigvec_lten[0],
+                    eigvec.lt[pos - 1], alpha, max_rank)
+                eigvec.lt.update(slice(pos - 1, pos_end), eigvec_lten,
+                                 canonicalization=(None, 'right'))
+            else:
+                eigvec.lt[pos:pos_end] = eigvec_lten
+
+        if _eig_sweep_finished(history, eigvals, truncerrs, start_time, eigvec,
+                               last_eigvec, eigval_tol, overlap_tol):
+            break
+
+    if return_history:
+        return eigval, eigvec, history
     return eigval, eigvec
 
 
 def eig_sum(mpas, num_sweeps, var_sites=2,
-            startvec=None, startvec_rank=None, randstate=None, eigs=None):
+            startvec=None, startvec_rank=None, randstate=None, eigs=None,
+            matfree=False, eigval_tol=None, overlap_tol=None,
+            return_history=False, workers=None):
     r"""Iterative search for eigenvalues of a sum of MPOs/MPSs
 
     Try to compute the ground state of the sum of the objects in
@@ -558,6 +1219,19 @@ def eig_sum(mpas, num_sweeps, var_sites=2,
               the time being, refer to the benchmark test.
 
     :param mpas: A sequence of MPOs or MPSs
+    :param matfree: If ``True``, the local operator is a
+        :class:`scipy.sparse.linalg.LinearOperator` which applies each
+        summand separately: MPOs apply their left and right vectors
+        lazily, MPSs contribute a rank-one update :math:`\vert v \rangle
+        \langle v \vert x \rangle`. The memory required for the local
+        operator is then linear in the number of summands times the size
+        of the local vector. (default: ``False``)
+    :param workers: Number of threads used to update the environments
+        and to construct and apply the local operators of the summands
+        in parallel. Most of the work is done by BLAS, which releases
+        the GIL. The summands are always added in the same order, so
+        the result does not depend on ``workers``. (default: ``None``,
+        i.e. no threads)
 
     Remaining parameters and description: See :func:`eig`.
 
@@ -569,7 +1243,6 @@ def eig_sum(mpas, num_sweeps, var_sites=2,
         eigs = ft.partial(sp.linalg.eigsh, k=1, tol=1e-6)
 
     mpas = list(mpas)
-    nr_mpas = len(mpas)
     nr_sites = len(mpas[0])
     assert all(len(m) == nr_sites for m in mpas)
     ndims = [m.ndims[0] for m in mpas]
@@ -598,6 +1271,30 @@ def eig_sum(mpas, num_sweeps, var_sites=2,
         ('startvec must not contain two consecutive ranks 1, '
          'ranks including dummy values = (1,) + {!r} + (1,)'
          .format(startvec.ranks))
+    pool = ThreadPool(workers) if workers is not None else None
+    try:
+        eigval, eigvec, history = _eig_sum_sweeps(
+            mpas, ndims, startvec, num_sweeps, var_sites, eigs, matfree,
+            eigval_tol, overlap_tol, return_history, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if return_history:
+        return eigval, eigvec, history
+    return eigval, eigvec
+
+
+def _eig_sum_sweeps(mpas, ndims, eigvec, num_sweeps, var_sites, eigs,
+                    matfree, eigval_tol, overlap_tol, return_history, pool):
+    """Implement the sweeps of :func:`eig_sum`
+
+    :param eigvec: Start vector, modified in place
+    :param pool: :class:`multiprocessing.pool.ThreadPool` or ``None``
+    :returns: eigval, eigvec, history
+
+    """
     # For
     #
     #   pos in range(nr_sites - var_sites),
@@ -615,7 +1312,8 @@ def eig_sum(mpas, num_sweeps, var_sites=2,
     # and rightvecs[pos] is constructed from matrices on
     #
     #   range(pos_end, nr_sites),  pos_end = pos + var_sites
-    eigvec = startvec
+    nr_mpas = len(mpas)
+    nr_sites = len(mpas[0])
     eigvec.canonicalize(right=1)
     leftvecs = [[np.array(1, ndmin=1 + pl) for pl in ndims]]
     leftvecs.extend([None] * nr_mpas for _ in range(nr_sites - var_sites))
@@ -624,12 +1322,18 @@ def eig_sum(mpas, num_sweeps, var_sites=2,
     for pos in reversed(range(nr_sites - var_sites)):
         _eig_sum_rightvec_add(
             mpas, ndims, rightvecs[pos], rightvecs[pos + 1],
-            pos + var_sites, eigvec.lt[pos + var_sites])
+            pos + var_sites, eigvec.lt[pos + var_sites], pool)
 
     # The iteration pattern is very similar to
     # :func:`mpnum.mparray.MPArray._adapt_to()`. See there for more
     # comments.
+    history = []
+    track_overlap = overlap_tol is not None or return_history
     for num_sweep in range(num_sweeps):
+        start_time = time.time()
+        eigvals, truncerrs = [], []
+        last_eigvec = eigvec.copy() if track_overlap and num_sweep > 0 \
+            else None
         # Sweep from left to right
         for pos in range(nr_sites - var_sites + 1):
             if pos == 0 and num_sweep > 0:
@@ -641,12 +1345,14 @@ def eig_sum(mpas, num_sweeps, var_sites=2,
                 rightvecs[pos - 1] = [None] * nr_mpas
                 _eig_sum_leftvec_add(
                     mpas, ndims, leftvecs[pos], leftvecs[pos - 1],
-                    pos - 1, eigvec.lt[pos - 1])
+                    pos - 1, eigvec.lt[pos - 1], pool)
             pos_end = pos + var_sites
-            eigval, eigvec_lten = _eig_sum_minimize_locally(
+            eigval, eigvec_lten, truncerr = _eig_sum_minimize_locally(
                 mpas, ndims, leftvecs[pos], slice(pos, pos_end), rightvecs[pos],
-                eigvec.lt[pos:pos_end], eigs)
+                eigvec.lt[pos:pos_end], eigs, matfree, pool)
             eigvec.lt[pos:pos_end] = eigvec_lten
+            eigvals.append(eigval)
+            truncerrs.append(truncerr)
 
         # Sweep from right to left (don't do last site again)
         for pos in reversed(range(nr_sites - var_sites)):
@@ -657,10 +1363,16 @@ def eig_sum(mpas, num_sweeps, var_sites=2,
                 leftvecs[pos + 1] = [None] * nr_mpas
                 _eig_sum_rightvec_add(
                     mpas, ndims, rightvecs[pos], rightvecs[pos + 1],
-                    pos_end, eigvec.lt[pos_end])
-            eigval, eigvec_lten = _eig_sum_minimize_locally(
+                    pos_end, eigvec.lt[pos_end], pool)
+            eigval, eigvec_lten, truncerr = _eig_sum_minimize_locally(
                 mpas, ndims, leftvecs[pos], slice(pos, pos_end), rightvecs[pos],
-                eigvec.lt[pos:pos_end], eigs)
+                eigvec.lt[pos:pos_end], eigs, matfree, pool)
             eigvec.lt[pos:pos_end] = eigvec_lten
+            eigvals.append(eigval)
+            truncerrs.append(truncerr)
 
-    return eigval, eigvec
+        if _eig_sweep_finished(history, eigvals, truncerrs, start_time, eigvec,
+                               last_eigvec, eigval_tol, overlap_tol):
+            break
+
+    return eigval, eigvec, history
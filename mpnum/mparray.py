@@ -18,7 +18,11 @@
 from __future__ import absolute_import, division, print_function
 
 import collections
+import functools as ft
 import itertools as it
+import json
+import tempfile
+import time
 
 import mpnum as mp
 import numpy as np
@@ -28,13 +32,14 @@ from six.moves import range, zip, zip_longest
 
 from ._named_ndarray import named_ndarray
 from .mpstruct import LocalTensors
-from .utils import (block_diag, global_to_local, local_to_global, matdot,
-                    truncated_svd)
+from .utils import (block_diag, contraction_plan, global_to_local,
+                    local_to_global, matdot, truncated_svd)
 
-__all__ = ['MPArray', 'dot', 'inject', 'inner', 'local_sum', 'localouter',
-           'norm', 'normdist', 'chain', 'partialdot', 'partialtrace',
-           'prune', 'regular_slices', 'sandwich', 'embed_slice',
-           'trace', 'diag', 'sumup', 'full_rank']
+__all__ = ['MPArray', 'Environments', 'dot', 'inject', 'inner', 'local_sum',
+           'localouter', 'norm', 'normdist', 'chain', 'partialdot',
+           'partialtrace', 'prune', 'regular_slices', 'sandwich',
+           'embed_slice', 'trace', 'diag', 'sumup', 'full_rank',
+           'compress_sum', 'dot_compressed', 'gram']
 
 
 class MPArray(object):
@@ -78,6 +83,8 @@ class MPArray(object):
         """
         self._lt = ltens if isinstance(ltens, LocalTensors) \
             else LocalTensors(ltens)
+        # ``(versions, norm)``, see :func:`norm`
+        self._norm_cache = None
 
     def copy(self):
         """Returns a deep copy of the MPA"""
@@ -101,6 +108,49 @@ class MPArray(object):
             astype = type(self)
         return astype(lt[:, i, ..., :] for i, lt in zip(indices, self._lt))
 
+    def get_many(self, indices, chunksize=None):
+        """Returns the entries of ``self`` at many indices
+
+        Same as ``np.array([self.get(idx).to_array() for idx in
+        indices])``, but all indices are evaluated at once: On each site,
+        the matrices selected by fancy indexing are multiplied into the
+        partial products with a batched matrix product.
+
+        :param indices: Integer array of shape ``(n, len(self))``; each
+            row gives the index on each site
+        :param chunksize: Number of indices processed at once; memory
+            scales as ``chunksize * D**2`` for rank ``D`` (default:
+            ``None``, i.e. all indices at once)
+        :returns: ``np.ndarray`` of shape ``(n,)``
+
+        The MPA must have one physical leg per site (use :func:`ravel` for
+        MPOs).
+
+        """
+        indices = np.asarray(indices)
+        assert indices.ndim == 2 and indices.shape[1] == len(self), \
+            "indices.shape={} not allowed".format(indices.shape)
+        assert all(ndim == 1 for ndim in self.ndims), \
+            "Need one physical leg per site, use ravel()"
+        nr_indices = len(indices)
+        chunksize = max(nr_indices, 1) if chunksize is None else chunksize
+        if chunksize < 1:
+            raise ValueError('chunksize must be at least 1, got {}'
+                             .format(chunksize))
+        # Axes: physical, left virtual, right virtual
+        mats = [lt.transpose((1, 0, 2)) for lt in self._lt]
+
+        result = np.empty(nr_indices, dtype=self.dtype)
+        for start in range(0, nr_indices, chunksize):
+            idx = indices[start:start + chunksize]
+            # Axes: index, bond
+            lvec = mats[0][idx[:, 0], 0, :]
+            for site in range(1, len(self)):
+                lvec = np.matmul(lvec[:, None, :], mats[site][idx[:, site]])
+                lvec = lvec[:, 0, :]
+            result[start:start + chunksize] = lvec[:, 0]
+        return result
+
     @property
     def lt(self):
         return self._lt
@@ -117,7 +167,7 @@ class MPArray(object):
         60
 
         """
-        return sum(lt.size for lt in self._lt)
+        return sum(int(np.prod(shape)) for shape in self._lt.shape)
 
     @property
     def dtype(self):
@@ -127,35 +177,46 @@ class MPArray(object):
     @property
     def ranks(self):
         """Tuple of ranks"""
-        return tuple(m.shape[0] for m in self._lt[1:])
+        return tuple(shape[0] for shape in self._lt.shape[1:])
 
     @property
     def shape(self):
         """List of tuples with the dimensions of each tensor leg at each site"""
-        return tuple((m.shape[1:-1]) for m in self._lt)
+        return tuple(shape[1:-1] for shape in self._lt.shape)
 
     @property
     def ndims(self):
         """Tuple of number of legs per site"""
-        return tuple(lten.ndim - 2 for lten in self._lt)
+        return tuple(len(shape) - 2 for shape in self._lt.shape)
 
     @property
     def canonical_form(self):
         """See :py:attr:`.mpstruct.LocalTensors.canonical_form`"""
         return self._lt.canonical_form
 
-    def dump(self, target):
+    def dump(self, target, compression=None, compression_opts=None,
+             chunks=None):
         """Serializes MPArray to :code:`h5py.Group`. Recover using
         :func:`~load`.
 
         :param target: :code:`h5py.Group` the instance should be saved to or
             path to h5 file (it's then serialized to /)
+        :param compression: Compression filter for the local tensors, e.g.
+            ``'gzip'`` or ``'lzf'`` (default: ``None``, i.e. uncompressed)
+        :param compression_opts: Options of the compression filter, e.g. the
+            gzip level from 0 to 9 (default: ``None``)
+        :param chunks: Chunk shape for the local tensors passed to
+            :code:`h5py.Group.create_dataset`; ``True`` lets h5py choose
+            the chunk shape of each site. Compression implies chunking.
+            (default: ``None``)
 
         """
         if isinstance(target, str):
             import h5py
             with h5py.File(target, 'w') as outfile:
-                return self.dump(outfile)
+                return self.dump(outfile, compression=compression,
+                                 compression_opts=compression_opts,
+                                 chunks=chunks)
 
         for prop in ('ranks', 'shape'):
             # these are only saved for convenience
@@ -166,27 +227,150 @@ class MPArray(object):
         target.attrs['canonical_form'] = self.canonical_form
 
         for site, lten in enumerate(self._lt):
-            target[str(site)] = lten
+            target.create_dataset(str(site), data=lten, chunks=chunks,
+                                  compression=compression,
+                                  compression_opts=compression_opts)
 
     @classmethod
-    def load(cls, source):
+    def load(cls, source, lazy=False, sites=None):
         """Deserializes MPArray from :code:`h5py.Group`. Serialize using
         :func:`~dump`.
 
         :param target: :code:`h5py.Group` containing serialized MPArray or
             path to a single h5 File containing serialized MPArray under /
+        :param lazy: If ``True``, local tensors are only read from the file
+            when they are accessed for the first time. The file must stay
+            open until then; if ``source`` is a path, the file is kept open
+            as long as unread local tensors remain. (default: ``False``)
+        :param sites: Slice of the sites to load (default: ``None``, i.e.
+            all sites). For a proper subset, the leftmost/rightmost local
+            tensor of the result can have a virtual leg of dimension
+            larger than one.
+
+        >>> from .factory import random_mpa
+        >>> import tempfile, os.path
+        >>> path = os.path.join(tempfile.mkdtemp(), 'mpa.h5')
+        >>> random_mpa(sites=6, ldim=2, rank=3).dump(path, compression='gzip')
+        >>> window = MPArray.load(path, lazy=True, sites=slice(2, 4))
+        >>> len(window), window.ranks, window.lt.shape[0]
+        (2, (3,), (3, 2, 3))
 
         """
         if isinstance(source, str):
             import h5py
+            if lazy:
+                # Datasets keep the file open, it is closed once all of them
+                # have been read
+                return cls.load(h5py.File(source, 'r'), lazy=True,
+                                sites=sites)
             with h5py.File(source, 'r') as infile:
-                return cls.load(infile)
+                return cls.load(infile, sites=sites)
+
+        sites = slice(None) if sites is None else sites
+        start, stop, step = sites.indices(source.attrs['len'])
+        assert step == 1, "Only contiguous sites can be loaded"
+        assert stop > start, "sites={} is empty".format(sites)
+
+        ltens = [source[str(i)] for i in range(start, stop)]
+        if not lazy:
+            ltens = [lten[()] for lten in ltens]
+        cform = _window_cform(source.attrs['canonical_form'], start, stop)
+        return cls(LocalTensors(ltens, cform=cform))
+
+    def dump_mmap(self, target):
+        """Serializes MPArray to a native binary file which can be memory
+        mapped by :func:`~load_mmap`.
+
+        The file starts with the magic string ``b'MPNUMMM1'``, the length
+        of the header as little-endian ``uint64`` and the header itself,
+        which is JSON with ``shape``, ``ranks``, ``canonical_form``,
+        ``dtype`` and the byte offset of each local tensor. The local tensors
+        follow as raw C-contiguous buffers, each aligned to
+        ``_MMAP_ALIGN`` bytes. All local tensors are stored with the dtype
+        :py:attr:`~dtype`.
+
+        :param target: Path of the file to write
 
-        ltens = [source[str(i)].value for i in range(source.attrs['len'])]
-        return cls(LocalTensors(ltens, cform=source.attrs['canonical_form']))
+        """
+        dtype = np.dtype(self.dtype)
+        offsets, offset = [], 0
+        for shape in self._lt.shape:
+            offsets.append(offset)
+            offset += _mmap_aligned(int(np.prod(shape)) * dtype.itemsize)
+        header = {'shape': self.shape, 'ranks': self.ranks,
+                  'canonical_form': [int(c) for c in self.canonical_form],
+                  'dtype': dtype.str, 'offsets': offsets}
+        header = json.dumps(header).encode('utf-8')
+        start = _mmap_aligned(len(_MMAP_MAGIC) + 8 + len(header))
+
+        with open(target, 'wb') as outfile:
+            outfile.write(_MMAP_MAGIC)
+            outfile.write(np.array(len(header), dtype='<u8').tobytes())
+            outfile.write(header)
+            for offset, lten in zip(offsets, self._lt):
+                outfile.seek(start + offset)
+                np.ascontiguousarray(lten, dtype=dtype).tofile(outfile)
+            # Extend the file to the aligned end of the last local tensor
+            outfile.truncate(start + _mmap_aligned(outfile.tell() - start))
 
     @classmethod
-    def from_array_global(cls, array, ndims=None, has_virtual=False):
+    def load_mmap(cls, source, sites=None):
+        """Deserializes MPArray from a file written by :func:`~dump_mmap`
+        without copying the local tensors.
+
+        The local tensors are read-only views on a :class:`numpy.memmap` of
+        the file, so only the header is read immediately and the operating
+        system pages in (and shares between processes) the data on access.
+        Operations which replace local tensors (e.g.
+        :func:`~canonicalize`) work as usual; the file is never modified.
+
+        :param source: Path of the file
+        :param sites: Slice of the sites to load, see :func:`~load`
+            (default: ``None``, i.e. all sites)
+
+        >>> from .factory import random_mpa
+        >>> import tempfile, os.path
+        >>> path = os.path.join(tempfile.mkdtemp(), 'mpa.mpnum')
+        >>> mpa = random_mpa(sites=6, ldim=2, rank=3)
+        >>> mpa.dump_mmap(path)
+        >>> loaded = MPArray.load_mmap(path)
+        >>> loaded.ranks, loaded.lt[2].flags.writeable
+        ((2, 3, 3, 3, 2), False)
+        >>> np.allclose(loaded.to_array(), mpa.to_array())
+        True
+
+        """
+        with open(source, 'rb') as infile:
+            magic = infile.read(len(_MMAP_MAGIC))
+            if magic != _MMAP_MAGIC:
+                raise ValueError("{} is not an MPArray file written by "
+                                 "dump_mmap".format(source))
+            length = int(np.frombuffer(infile.read(8), dtype='<u8')[0])
+            header = json.loads(infile.read(length).decode('utf-8'))
+        start = _mmap_aligned(len(_MMAP_MAGIC) + 8 + length)
+
+        sites = slice(None) if sites is None else sites
+        first, stop, step = sites.indices(len(header['shape']))
+        assert step == 1, "Only contiguous sites can be loaded"
+        assert stop > first, "sites={} is empty".format(sites)
+
+        dtype = np.dtype(header['dtype'])
+        ranks = [1] + list(header['ranks']) + [1]
+        buf = np.memmap(source, dtype=np.uint8, mode='r')
+        ltens = []
+        for site in range(first, stop):
+            shape = (ranks[site],) + tuple(header['shape'][site]) \
+                + (ranks[site + 1],)
+            offset = start + header['offsets'][site]
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            lten = buf[offset:offset + nbytes].view(dtype)
+            ltens.append(lten.reshape(shape))
+        cform = _window_cform(header['canonical_form'], first, stop)
+        return cls(LocalTensors(ltens, cform=cform))
+
+    @classmethod
+    def from_array_global(cls, array, ndims=None, has_virtual=False,
+                          rank=None, relerr=None):
         """Create MPA from array in global form.
 
         See :func:`mpnum.tools.global_to_local()` for global vs. local form.
@@ -201,10 +385,12 @@ class MPArray(object):
         assert array.ndim % ndims == 0, \
             "ndims invalid: {} is not multiple of {}".format(array.ndim, ndims)
         sites = array.ndim // ndims
-        return cls.from_array(global_to_local(array, sites), ndims, has_virtual)
+        return cls.from_array(global_to_local(array, sites), ndims,
+                              has_virtual, rank=rank, relerr=relerr)
 
     @classmethod
-    def from_array(cls, array, ndims=None, has_virtual=False):
+    def from_array(cls, array, ndims=None, has_virtual=False, rank=None,
+                   relerr=None):
         """Create MPA from array in local form.
 
         See :func:`mpnum.tools.global_to_local()` for global
@@ -234,6 +420,14 @@ class MPArray(object):
             or iterable over number of physical legs
         :param bool has_virtual: ``True`` if array already has indices for
             the left and right virtual legs
+        :param rank: Maximal rank of the result (default: ``None``)
+        :param relerr: Maximal fraction of discarded singular values on
+            each bond (default: ``None``)
+
+        If ``rank`` or ``relerr`` is given, the QR decompositions are
+        replaced by truncated SVDs, as in :func:`compress` with
+        ``method='svd'`` (TT-SVD). The result is still left-canonical.
+        This avoids building the MPA with exact ranks first.
 
         """
 
@@ -242,9 +436,88 @@ class MPArray(object):
 
         if not has_virtual:
             array = array[None, ..., None]
-        ltens = _extract_factors(array, ndims=ndims)
+        ltens = _extract_factors(array, ndims=ndims, rank=rank, relerr=relerr)
         return cls(LocalTensors(ltens, cform=(len(ltens) - 1, len(ltens))))
 
+    @classmethod
+    def from_array_streamed(cls, array, ndims=None, blocksize=2**22,
+                            right_sites=None, rank=None, relerr=None):
+        """Create MPA from a large array in local form, e.g. a
+        ``numpy.memmap``, which is read in blocks
+
+        The local tensors are split off from the right, a group of sites
+        at a time. We view ``array`` as matrix ``M`` whose rows and
+        columns are indexed by the physical legs of the remaining sites
+        and of the group. The rows of ``M`` are read in blocks of (about)
+        ``blocksize`` entries to compute the Gram matrix :math:`M^\\dagger
+        M`, whose eigenvectors provide the right singular vectors ``V`` of
+        ``M``. The adjoint of ``V`` is factorized in memory with
+        :func:`from_array` and the remainder ``M V`` is computed block by
+        block. The remainder takes the place of ``array`` for the next
+        group, with the new bond folded into the columns, until it has at
+        most ``blocksize`` entries and is factorized in memory.
+
+        Peak memory is a small multiple of ``blocksize`` entries.
+        Remainders with more than ``blocksize`` entries are written to
+        temporary files (see :func:`tempfile.TemporaryFile`), which need
+        less space than ``array`` if ``M`` has low rank.
+
+        .. note:: The Gram matrix resolves singular values only down to
+                  about the square root of the machine precision times the
+                  largest singular value; smaller ones are discarded.
+
+        :param array: Array in local form; must support ``reshape()``
+            without copying (e.g. a C-contiguous ``numpy.memmap``)
+        :param ndims: Number of physical legs per site (default
+            ``array.ndim``)
+        :param blocksize: Number of entries read at a time (default:
+            ``2**22``)
+        :param right_sites: Number of sites in each group (default:
+            largest number such that the Gram matrix has at most
+            ``blocksize`` entries, at least one)
+        :param rank: See :func:`from_array`
+        :param relerr: See :func:`from_array`
+
+        """
+        ndims = ndims if ndims is not None else array.ndim
+        assert array.ndim % ndims == 0, \
+            "ndims invalid: {} is not multiple of {}".format(array.ndim, ndims)
+        nr_sites = array.ndim // ndims
+        assert right_sites is None or 0 < right_sites < nr_sites, \
+            "right_sites={} not allowed".format(right_sites)
+        dims = [int(np.prod(array.shape[ndims * i:ndims * (i + 1)]))
+                for i in range(nr_sites)]
+
+        # `rest` has the physical legs of the first `left_sites` sites and
+        # the bond to the local tensors in `ltens`
+        rest, bond, left_sites, ltens = array, 1, nr_sites, []
+        while left_sites > 1 and rest.size > blocksize:
+            group = right_sites
+            if group is None:
+                group = 1
+                while group < left_sites - 1 and (bond * np.prod(
+                        dims[left_sites - group - 1:left_sites]))**2 \
+                        <= blocksize:
+                    group += 1
+            group = min(group, left_sites - 1)
+            cols = bond * int(np.prod(dims[left_sites - group:left_sites]))
+            vecs, rest = _streamed_split(rest.reshape((-1, cols)),
+                                         blocksize, rank, relerr)
+            split = ndims * (left_sites - group)
+            right = vecs.T.conj().reshape(
+                vecs.shape[1:] + array.shape[split:ndims * left_sites] +
+                (bond,))
+            right = cls.from_array(right, ndims, has_virtual=True, rank=rank,
+                                   relerr=relerr)
+            ltens = list(right.lt) + ltens
+            bond, left_sites = vecs.shape[1], left_sites - group
+
+        rest = np.asarray(rest).reshape(
+            (1,) + array.shape[:ndims * left_sites] + (bond,))
+        left = cls.from_array(rest, ndims, has_virtual=True, rank=rank,
+                              relerr=relerr)
+        return cls(list(left.lt) + ltens)
+
     @classmethod
     def from_kron(cls, factors):
         """Returns the (exact) representation of an n-fold  Kronecker (tensor)
@@ -256,32 +529,60 @@ class MPArray(object):
         # FIXME Do we still need this or shall we prefer mp.chain?
         return cls(a[None, ..., None] for a in factors)
 
-    def to_array(self):
+    def to_array(self, out=None, chunk_sites=None):
         """Return MPA as array in local form.
 
         See :func:`mpnum.tools.global_to_local()` for global
         vs. local form.
 
-        :returns: ndarray of shape :code:`sum(self.shape, ())`
+        :param out: Array of shape :code:`sum(self.shape, ())` (e.g. a
+            ``numpy.memmap``) to write the result to (default:
+            ``None``, i.e. allocate a new array)
+        :param chunk_sites: If ``out`` or ``chunk_sites`` is given,
+            the left and right halves of the chain are contracted
+            separately and the output is filled in blocks, one for each
+            value of the physical indices on the first ``chunk_sites``
+            sites. Besides ``out``, this requires memory for one block
+            and for the right half of the chain. (default: ``len(self)
+            // 4`` if ``out`` is given)
+        :returns: ndarray of shape :code:`sum(self.shape, ())` (``out``
+            if given)
 
         .. note:: Full arrays can require much more memory than
                   MPAs. (That's why you are using MPAs, right?)
 
         """
-        return _ltens_to_array(iter(self._lt))[0, ..., 0]
+        if out is None and chunk_sites is None:
+            return _ltens_to_array(iter(self._lt))[0, ..., 0]
+        if out is None:
+            out = np.empty(sum(self.shape, ()), dtype=self.dtype)
+        assert out.shape == sum(self.shape, ()), \
+            "out.shape={} does not match".format(out.shape)
+        chunk_sites = len(self) // 4 if chunk_sites is None else chunk_sites
+        _ltens_to_array_chunked(self, out, chunk_sites)
+        return out
 
-    def to_array_global(self):
+    def to_array_global(self, out=None, chunk_sites=None):
         """Return MPA as array in global form.
 
         See :func:`mpnum.tools.global_to_local()` for global
         vs. local form.
 
+        :param out: Array of shape :code:`sum(zip(*self.shape, ()))`
+            to write the result to, see :func:`to_array()`
+        :param chunk_sites: See :func:`to_array()`
         :returns: ndarray of shape :code:`sum(zip(*self.shape, ()))`
 
         See :func:`to_array()` for more details.
 
         """
-        return local_to_global(self.to_array(), sites=len(self))
+        if out is None and chunk_sites is None:
+            return local_to_global(self.to_array(), sites=len(self))
+        if out is None:
+            out = np.empty(sum(zip(*self.shape), ()), dtype=self.dtype)
+        # A transposed view, so ``to_array()`` writes to ``out``
+        self.to_array(global_to_local(out, sites=len(self)), chunk_sites)
+        return out
 
     def axis_iter(self, axes=0):
         """Returns an iterator yielding Sub-MPArrays of ``self`` by iterating
@@ -775,12 +1076,36 @@ class MPArray(object):
             :func:`~.utils.extmath.randomized_svd()` might speed up
             computations with no or little loss of accuracy.
 
+        :param return_truncerr: If ``True``, return ``(overlap,
+            truncerrs)`` where ``truncerrs[i]`` is the weight (sum of
+            squared singular values) discarded on the bond between sites
+            ``i`` and ``i + 1``. If the MPA was in canonical form before
+            the compression, the total discarded weight
+            ``truncerrs.sum()`` equals :math:`\| u - c \|^2`. Not
+            available for ``'var'``. (default: ``False``)
+
         .. rubric:: Parameters for ``'var'``:
 
         :param rank: Maximal rank for the result. Either
             ``startmpa`` or ``rank`` is required.
 
-        :param num_sweeps: Number of variational sweeps (required).
+        :param num_sweeps: Number of variational sweeps. Exactly one of
+            ``num_sweeps`` and ``max_sweeps`` is required.
+
+        :param tol: Stop sweeping as soon as the overlap :math:`\langle u
+            \vert c \rangle` changes by less than ``tol`` times its
+            value during one sweep. The overlap is obtained from the
+            environments of the sweep at negligible cost. (default:
+            ``None``, i.e. always do ``num_sweeps`` sweeps)
+
+        :param max_sweeps: Maximal number of sweeps if ``tol`` is given;
+            replaces ``num_sweeps``, which must not be given as well
+            (default: ``None``)
+
+        :param return_history: If ``True``, return ``(overlap, history)``
+            where ``history`` contains one dictionary per sweep with the
+            keys ``'overlap'`` and ``'time'`` (wall time of the sweep in
+            seconds). (default: ``False``)
 
         :param startmpa: Start vector, also fixes the rank
             of the result. Default: Random, with same norm as self.
@@ -803,9 +1128,9 @@ class MPArray(object):
         if method == 'svd':
             return self._compress_svd(**kwargs)
         elif method == 'var':
-            compr, overlap = self._compression_var(**kwargs)
-            self._lt = compr._lt
-            return overlap
+            result = self._compression_var(**kwargs)
+            self._lt = result[0]._lt
+            return result[1:] if len(result) > 2 else result[1]
         else:
             raise ValueError('{!r} is not a valid method'.format(method))
 
@@ -815,20 +1140,28 @@ class MPArray(object):
         Parameters: See :func:`~compress()`.
 
         :returns: ``(compressed_mpa, overlap)`` where ``overlap`` is the inner
-            product returned by :func:`~compress()`.
+            product returned by :func:`~compress()`. For ``method='svd'``
+            and ``return_truncerr=True``, return ``(compressed_mpa, overlap,
+            truncerrs)`` instead. For ``method='var'`` and
+            ``return_history=True``, return ``(compressed_mpa, overlap,
+            history)``.
 
         """
         if method == 'svd':
             target = self.copy()
-            overlap = target._compress_svd(**kwargs)
-            return target, overlap
+            result = target._compress_svd(**kwargs)
+            if kwargs.get('return_truncerr', False):
+                overlap, truncerrs = result
+                return target, overlap, truncerrs
+            return target, result
         elif method == 'var':
             return self._compression_var(**kwargs)
         else:
             raise ValueError('{!r} is not a valid method'.format(method))
 
     def _compress_svd(self, rank=None, relerr=None, direction=None,
-                      canonicalize=True, svdfunc=truncated_svd):
+                      canonicalize=True, svdfunc=truncated_svd,
+                      return_truncerr=False):
         """Compress `self` using SVD [:ref:`Sch11 <Sch11>`, Sec. 4.5.1]
 
         Parameters: See :func:`~compress()`.
@@ -836,7 +1169,8 @@ class MPArray(object):
         """
         if len(self) == 1:
             # Cannot do anything. Return perfect overlap.
-            return norm(self)**2
+            overlap = norm(self)**2
+            return (overlap, np.zeros(0)) if return_truncerr else overlap
 
         ln, rn = self.canonical_form
         default_direction = 'left' if len(self) - rn > ln else 'right'
@@ -846,30 +1180,44 @@ class MPArray(object):
         if direction == 'right':
             if canonicalize:
                 self.canonicalize(right=1)
-            for item in self._compress_svd_r(rank, relerr, svdfunc):
-                pass
-            return item
+            items = list(self._compress_svd_r(rank, relerr, svdfunc))
+            truncerrs = np.array([item[2] for item in items[:-1]])
         elif direction == 'left':
             if canonicalize:
                 self.canonicalize(left=len(self) - 1)
-            for item in self._compress_svd_l(rank, relerr, svdfunc):
-                pass
-            return item
+            items = list(self._compress_svd_l(rank, relerr, svdfunc))
+            truncerrs = np.array([item[2] for item in items[-2::-1]])
+        else:
+            raise ValueError('{} is not a valid direction'.format(direction))
 
-        raise ValueError('{} is not a valid direction'.format(direction))
+        overlap = items[-1]
+        return (overlap, truncerrs) if return_truncerr else overlap
 
-    def _compression_var(self, num_sweeps, startmpa=None, rank=None,
-                         randstate=np.random, var_sites=2):
+    def _compression_var(self, num_sweeps=None, startmpa=None, rank=None,
+                         randstate=np.random, var_sites=2, tol=None,
+                         max_sweeps=None, return_history=False,
+                         return_truncerr=False):
         """Return a compression of ``self`` using variational compression
         [:ref:`Sch11 <Sch11>`, Sec. 4.5.2]
 
         Parameters and return value: See :func:`~compression()`.
 
         """
+        if return_truncerr:
+            # Variational compression discards no singular values
+            raise ValueError("return_truncerr=True is only supported for "
+                             "method='svd', not for method='var'")
+        if (num_sweeps is None) == (max_sweeps is None):
+            raise ValueError('You must provide either num_sweeps or '
+                             'max_sweeps')
+        max_sweeps = num_sweeps if max_sweeps is None else max_sweeps
+        history = []
+
         if len(self) == 1:
             # Cannot do anything. We make a copy, see below.
             copy = self.copy()
-            return copy, norm(copy)**2
+            result = copy, norm(copy)**2
+            return result + (history,) if return_history else result
 
         if startmpa is not None:
             rank = max(startmpa.ranks)
@@ -881,7 +1229,8 @@ class MPArray(object):
             # instead of .compression(), we could avoid the copy and
             # return self.
             copy = self.copy()
-            return copy, norm(copy)**2
+            result = copy, norm(copy)**2
+            return result + (history,) if return_history else result
 
         if startmpa is None:
             from mpnum.factory import random_mpa
@@ -894,8 +1243,11 @@ class MPArray(object):
         # flatten the array since MPS is expected & bring back
         shape = self.shape
         compr = compr.ravel()
-        overlap = compr._adapt_to(self.ravel(), num_sweeps, var_sites)
+        overlap = compr._adapt_to(self.ravel(), max_sweeps, var_sites, tol,
+                                  history)
         compr = compr.reshape(shape)
+        if return_history:
+            return compr, overlap, history
         return compr, overlap
 
     def _compress_svd_l(self, rank, relerr, svdfunc):
@@ -904,6 +1256,10 @@ class MPArray(object):
 
         See :func:`~compress` for more details and arguments.
 
+        Yields ``(sv, rank, truncerr)`` for each bond from right to left,
+        where ``truncerr`` is the discarded weight, and the overlap
+        ``<u|c>`` (see :func:`~compress`) at the end.
+
         """
         assert rank > 0, "Cannot compress to rank={}".format(rank)
         assert (relerr is None) or ((0. <= relerr) and (relerr <= 1.)), \
@@ -921,7 +1277,10 @@ class MPArray(object):
                 rank_relerr = np.searchsorted(svsum, 1 - relerr) + 1
                 rank_t = min(ltens.shape[0], v.shape[0], rank, rank_relerr)
 
-            yield sv, rank_t
+            # `svdfunc` may return only the largest singular values
+            truncerr = max(np.sum(np.abs(ltens)**2)
+                           - np.sum(sv[:rank_t]**2), 0.0)
+            yield sv, rank_t, truncerr
 
             newtens = (matdot(self._lt[site - 1], u[:, :rank_t] * sv[None, :rank_t]),
                        v[:rank_t, :].reshape((rank_t, ) + ltens.shape[1:]))
@@ -934,7 +1293,9 @@ class MPArray(object):
         """Compresses the MPA in place from left to right using SVD;
         yields a left-canonical state
 
-        See :func:`~compress` for parameters
+        See :func:`~compress` for parameters. Yields the same values as
+        :func:`_compress_svd_l` for each bond from left to right.
+
         """
         assert rank > 0, "Cannot compress to rank={}".format(rank)
         assert (relerr is None) or ((0. <= relerr) and (relerr <= 1.)), \
@@ -952,7 +1313,10 @@ class MPArray(object):
                 rank_relerr = np.searchsorted(svsum, 1 - relerr) + 1
                 rank_t = min(ltens.shape[-1], u.shape[1], rank, rank_relerr)
 
-            yield sv, rank_t
+            # `svdfunc` may return only the largest singular values
+            truncerr = max(np.sum(np.abs(ltens)**2)
+                           - np.sum(sv[:rank_t]**2), 0.0)
+            yield sv, rank_t, truncerr
 
             newtens = (u[:, :rank_t].reshape(ltens.shape[:-1] + (rank_t, )),
                        matdot(sv[:rank_t, None] * v[:rank_t, :], self._lt[site + 1]))
@@ -977,7 +1341,7 @@ class MPArray(object):
         self.canonicalize(right=1)
         iterator = self._compress_svd_r(max(self.ranks), None, truncated_svd)
         # We want everything from the iterator except for the last element.
-        for _, (sv, rank) in zip(range(len(self) - 1), iterator):
+        for _, (sv, rank, _) in zip(range(len(self) - 1), iterator):
             # We could verify that `rank` did not decrease but it may
             # decrease because of zero singular values -- let's trust
             # that relerr=0.0 behaves as intended.
@@ -1012,21 +1376,28 @@ class MPArray(object):
               for lp, rp, lt in zip([0] + pad, pad + [0], self.lt))
         return mp.MPArray(lt)
 
-    def _adapt_to(self, target, num_sweeps, var_sites):
+    def _adapt_to(self, target, num_sweeps, var_sites, tol=None,
+                  history=None, weights=None):
         """Iteratively minimize the l2 distance between `self` and `target`.
         This is especially important for variational compression, where `self`
         is the initial guess and target the MPA to be compressed.
 
         :param target: MPS to compress; i.e. MPA with only one
             physical leg per site
+        :param num_sweeps: Maximal number of sweeps
+        :param tol: Stop if the overlap changes by less than ``tol``
+            times its value during one sweep (default: ``None``)
+        :param history: If not ``None``, append one dictionary per sweep
+            with the keys ``'overlap'`` and ``'time'`` to this list
+        :param weights: If not ``None``, ``target`` is a list of MPSs
+            and we adapt ``self`` to their weighted sum without computing
+            the sum. We keep separate environments for each summand.
 
         Other parameters and references: See
         :func:`~compress()`.
 
         .. todo:: Possible improvements:
             - Can we refactor this function into several shorter functions?
-            - track overlap between 'compr' and 'target' and stop sweeping if it
-            is small
             - maybe increase rank of given error cannot be reached
             - Shall we track the error in the SVD truncation for multi-site
             updates? [Sch11]_ says it turns out to be useful in actual DMRG.
@@ -1042,26 +1413,30 @@ class MPArray(object):
         #
         #   range(pos, pos_end),  pos_end = pos + var_sites
         #
-        # lvecs[pos] and rvecs[pos] contain the vectors needed to
-        # obtain the new local tensors. Therefore, lvecs[pos] is
-        # constructed from matrices on
-        #
-        #   range(0, pos - 1)
+        # envs.left(pos) and envs.right(pos_end) contain the vectors
+        # needed to obtain the new local tensors. They are constructed
+        # from matrices on
         #
-        # and rvecs[pos] is constructed from matrices on
+        #   range(0, pos) and range(pos_end, nr_sites),
         #
-        #   range(pos_end, nr_sites),  pos_end = pos + var_sites
+        # respectively, and only recomputed if these matrices have changed.
+        targets = [target] if weights is None else list(target)
         assert_array_equal(self.ndims, 1, "Self is not a MPS")
-        assert_array_equal(target.ndims, 1, "Target is not a MPS")
+        for tgt in targets:
+            assert_array_equal(tgt.ndims, 1, "Target is not a MPS")
 
-        nr_sites = len(target)
-        lvecs = [np.array(1, ndmin=2)] + [None] * (nr_sites - var_sites)
-        rvecs = [None] * (nr_sites - var_sites) + [np.array(1, ndmin=2)]
+        nr_sites = len(self)
         self.canonicalize(right=1)
-        for pos in reversed(range(nr_sites - var_sites)):
-            pos_end = pos + var_sites
-            rvecs[pos] = _adapt_to_add_r(rvecs[pos + 1], self._lt[pos_end],
-                                         target.lt[pos_end])
+        envs = [Environments(self, None, tgt) for tgt in targets]
+
+        def update(pos, pos_end):
+            args = ([env.left(pos) for env in envs],
+                    [tgt.lt[pos:pos_end] for tgt in targets],
+                    [env.right(pos_end) for env in envs])
+            if weights is None:
+                args = [arg[0] for arg in args]
+            self._lt[pos:pos_end] = _adapt_to_new_lten(
+                *args, max_rank=max_rank, weights=weights)
 
         # Example: For `num_sweeps = 3`, `nr_sites = 3` and `var_sites
         # = 1`, we want the following sequence for `pos`:
@@ -1073,7 +1448,9 @@ class MPArray(object):
         #     num_sweep = 0            num_sweep = 1       num_sweep = 1
 
         max_rank = max(self.ranks)
+        last_overlap = None
         for num_sweep in range(num_sweeps):
+            start_time = time.time()
             # Sweep from left to right (LTR)
             for pos in range(nr_sites - var_sites + 1):
                 if pos == 0 and num_sweep > 0:
@@ -1081,13 +1458,7 @@ class MPArray(object):
                     continue
                 if pos > 0:
                     self.canonicalize(left=pos)
-                    rvecs[pos - 1] = None
-                    lvecs[pos] = _adapt_to_add_l(lvecs[pos - 1], self._lt[pos - 1],
-                                                 target.lt[pos - 1])
-                pos_end = pos + var_sites
-                new_ltens = _adapt_to_new_lten(lvecs[pos], target.lt[pos:pos_end],
-                                               rvecs[pos], max_rank)
-                self._lt[pos:pos_end] = new_ltens
+                update(pos, pos + var_sites)
 
             # Sweep from right to left (RTL; don't do `pos = nr_sites
             # - var_sites` again)
@@ -1096,13 +1467,24 @@ class MPArray(object):
                 if pos < nr_sites - var_sites:
                     # We always do this, because we don't do the last site again.
                     self.canonicalize(right=pos_end)
-                    lvecs[pos + 1] = None
-                    rvecs[pos] = _adapt_to_add_r(rvecs[pos + 1], self._lt[pos_end],
-                                                 target.lt[pos_end])
-
-                new_ltens = _adapt_to_new_lten(lvecs[pos], target.lt[pos:pos_end],
-                                               rvecs[pos], max_rank)
-                self._lt[pos:pos_end] = new_ltens
+                update(pos, pos_end)
+
+            if tol is None and history is None:
+                continue
+            # Only the environments of the sites just updated have to be
+            # recomputed to obtain <u|c>.
+            if weights is None:
+                overlap = abs(envs[0].contract())
+            else:
+                overlap = abs(sum(np.conj(weight) * env.contract()
+                                  for weight, env in zip(weights, envs)))
+            if history is not None:
+                history.append({'overlap': overlap,
+                                'time': time.time() - start_time})
+            if tol is not None and last_overlap is not None and \
+                    abs(overlap - last_overlap) <= tol * overlap:
+                break
+            last_overlap = overlap
 
         # Let u the uncompressed vector and c the compression which we
         # return. c satisfies <c|c> = <u|c> (mentioned more or less in
@@ -1112,6 +1494,172 @@ class MPArray(object):
         return norm(self)**2
 
 
+#####################################
+#  Cached environment contractions  #
+#####################################
+class Environments(object):
+    r"""Cache of the left and right environments of
+    :math:`\langle \phi \vert A \vert \psi \rangle`
+
+    Here, :math:`\vert \psi \rangle` and :math:`\vert \phi \rangle` are
+    MPSs and :math:`A` is an MPO (or the identity). The left environment
+    at position ``pos`` is the contraction of all sites ``< pos``, the right
+    environment at position ``pos`` is the contraction of all sites
+    ``>= pos`` [:ref:`Sch11 <Sch11>`, Fig. 38].
+
+    The environments are computed on first access and kept until one of
+    the local tensors they depend on changes. Changes are detected via
+    :py:attr:`.mpstruct.LocalTensors.versions`, i.e. the MPAs may be modified
+    in place (e.g. by :func:`~MPArray.canonicalize` or by assigning to
+    ``mpa.lt[pos]``) and only the environments which depend on the
+    modified sites are recomputed:
+
+    >>> from .factory import random_mpa, random_mpo
+    >>> mps = random_mpa(4, 2, 3, randstate=np.random.RandomState(1))
+    >>> mpo = random_mpo(4, 2, 2, randstate=np.random.RandomState(2))
+    >>> envs = Environments(mps, mpo)
+    >>> np.allclose(envs.contract(), sandwich(mpo, mps))
+    True
+    >>> left = envs.left(2)
+    >>> mps.lt[3] = 2 * mps.lt[3]
+    >>> envs.left(2) is left
+    True
+    >>> np.allclose(envs.contract(), sandwich(mpo, mps))
+    True
+
+    The left (right) environments have the indices ``(mps bond, mpo bond,
+    mps2 bond)``, or ``(mps bond, mps2 bond)`` if ``mpo`` is ``None``. The
+    complex conjugate is taken of ``mps2``.
+
+    .. automethod:: __init__
+
+    """
+
+    def __init__(self, mps, mpo=None, mps2=None):
+        r"""
+        :param mps: MPS :math:`\vert \psi \rangle`
+        :param mpo: MPO :math:`A` or ``None`` for the identity
+            (default: ``None``)
+        :param mps2: MPS :math:`\vert \phi \rangle` (default: ``mps``)
+
+        """
+        self._mps = mps
+        self._mpo = mpo
+        self._mps2 = mps if mps2 is None else mps2
+        nr_sites = len(mps)
+        assert len(self._mps2) == nr_sites
+        assert mpo is None or len(mpo) == nr_sites
+
+        ndim = 2 if mpo is None else 3
+        self._lvecs = [np.ones((1,) * ndim)] + [None] * nr_sites
+        self._rvecs = [None] * nr_sites + [np.ones((1,) * ndim)]
+        # Versions of site `pos - 1` (`pos`) in all MPAs used to compute
+        # `self._lvecs[pos]` (`self._rvecs[pos]`); None for missing values
+        self._lversions = [None] * (nr_sites + 1)
+        self._rversions = [None] * (nr_sites + 1)
+
+    def __len__(self):
+        """Number of sites"""
+        return len(self._mps)
+
+    @property
+    def _mpas(self):
+        return tuple(mpa for mpa in (self._mps, self._mpo, self._mps2)
+                     if mpa is not None)
+
+    def _site_versions(self, site):
+        return tuple(mpa.lt.version(site) for mpa in self._mpas)
+
+    def _nr_valid_left(self, stop):
+        """Number of sites ``< stop`` from the left up to which the left
+        environments are up to date"""
+        nr_valid = 0
+        while nr_valid < stop and self._lversions[nr_valid + 1] == \
+                self._site_versions(nr_valid):
+            nr_valid += 1
+        return nr_valid
+
+    def _first_valid_right(self, start):
+        """First site ``>= start`` from which on the right environments
+        are up to date"""
+        first_valid = len(self)
+        while first_valid > start and self._rversions[first_valid - 1] == \
+                self._site_versions(first_valid - 1):
+            first_valid -= 1
+        return first_valid
+
+    def _add_left(self, lvec, site):
+        if self._mpo is None:
+            return _adapt_to_add_l(lvec, self._mps.lt[site],
+                                   self._mps2.lt[site])
+        return mp.linalg._eig_leftvec_add(lvec, self._mpo.lt[site],
+                                          self._mps.lt[site],
+                                          self._mps2.lt[site])
+
+    def _add_right(self, rvec, site):
+        if self._mpo is None:
+            return _adapt_to_add_r(rvec, self._mps.lt[site],
+                                   self._mps2.lt[site])
+        return mp.linalg._eig_rightvec_add(rvec, self._mpo.lt[site],
+                                           self._mps.lt[site],
+                                           self._mps2.lt[site])
+
+    def left(self, pos):
+        """Left environment of site ``pos``, i.e. the contraction of all
+        sites ``< pos``
+
+        Only the environments which are out of date are recomputed.
+
+        """
+        assert 0 <= pos <= len(self), 'pos={!r}'.format(pos)
+        # Only the sites `< pos` are checked for changes
+        nr_valid = self._nr_valid_left(pos)
+        if nr_valid < pos:
+            # Everything beyond `pos` depends on values we recompute now
+            self._lvecs[pos + 1:] = [None] * (len(self) - pos)
+            self._lversions[pos + 1:] = [None] * (len(self) - pos)
+        for site in range(nr_valid, pos):
+            self._lvecs[site + 1] = self._add_left(self._lvecs[site], site)
+            self._lversions[site + 1] = self._site_versions(site)
+        return self._lvecs[pos]
+
+    def right(self, pos):
+        """Right environment of site ``pos - 1``, i.e. the contraction of
+        all sites ``>= pos``
+
+        Only the environments which are out of date are recomputed.
+
+        """
+        assert 0 <= pos <= len(self), 'pos={!r}'.format(pos)
+        # Only the sites `>= pos` are checked for changes
+        first_valid = self._first_valid_right(pos)
+        if first_valid > pos:
+            self._rvecs[:pos] = [None] * pos
+            self._rversions[:pos] = [None] * pos
+        for site in range(first_valid - 1, pos - 1, -1):
+            self._rvecs[site] = self._add_right(self._rvecs[site + 1], site)
+            self._rversions[site] = self._site_versions(site)
+        return self._rvecs[pos]
+
+    def contract(self, pos=None):
+        r"""Return the full contraction :math:`\langle \phi \vert A \vert
+        \psi \rangle`
+
+        :param pos: Join left and right environments at this position.
+            By default, use the position which requires the fewest
+            recomputations.
+
+        """
+        if pos is None:
+            # The left environment is up to date on all sites `< nr_l`
+            # and the right environment on all sites `>= len(self) - nr_r`
+            nr_l = self._nr_valid_left(len(self))
+            nr_r = len(self) - self._first_valid_right(0)
+            pos = nr_l if nr_l >= nr_r else len(self) - nr_r
+        lvec, rvec = self.left(pos), self.right(pos)
+        return np.tensordot(lvec, rvec, axes=lvec.ndim)
+
+
 #############################################
 #  General functions to deal with MPArrays  #
 #############################################
@@ -1153,6 +1701,107 @@ def dot(mpa1, mpa2, axes=(-1, 0), astype=None):
     return astype(ltens)
 
 
+def dot_compressed(mpa1, mpa2, rank=None, relerr=None, method='zipup',
+                   num_sweeps=1, startmpa=None):
+    """Compressed contraction of the last physical leg of ``mpa1`` with the
+    first physical leg of ``mpa2``
+
+    Returns an approximation of :code:`dot(mpa1, mpa2)` (with the default
+    ``axes``), e.g. the product of an MPO and an MPS, with the rank
+    limited by ``rank`` and ``relerr``. The local tensors are contracted
+    and truncated site by site from left to right, so the product at full
+    rank (rank :math:`D D_W`) is never built. For MPO rank :math:`D_W`,
+    MPS rank :math:`D` and local dimension :math:`d`, ``'zipup'`` computes
+    the SVD of a :math:`(D d) \\times (D D_W)` matrix on each site, which
+    takes :math:`O(D^3 D_W d \\min(d, D_W))` operations.
+
+    :param mpa1, mpa2: Factors as :class:`MPArray`
+    :param rank: Maximal rank of the result (default: ``None``, i.e. no
+        limit)
+    :param relerr: Maximal fraction of discarded singular values on each
+        bond, see :func:`MPArray.compress` (default: ``None``)
+    :param method: ``'zipup'`` or ``'densitymatrix'``:
+
+        * ``'zipup'``: Contract and truncate with an SVD in a single
+          sweep after bringing a copy of ``mpa2`` into right-canonical form
+          [:ref:`SW10 <SW10>`]. The truncation is done in a basis which is
+          only approximately orthonormal, so the error can be somewhat
+          larger than for SVD compression of the full product.
+
+        * ``'densitymatrix'``: Truncate using the reduced density matrices
+          of the product, which are obtained from environments computed
+          from the right [:ref:`SW10 <SW10>`]. The truncation is as
+          accurate as SVD compression of the full product, but the
+          runtime is larger than for ``'zipup'``.
+
+        * ``'var'``: Start from ``startmpa`` (default: the result of
+          ``'zipup'``) and maximize the overlap with the product by
+          two-site variational sweeps [:ref:`Sch11 <Sch11>`, Sec. 4.5.2].
+          The product is only contracted on the two sites being
+          updated; the new local tensors are truncated with an SVD.
+
+    :param num_sweeps: Number of sweeps for ``method='var'``, each
+        sweep goes from left to right and back (default: 1)
+    :param startmpa: Initial guess for ``method='var'`` (default:
+        ``None``)
+
+    :returns: :class:`MPArray` in left-canonical form (except for the last
+        site); for ``method='var'``, in right-canonical form (except for
+        the first site)
+
+    Compressed powers of an MPO, e.g. :math:`H^2` for the energy variance,
+    can be obtained in the same way:
+
+    >>> from .factory import random_mpo
+    >>> mpo = random_mpo(6, 2, 4, randstate=np.random.RandomState(1))
+    >>> dot(mpo, mpo).ranks
+    (16, 16, 16, 16, 16)
+    >>> mpo_sq = dot_compressed(mpo, mpo, rank=8, method='var')
+    >>> mpo_sq.ranks
+    (4, 8, 8, 8, 4)
+
+    """
+    assert len(mpa1) == len(mpa2), \
+        "Length is not equal: {} != {}".format(len(mpa1), len(mpa2))
+    if method == 'zipup':
+        mpa2 = mpa2.copy()
+        mpa2.canonicalize(right=1)
+        step = _dot_compressed_zipup
+    elif method == 'densitymatrix':
+        # rvecs[pos] is the environment of the sites `pos` to the end
+        rvecs = [None] * len(mpa1) + [np.ones((1, 1, 1, 1))]
+        for pos in range(len(mpa1) - 1, 0, -1):
+            rvecs[pos] = _dot_compressed_add_r(
+                rvecs[pos + 1],
+                _dot_compressed_ltens(mpa1.lt[pos], mpa2.lt[pos]))
+        step = ft.partial(_dot_compressed_densitymatrix, rvecs=rvecs)
+    elif method == 'var':
+        if startmpa is None:
+            startmpa = dot_compressed(mpa1, mpa2, rank, relerr, 'zipup')
+        return _dot_compressed_var(mpa1, mpa2, startmpa, rank, relerr,
+                                   num_sweeps)
+    else:
+        raise ValueError('{!r} is not a valid method'.format(method))
+
+    ltens = []
+    carry = np.ones((1, 1, 1))
+    for pos, (ltens1, ltens2) in enumerate(zip(mpa1.lt, mpa2.lt)):
+        ltens1, ltens2 = _dot_compressed_ltens(ltens1, ltens2)
+        # Axes: 0: new bond, 1: phys1, 2: phys2, 3: bond1, 4: bond2
+        tens = np.tensordot(carry, ltens2, axes=(2, 0))
+        tens = np.tensordot(tens, ltens1, axes=((1, 2), (0, 2)))
+        tens = tens.transpose((0, 3, 1, 4, 2))
+        shape = ((tens.shape[0],) + mpa1.lt.shape[pos][1:-2]
+                 + mpa2.lt.shape[pos][2:-1])
+        if pos == len(mpa1) - 1:
+            ltens.append(tens.reshape(shape + (1,)))
+            break
+        unitary, carry = step(tens, pos, rank, relerr)
+        ltens.append(unitary.reshape(shape + (unitary.shape[-1],)))
+
+    return MPArray(LocalTensors(ltens, cform=(len(ltens) - 1, len(ltens))))
+
+
 def sumup(mpas, weights=None):
     """Returns the sum of the MPArrays in ``mpas``. Same as
 
@@ -1189,6 +1838,67 @@ def sumup(mpas, weights=None):
     return MPArray(ltens)
 
 
+def compress_sum(mpas, weights=None, num_sweeps=None, startmpa=None,
+                 rank=None, randstate=np.random, var_sites=2, tol=None,
+                 max_sweeps=None, return_history=False):
+    """Variational compression of the weighted sum of ``mpas``
+
+    Returns the same as
+
+    .. code-block:: python
+
+        sumup(mpas, weights).compression(method='var', **kwargs)
+
+    but never builds the sum, whose rank is the sum of the ranks of
+    ``mpas``. Instead, we keep one set of environments for each summand
+    and add up their contributions to each local update. Memory and
+    runtime then scale linearly with the number of summands.
+
+    :param mpas: Iterator over :class:`~MPArray`
+    :param weights: Iterator of the same length as ``mpas`` (default:
+        ``None``, i.e. all weights one)
+
+    Remaining parameters and return value: See
+    :func:`MPArray.compression` with ``method='var'``.
+
+    """
+    mpas = list(mpas)
+    weights = [1] * len(mpas) if weights is None else list(weights)
+    assert len(weights) == len(mpas)
+    if (num_sweeps is None) == (max_sweeps is None):
+        raise ValueError('You must provide either num_sweeps or max_sweeps')
+    max_sweeps = num_sweeps if max_sweeps is None else max_sweeps
+    if startmpa is not None:
+        rank = max(startmpa.ranks)
+    elif rank is None:
+        raise ValueError('You must provide startmpa or rank')
+
+    history = []
+    if len(mpas[0]) == 1 or rank >= sum(max(mpa.ranks) for mpa in mpas):
+        # The sum is not larger than the desired result
+        compr = sumup(mpas, weights)
+        result = compr, norm(compr)**2
+        return result + (history,) if return_history else result
+
+    shape = mpas[0].shape
+    if startmpa is None:
+        from mpnum.factory import random_mpa
+        dtype = np.result_type(*([mpa.dtype for mpa in mpas] + weights))
+        compr = random_mpa(len(mpas[0]), shape, rank, randstate=randstate,
+                           dtype=dtype)
+    else:
+        compr = startmpa.copy()
+        assert all(d1 == d2 for d1, d2 in zip(shape, compr.shape))
+
+    compr = compr.ravel()
+    overlap = compr._adapt_to([mpa.ravel() for mpa in mpas], max_sweeps,
+                              var_sites, tol, history, weights)
+    compr = compr.reshape(shape)
+    if return_history:
+        return compr, overlap, history
+    return compr, overlap
+
+
 def partialdot(mpa1, mpa2, start_at, axes=(-1, 0)):
     """Partial dot product of two MPAs of inequal length.
 
@@ -1241,6 +1951,11 @@ def inner(mpa1, mpa2):
     ``inner(...)`` corresponds to the Frobenius scalar product (with Hermitian
     conjugation in the first argument)
 
+    The transfer matrices are contracted from left to right: The runtime
+    scales as :math:`O(N d D^3)` and the memory as :math:`O(D^2)` (in
+    addition to the MPAs) for ranks :math:`D` and :math:`d` entries in the
+    local tensor per site and bond.
+
     :param mpa1: MPArray with same number of physical legs on each site
     :param mpa2: MPArray with same physical shape as mpa1
     :returns: <mpa1|mpa2>
@@ -1248,9 +1963,97 @@ def inner(mpa1, mpa2):
     """
     assert len(mpa1) == len(mpa2), \
         "Length is not equal: {} != {}".format(len(mpa1), len(mpa2))
-    ltens_new = (_local_dot(_local_ravel(l).conj(), _local_ravel(r), axes=(1, 1))
-                 for l, r in zip(mpa1.lt, mpa2.lt))
-    return _ltens_to_array(ltens_new)[0, ..., 0]
+    # Axes: bond of mpa1, bond of mpa2
+    lvec = np.ones((1, 1))
+    for lt1, lt2 in zip(mpa1.lt, mpa2.lt):
+        # Axes: bond of mpa2, physical legs, bond of mpa1
+        lvec = np.tensordot(lvec, lt1.conj(), axes=(0, 0))
+        contracted = tuple(range(lt2.ndim - 1))
+        lvec = np.tensordot(lvec, lt2, axes=(contracted, contracted))
+    return lvec[0, 0]
+
+
+def gram(mpas, chunksize=None):
+    """Compute the matrix of all inner products ``<mpas[i]|mpas[j]>``
+
+    Returns the same as
+
+    .. code-block:: python
+
+        np.array([[inner(a, b) for b in mpas] for a in mpas])
+
+    but contracts the transfer matrices of all pairs at once: The local
+    tensors of all MPAs are padded to common ranks with zeros and stacked
+    along a batch axis, conjugated once and contracted with batched
+    ``np.matmul``. Runtime and memory are as for :func:`inner` times the
+    number of pairs in one chunk.
+
+    :param mpas: Iterator over :class:`~MPArray` of the same physical
+        shape
+    :param chunksize: Process the pairs in blocks of ``chunksize``
+        MPAs times ``chunksize`` MPAs to bound the memory of the transfer
+        matrices (default: ``None``, i.e. all pairs at once)
+    :returns: Hermitian ``np.ndarray`` of shape ``(len(mpas),
+        len(mpas))``
+
+    """
+    mpas = list(mpas)
+    nr_mpas = len(mpas)
+    chunksize = max(nr_mpas, 1) if chunksize is None else chunksize
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1, got {}'
+                         .format(chunksize))
+    if nr_mpas == 0:
+        return np.empty((0, 0))
+    length = len(mpas[0])
+    assert all(mpa.shape == mpas[0].shape for mpa in mpas), \
+        "All MPAs must have the same physical shape"
+    ranks = (1,) + tuple(max(rank) for rank in
+                         zip(*(mpa.ranks for mpa in mpas))) + (1,)
+    ltens = [_gram_stack([mpa.lt[pos] for mpa in mpas],
+                         ranks[pos], ranks[pos + 1])
+             for pos in range(length)]
+    ltens_conj = [lt.conj() for lt in ltens]
+
+    dtype = np.result_type(*[mpa.dtype for mpa in mpas])
+    result = np.empty((nr_mpas, nr_mpas), dtype=dtype)
+    for start1 in range(0, nr_mpas, chunksize):
+        sl1 = slice(start1, start1 + chunksize)
+        for start2 in range(start1, nr_mpas, chunksize):
+            sl2 = slice(start2, start2 + chunksize)
+            block = _gram_block([lt[sl1] for lt in ltens_conj],
+                                [lt[sl2] for lt in ltens])
+            result[sl1, sl2] = block
+            result[sl2, sl1] = block.conj().T
+    return result
+
+
+def _gram_stack(ltens, left_rank, right_rank):
+    """Stack local tensors with raveled physical legs along a new first
+    axis, padding the virtual legs with zeros to the given ranks"""
+    phys = int(np.prod(ltens[0].shape[1:-1]))
+    dtype = np.result_type(*ltens)
+    result = np.zeros((len(ltens), left_rank, phys, right_rank), dtype=dtype)
+    for out, lt in zip(result, ltens):
+        out[:lt.shape[0], :, :lt.shape[-1]] = \
+            lt.reshape((lt.shape[0], phys, lt.shape[-1]))
+    return result
+
+
+def _gram_block(ltens1_conj, ltens2):
+    """Inner products between all pairs of two stacks of MPAs (see
+    :func:`gram`)"""
+    nr1, nr2 = len(ltens1_conj[0]), len(ltens2[0])
+    # Axes: batch1, batch2, bond of 1, bond of 2
+    lvec = np.ones((nr1, nr2, 1, 1))
+    for lt1, lt2 in zip(ltens1_conj, ltens2):
+        _, left, phys, right = lt2.shape
+        # Axes: batch1, batch2, bond of 1 & physical, bond of 2
+        lvec = np.matmul(lvec, lt2.reshape((1, nr2, left, phys * right)))
+        lvec = lvec.reshape((nr1, nr2, left * phys, right))
+        lt1 = lt1.reshape((nr1, 1, left * phys, lt1.shape[-1]))
+        lvec = np.matmul(np.swapaxes(lt1, 2, 3), lvec)
+    return lvec[:, :, 0, 0]
 
 
 def sandwich(mpo, mps, mps2=None):
@@ -1262,18 +2065,20 @@ def sandwich(mpo, mps, mps2=None):
     The runtime of this method scales with ``D**3 * Dp + D**2 * Dp**3`` 
     where ``D`` and ``Dp`` are the ranks of ``mps`` and
     ``mpo``. This is more efficient than ``mp.inner(mps, mp.dot(mpo,
-    mps))``, whose runtime scales with ``D**4 * Dp**3``, and also more
+    mps))``, whose runtime scales with ``D**3 * Dp**2`` and which builds
+    ``mp.dot(mpo, mps)`` with rank ``D * Dp``, and also more
     efficient than ``mp.dot(mps.conj(), mp.dot(mpo,
     mps)).to_array()``, whose runtime scales with ``D**6 * Dp**3``.
 
     If ``mps2`` is given, ``<mps2|MPO|mps>`` is computed instead
     (i.e. ``mp.inner(mps2, mp.dot(mpo, mps))``; see also :func:`dot()`).
 
+    To compute the same value repeatedly for MPS which change only on a
+    few sites, use :func:`Environments.contract()` on a persistent
+    :class:`Environments` instance.
+
     """
-    # Fortunately, the contraction has been implemented already:
-    arr = np.ones((1, 1, 1))
-    for mpo_lt, mps_lt, mps2_lt in zip(mpo.lt, mps.lt, (mps2 or mps).lt):
-        arr = mp.linalg._eig_leftvec_add(arr, mpo_lt, mps_lt, mps2_lt)
+    arr = Environments(mps, mpo, mps2).left(len(mps))
     assert arr.size == 1
     return arr.flat[0]
 
@@ -1418,47 +2223,62 @@ def norm(mpa):
     of the matrix product operator. In contrast to ``mparray.inner``, this can
     take advantage of the canonicalization
 
-    WARNING This also changes the MPA inplace by normalizing.
+    ``mpa`` is not modified. If ``mpa`` is in canonical form with a single
+    non-canonical site, the norm of that local tensor is returned.
+    Otherwise, the norm is obtained by contracting transfer matrices from
+    left to right, which scales as :math:`O(N d D^3)`.
+
+    The result is cached on ``mpa`` until one of its local tensors changes
+    (see :py:attr:`.mpstruct.LocalTensors.versions`), so repeated calls on
+    an unchanged MPA are free.
 
     :param mpa: MPArray
     :returns: l2-norm of that array
 
     """
-    mpa.canonicalize()
-    current_lcanon, current_rcanon = mpa.canonical_form
-
-    if current_rcanon == 1:
-        return np.linalg.norm(mpa.lt[0])
-    elif current_lcanon == len(mpa) - 1:
-        return np.linalg.norm(mpa.lt[-1])
+    versions = mpa.lt.versions
+    cache = getattr(mpa, '_norm_cache', None)
+    if cache is not None and cache[0] == versions:
+        return cache[1]
+
+    lcanon, rcanon = mpa.canonical_form
+    if lcanon == rcanon - 1:
+        result = np.linalg.norm(mpa.lt[lcanon])
     else:
-        raise ValueError("Normalization error in MPArray.norm")
+        result = np.sqrt(abs(inner(mpa, mpa)))
+    mpa._norm_cache = (versions, result)
+    return result
 
 
 def normdist(mpa1, mpa2):
     """More efficient version of norm(mpa1 - mpa2)
 
+    The distance is obtained from :func:`norm` of both arguments and their
+    inner product, without building ``mpa1 - mpa2`` (which has the sum of
+    both ranks). Neither argument is modified.
+
+    If the distance is small compared to the norms, this formula suffers
+    from cancellation (the square root amplifies rounding errors in the
+    difference). In this case, we fall back to computing ``norm(mpa1 -
+    mpa2)`` via canonicalization of the difference.
+
     :param mpa1: MPArray
     :param mpa2: MPArray
     :returns: l2-norm of mpa1 - mpa2
 
     """
-    return norm(mpa1 - mpa2)
-    # This implementation doesn't produce an MPA with double rank:
-    #
-    # return np.sqrt(norm(mpa1)**2 + norm(mpa2)**2
-    #                - 2 * np.real(inner(mpa1, mpa2)))
-    #
-    # However, there are precision issues which show up e.g. in
-    # test_project_fused_clusters(). Due to rounding errors, the term
-    # inside np.sqrt() can be slightly negative and np.sqrt() will
-    # return nan. Even if we replace slightly negative terms by zero,
-    # the slightly-positive-instead-of-zero rounding errors are
-    # amplified by np.sqrt().
-    #
-    # On the other hand, the test which fails checks the result to 7
-    # decimals. Given that np.sqrt() amplifies errors in small values,
-    # this is too strict.
+    sqnorms = norm(mpa1)**2 + norm(mpa2)**2
+    sqdist = sqnorms - 2 * np.real(inner(mpa1, mpa2))
+    if sqdist > _NORMDIST_CANCELLATION * sqnorms:
+        return np.sqrt(sqdist)
+    diff = mpa1 - mpa2
+    diff.canonicalize()
+    return norm(diff)
+
+
+# Relative size of the squared distance below which :func:`normdist` does
+# not use the inner product
+_NORMDIST_CANCELLATION = 1e-6
 
 
 # TODO Convert to iterator
@@ -1778,28 +2598,64 @@ def local_sum(mpas, embed_tensor=None, length=None, slices=None):
 ############################################################
 #  Functions for dealing with local operations on tensors  #
 ############################################################
-def _extract_factors(tens, ndims):
+def _window_cform(cform, start, stop):
+    """Canonical form of the sites ``start:stop`` of an MPA whose canonical
+    form is ``cform``, see :py:attr:`.mpstruct.LocalTensors.canonical_form`
+    """
+    lcanon, rcanon = cform
+    nr_sites = stop - start
+    return (min(max(lcanon - start, 0), nr_sites - 1),
+            min(max(rcanon - start, 1), nr_sites))
+
+
+# File signature and alignment of the local tensors for
+# :func:`MPArray.dump_mmap`
+_MMAP_MAGIC = b'MPNUMMM1'
+_MMAP_ALIGN = 64
+
+
+def _mmap_aligned(nbytes):
+    """Smallest multiple of ``_MMAP_ALIGN`` which is at least ``nbytes``"""
+    return -(-nbytes // _MMAP_ALIGN) * _MMAP_ALIGN
+
+
+def _extract_factors(tens, ndims, rank=None, relerr=None):
     """Extract iteratively the leftmost MPO tensor with given number of
     legs by a qr-decomposition
 
+    If ``rank`` or ``relerr`` is given, a truncated SVD is used instead of
+    the QR decomposition (see :func:`MPArray.compress` for the
+    parameters).
+
     :param np.ndarray tens: Full tensor to be factorized
     :param ndims: Number of physical legs per site or iterator over number of
         physical legs
     :returns: List of local tensors with given number of legs yielding a
         factorization of tens
     """
-    current = next(ndims) if isinstance(ndims, collections.Iterator) else ndims
-    if tens.ndim == current + 2:
-        return [tens]
-    elif tens.ndim < current + 2:
-        raise AssertionError("Number of remaining legs insufficient.")
-    else:
-        unitary, rest = qr(tens.reshape((np.prod(tens.shape[:current + 1]), -1)))
-
-        unitary = unitary.reshape(tens.shape[:current + 1] + rest.shape[:1])
-        rest = rest.reshape(rest.shape[:1] + tens.shape[current + 1:])
+    truncate = rank is not None or relerr is not None
+    ltens = []
+    while True:
+        current = next(ndims) if isinstance(ndims, collections.Iterator) \
+            else ndims
+        if tens.ndim == current + 2:
+            ltens.append(tens)
+            return ltens
+        elif tens.ndim < current + 2:
+            raise AssertionError("Number of remaining legs insufficient.")
+
+        mat = tens.reshape((np.prod(tens.shape[:current + 1]), -1))
+        if truncate:
+            unitary, sv, rest = svd(mat, full_matrices=False)
+            rank_t = _truncated_rank(sv, rank, relerr)
+            unitary = unitary[:, :rank_t]
+            rest = sv[:rank_t, None] * rest[:rank_t]
+        else:
+            unitary, rest = qr(mat)
 
-        return [unitary] + _extract_factors(rest, ndims)
+        ltens.append(unitary.reshape(tens.shape[:current + 1]
+                                     + rest.shape[:1]))
+        tens = rest.reshape(rest.shape[:1] + tens.shape[current + 1:])
 
 
 def _local_dot(ltens_l, ltens_r, axes):
@@ -1831,6 +2687,234 @@ def _local_dot(ltens_l, ltens_r, axes):
                        (ltens_l.shape[-1] * ltens_r.shape[-1],))
 
 
+def _dot_compressed_ltens(ltens1, ltens2):
+    """Reshape the local tensors of the factors of :func:`dot_compressed`
+
+    :returns: ``ltens1`` with axes (bond, phys1, contracted leg, bond) and
+        ``ltens2`` with axes (bond, contracted leg, phys2, bond)
+
+    """
+    s1, s2 = ltens1.shape, ltens2.shape
+    return (ltens1.reshape((s1[0], -1, s1[-2], s1[-1])),
+            ltens2.reshape((s2[0], s2[1], -1, s2[-1])))
+
+
+def _truncated_rank(sv, rank, relerr):
+    """Number of singular values ``sv`` to keep, see
+    :func:`MPArray.compress`"""
+    rank_t = len(sv) if rank is None else min(rank, len(sv))
+    if relerr is not None and np.sum(sv) > 0:
+        svsum = np.cumsum(sv) / np.sum(sv)
+        rank_t = min(rank_t, np.searchsorted(svsum, 1 - relerr) + 1)
+    return max(rank_t, 1)
+
+
+def _streamed_split(mat, blocksize, rank, relerr):
+    """Truncated right singular vectors ``V`` and remainder ``M V`` of a
+    matrix ``M`` which is read in blocks of about ``blocksize`` entries
+
+    See :func:`MPArray.from_array_streamed`.
+
+    :returns: ``vecs, rest``, where ``rest`` is a ``numpy.memmap`` backed
+        by a temporary file if it has more than ``blocksize`` entries
+
+    """
+    rows_per_block = max(blocksize // mat.shape[1], 1)
+    gram = np.zeros((mat.shape[1],) * 2, dtype=mat.dtype)
+    for start in range(0, len(mat), rows_per_block):
+        block = np.asarray(mat[start:start + rows_per_block])
+        gram += np.dot(block.T.conj(), block)
+    ev, vecs = np.linalg.eigh(gram)
+    ev, vecs = ev[::-1], vecs[:, ::-1]
+    # Eigenvalues below this threshold are rounding errors
+    cutoff = ev[0] * mat.shape[1] * np.finfo(ev.dtype).eps
+    sv = np.sqrt(ev[ev > cutoff]) if ev[0] > 0 else np.zeros(1)
+    vecs = vecs[:, :_truncated_rank(sv, rank, relerr)]
+
+    shape = (len(mat), vecs.shape[1])
+    dtype = np.result_type(mat.dtype, vecs.dtype)
+    if np.prod(shape) <= blocksize:
+        rest = np.empty(shape, dtype=dtype)
+    else:
+        rest = np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode='w+',
+                         shape=shape)
+    for start in range(0, len(mat), rows_per_block):
+        block = np.asarray(mat[start:start + rows_per_block])
+        rest[start:start + rows_per_block] = np.dot(block, vecs)
+    return vecs, rest
+
+
+def _dot_compressed_zipup(tens, pos, rank, relerr):
+    """Truncation step of :func:`dot_compressed` with ``method='zipup'``
+
+    :param tens: Array with axes (new bond, phys1, phys2, bond1, bond2)
+    :returns: ``unitary, carry`` where ``unitary`` has axes (new bond,
+        phys1 and phys2, truncated bond) and ``carry`` has axes (truncated
+        bond, bond1, bond2)
+
+    """
+    shape = tens.shape
+    u, sv, v = svd(tens.reshape((np.prod(shape[:3]), -1)),
+                   full_matrices=False)
+    rank_t = _truncated_rank(sv, rank, relerr)
+    carry = sv[:rank_t, None] * v[:rank_t]
+    return u[:, :rank_t], carry.reshape((rank_t,) + shape[3:])
+
+
+def _dot_compressed_add_r(rvec, ltens):
+    """Add one site to the right environment of the (uncompressed) product
+    in :func:`dot_compressed` with ``method='densitymatrix'``
+
+    :param rvec: Array with axes (bond1, bond2, bond1 of the complex
+        conjugate, bond2 of the complex conjugate)
+    :param ltens: Pair of local tensors from :func:`_dot_compressed_ltens`
+
+    """
+    ltens1, ltens2 = ltens
+    # Axes: bond2, contracted, phys2, bond1', bond1'*, bond2'*
+    tens = np.tensordot(ltens2, rvec, axes=(3, 1))
+    # Axes: bond2, phys2, bond1'*, bond2'*, bond1, phys1
+    tens = np.tensordot(tens, ltens1, axes=((1, 3), (2, 3)))
+    # Axes: bond2, bond1'*, bond1, phys1, bond2*, contracted*
+    tens = np.tensordot(tens, ltens2.conj(), axes=((1, 3), (2, 3)))
+    # Axes: bond2, bond1, bond2*, bond1*
+    tens = np.tensordot(tens, ltens1.conj(), axes=((1, 3, 5), (3, 1, 2)))
+    return tens.transpose((1, 0, 3, 2))
+
+
+def _dot_compressed_densitymatrix(tens, pos, rank, relerr, rvecs):
+    """Truncation step of :func:`dot_compressed` with
+    ``method='densitymatrix'``
+
+    Parameters and return value: See :func:`_dot_compressed_zipup`.
+
+    """
+    shape = tens.shape
+    rho = np.tensordot(tens, rvecs[pos + 1], axes=((3, 4), (0, 1)))
+    rho = np.tensordot(rho, tens.conj(), axes=((3, 4), (3, 4)))
+    size = np.prod(shape[:3])
+    eigvals, eigvecs = np.linalg.eigh(rho.reshape((size, size)))
+    eigvals, eigvecs = eigvals[::-1], eigvecs[:, ::-1]
+    # The rank of `rho` is at most the rank of the product
+    sv = np.sqrt(np.maximum(eigvals[:np.prod(shape[3:])], 0))
+    rank_t = _truncated_rank(sv, rank, relerr)
+    unitary = eigvecs[:, :rank_t]
+    carry = np.tensordot(unitary.conj(), tens.reshape((size,) + shape[3:]),
+                         axes=(0, 0))
+    return unitary, carry
+
+
+def _dot_compressed_var(mpa1, mpa2, startmpa, rank, relerr, num_sweeps):
+    """Variational sweeps of :func:`dot_compressed` with ``method='var'``
+
+    The local tensors of the result are stored with axes (bond, phys1,
+    phys2, bond) until the end. ``lvecs[pos]`` (``rvecs[pos]``) is the
+    contraction of the complex conjugate of the result with the
+    product on all sites ``< pos`` (``>= pos``).
+
+    """
+    nr_sites = len(mpa1)
+    shape = startmpa.shape
+    pairs = [_dot_compressed_ltens(lt1, lt2)
+             for lt1, lt2 in zip(mpa1.lt, mpa2.lt)]
+    if nr_sites == 1:
+        tens = _dot_compressed_var_proj(
+            np.ones((1, 1, 1)), pairs, np.ones((1, 1, 1)))
+        return MPArray(LocalTensors([tens.reshape((1,) + shape[0] + (1,))]))
+
+    compr = startmpa.copy()
+    compr.canonicalize(right=1)
+    ltens = [lt.reshape((lt.shape[0], pair[0].shape[1], pair[1].shape[2],
+                         lt.shape[-1]))
+             for lt, pair in zip(compr.lt, pairs)]
+    lvecs = [np.ones((1, 1, 1))] + [None] * nr_sites
+    rvecs = [None] * nr_sites + [np.ones((1, 1, 1))]
+    for pos in range(nr_sites - 1, 1, -1):
+        rvecs[pos] = _dot_compressed_var_add_r(rvecs[pos + 1], ltens[pos],
+                                               pairs[pos])
+
+    def update(pos, to_right):
+        tens = _dot_compressed_var_proj(lvecs[pos], pairs[pos:pos + 2],
+                                        rvecs[pos + 2])
+        s = tens.shape
+        u, sv, v = svd(tens.reshape((np.prod(s[:3]), -1)),
+                       full_matrices=False)
+        rank_t = _truncated_rank(sv, rank, relerr)
+        if to_right:
+            u, v = u[:, :rank_t], sv[:rank_t, None] * v[:rank_t]
+        else:
+            u, v = u[:, :rank_t] * sv[None, :rank_t], v[:rank_t]
+        ltens[pos] = u.reshape(s[:3] + (rank_t,))
+        ltens[pos + 1] = v.reshape((rank_t,) + s[3:])
+
+    for _ in range(num_sweeps):
+        for pos in range(nr_sites - 2):
+            update(pos, to_right=True)
+            lvecs[pos + 1] = _dot_compressed_var_add_l(lvecs[pos], ltens[pos],
+                                                       pairs[pos])
+        for pos in range(nr_sites - 2, -1, -1):
+            update(pos, to_right=False)
+            rvecs[pos + 1] = _dot_compressed_var_add_r(
+                rvecs[pos + 2], ltens[pos + 1], pairs[pos + 1])
+
+    ltens = [lt.reshape(lt.shape[:1] + shp + lt.shape[-1:])
+             for lt, shp in zip(ltens, shape)]
+    return MPArray(LocalTensors(ltens, cform=(0, 1)))
+
+
+def _dot_compressed_var_add_l(lvec, lten, pair):
+    """Add one site to the left environment in :func:`_dot_compressed_var`
+
+    :param lvec: Array with axes (bond of the complex conjugate of the
+        result, bond1, bond2)
+    :param lten: Local tensor of the result with axes (bond, phys1,
+        phys2, bond)
+    :param pair: Pair of local tensors from :func:`_dot_compressed_ltens`
+
+    """
+    ltens1, ltens2 = pair
+    # Axes: bond*, bond1, contracted, phys2, bond2'
+    tens = np.tensordot(lvec, ltens2, axes=(2, 0))
+    # Axes: bond*, phys2, bond2', phys1, bond1'
+    tens = np.tensordot(tens, ltens1, axes=((1, 2), (0, 2)))
+    # Axes: bond'*, bond2', bond1'
+    tens = np.tensordot(lten.conj(), tens, axes=((0, 1, 2), (0, 3, 1)))
+    return tens.transpose((0, 2, 1))
+
+
+def _dot_compressed_var_add_r(rvec, lten, pair):
+    """Add one site to the right environment in :func:`_dot_compressed_var`
+
+    Parameters: See :func:`_dot_compressed_var_add_l`.
+
+    """
+    ltens1, ltens2 = pair
+    # Axes: bond2, contracted, phys2, bond'*, bond1'
+    tens = np.tensordot(ltens2, rvec, axes=(3, 2))
+    # Axes: bond1, phys1, bond2, phys2, bond'*
+    tens = np.tensordot(ltens1, tens, axes=((2, 3), (1, 4)))
+    # Axes: bond*, bond1, bond2
+    return np.tensordot(lten.conj(), tens, axes=((1, 2, 3), (1, 3, 4)))
+
+
+def _dot_compressed_var_proj(lvec, pairs, rvec):
+    """Contract the product on the sites of ``pairs`` with the
+    environments of :func:`_dot_compressed_var`
+
+    :returns: Array with axes (bond, phys1, phys2, ..., phys1, phys2,
+        bond), i.e. the new local tensors of the result on these sites
+
+    """
+    tens = lvec
+    for ltens1, ltens2 in pairs:
+        # Axes: ..., bond2, phys1, contracted, bond1'
+        tens = np.tensordot(tens, ltens1, axes=(-2, 0))
+        # Axes: ..., phys1, bond1', phys2, bond2'
+        tens = np.tensordot(tens, ltens2, axes=((-4, -2), (0, 1)))
+        tens = tens.swapaxes(-3, -2)
+    return np.tensordot(tens, rvec, axes=((-2, -1), (1, 2)))
+
+
 def _local_add(ltenss):
     """Computes the local tensors of a sum of MPArrays (except for the boundary
     tensors)
@@ -1907,18 +2991,67 @@ def _ltens_to_array(ltens):
     """Computes the full array representation from an iterator yielding the
     local tensors. Note that it does not get rid of virtual legs.
 
+    The contraction order is chosen by :func:`~.utils.contraction_plan`.
+
     :param ltens: Iterator over local tensors
     :returns: numpy.ndarray representing the contracted MPA
 
     """
-    ltens = ltens if isinstance(ltens, collections.Iterator) else iter(ltens)
-    res = first = next(ltens)
-    for tens in ltens:
-        res = matdot(res, tens)
-    if res is first:
+    ltens = list(ltens)
+    if len(ltens) == 1:
         # Always return a writable array, even if len(ltens) == 1.
-        res = res.copy()
-    return res
+        return ltens[0].copy()
+    dims = [int(np.prod(lt.shape[1:-1])) for lt in ltens]
+    # The outer virtual legs behave like physical legs
+    dims[0] *= ltens[0].shape[0]
+    dims[-1] *= ltens[-1].shape[-1]
+    ranks = [lt.shape[-1] for lt in ltens[:-1]]
+    return _contract_chain(ltens, contraction_plan(dims, ranks))
+
+
+def _contract_chain(ltens, order):
+    """Contract the virtual legs between the local tensors ``ltens`` in
+    the order ``order`` (see :func:`~.utils.contraction_costs`)"""
+    if order == 'tree':
+        if len(ltens) == 1:
+            return ltens[0]
+        mid = len(ltens) // 2
+        return matdot(_contract_chain(ltens[:mid], 'tree'),
+                      _contract_chain(ltens[mid:], 'tree'))
+    left = ft.reduce(matdot, ltens[:order]) if order > 0 else None
+    right = ft.reduce(lambda res, tens: matdot(tens, res),
+                      ltens[order:][::-1]) if order < len(ltens) else None
+    if left is None or right is None:
+        return right if left is None else left
+    return matdot(left, right)
+
+
+def _ltens_to_array_chunked(mpa, out, chunk_sites):
+    """Write the array in local form of ``mpa`` to ``out`` block by block
+    (see :func:`MPArray.to_array`)
+
+    """
+    split = (len(mpa) + 1) // 2
+    assert 0 <= chunk_sites <= split, \
+        "chunk_sites={} not allowed".format(chunk_sites)
+    # Axes: left virtual, physical legs of mpa[split:]
+    if split < len(mpa):
+        right = _ltens_to_array(mpa.lt[split:])
+        right = right.reshape((right.shape[0], -1))
+    else:
+        right = np.ones((1, 1))
+
+    lead_shape = sum(mpa.shape[:chunk_sites], ())
+    for index in np.ndindex(*lead_shape):
+        ltens = []
+        pos = 0
+        for lten in mpa.lt[:chunk_sites]:
+            nlegs = lten.ndim - 2
+            ltens.append(lten[(slice(None),) + index[pos:pos + nlegs]])
+            pos += nlegs
+        left = _ltens_to_array(ltens + list(mpa.lt[chunk_sites:split]))
+        block = np.dot(left.reshape((-1, left.shape[-1])), right)
+        out[index] = block.reshape(out.shape[len(index):])
 
 
 ################################################
@@ -2001,7 +3134,7 @@ def _adapt_to_add_r(rightvec, compr_lten, tgt_lten):
     return rightvec
 
 
-def _adapt_to_new_lten(leftvec, tgt_ltens, rightvec, max_rank):
+def _adapt_to_new_lten(leftvec, tgt_ltens, rightvec, max_rank, weights=None):
     """Create new local tensors for the compressed MPS.
 
     :param leftvec: Left vector
@@ -2010,6 +3143,10 @@ def _adapt_to_new_lten(leftvec, tgt_ltens, rightvec, max_rank):
     :param rightvec: Right vector
         It has two indices: `compr_mps_bond` and `tgt_mps_bond`
     :param int max_rank: Maximal rank of the result
+    :param weights: If not ``None``, the target is the weighted sum of
+        several MPSs and ``leftvec``, ``tgt_ltens`` and ``rightvec`` are
+        lists with one entry for each of them. The contributions of the
+        summands are added up before the compression.
 
     Compute the right-hand side of [:ref:`Sch11 <Sch11>`, Fig. 27, p. 48]. We
     have ``compr_lten`` in the top row of the figure without complex
@@ -2019,6 +3156,31 @@ def _adapt_to_new_lten(leftvec, tgt_ltens, rightvec, max_rank):
     For len(tgt_ltens) > 1, compute the right-hand side of
     [:ref:`Sch11 <Sch11>`, Fig. 29, p. 49].
 
+    """
+    if weights is None:
+        compr_lten = _adapt_to_proj(leftvec, tgt_ltens, rightvec)
+    else:
+        compr_lten = sum(weight * _adapt_to_proj(lv, ltens, rv) for
+                         weight, lv, ltens, rv in
+                         zip(weights, leftvec, tgt_ltens, rightvec))
+
+    if compr_lten.ndim == 3:
+        return (compr_lten,)
+    else:
+        # [Sch11, p. 49] says that we can go with QR instead of SVD
+        # here. However, this will generally increase the rank of
+        # our compressed MPS, which we do not want.
+        compr_ltens = MPArray.from_array(compr_lten, ndims=1, has_virtual=True)
+        compr_ltens.compress('svd', rank=max_rank)
+        return compr_ltens.lt
+
+
+def _adapt_to_proj(leftvec, tgt_ltens, rightvec):
+    """Project the target MPS onto the local tensors of the compressed MPS
+    on ``len(tgt_ltens)`` sites
+
+    Parameters: See :func:`_adapt_to_new_lten`.
+
     .. todo:: Adapt tensor leg names.
 
     """
@@ -2046,17 +3208,7 @@ def _adapt_to_new_lten(leftvec, tgt_ltens, rightvec, max_rank):
     )
     compr_lten = compr_lten.to_array(compr_lten_names).conj()
     s = compr_lten.shape
-    compr_lten = compr_lten.reshape((s[0],) + tgt_lten_shape[1:-1] + (s[-1],))
-
-    if len(tgt_ltens) == 1:
-        return (compr_lten,)
-    else:
-        # [Sch11, p. 49] says that we can go with QR instead of SVD
-        # here. However, this will generally increase the rank of
-        # our compressed MPS, which we do not want.
-        compr_ltens = MPArray.from_array(compr_lten, ndims=1, has_virtual=True)
-        compr_ltens.compress('svd', rank=max_rank)
-        return compr_ltens.lt
+    return compr_lten.reshape((s[0],) + tgt_lten_shape[1:-1] + (s[-1],))
 
 
 def full_rank(ldims):
@@ -124,19 +124,22 @@ References:
 
 from __future__ import absolute_import, division, print_function
 
+import itertools as it
+
 import numpy as np
 from numpy.testing import assert_array_equal
 
 from six.moves import range
 
 from . import mparray as mp
-from .utils import local_to_global, matdot
+from .utils import contraction_plan, local_to_global, matdot
 
 
 __all__ = ['mps_to_mpo', 'mps_to_pmps', 'pmps_dm_to_array',
            'pmps_reduction', 'pmps_to_mpo', 'pmps_to_mps',
            'reductions_mpo', 'reductions_mps_as_mpo',
-           'reductions_mps_as_pmps', 'reductions_pmps', 'reductions']
+           'reductions_mps_as_pmps', 'reductions_pmps', 'reductions',
+           'sample_mps']
 
 
 def _check_reductions_args(nr_sites, width, startsites, stopsites):
@@ -170,10 +173,45 @@ def pmps_dm_to_array(pmps, global_=False):
 
     .. note:: The resulting array will have dimension-1 physical legs removed.
 
+    The sites left of a split position are contracted from left to right
+    and the remaining sites from right to left; the split position is
+    chosen by :func:`~.utils.contraction_plan`.
+
+    """
+    nr_left = contraction_plan([dim**2 for dim, _ in pmps.shape],
+                               [rank**2 for rank in pmps.ranks], tree=False)
+    left = _pmps_dm_to_array_ltr(pmps.lt[:nr_left])
+    # Contract the right part from right to left as reversed chain
+    right = _pmps_dm_to_array_ltr(lt.transpose((3, 1, 2, 0))
+                                  for lt in list(pmps.lt)[nr_left:][::-1])
+    nr_right = len(pmps) - nr_left
+    right = right.reshape(sum(((dim, dim) for dim, _ in
+                               pmps.shape[nr_left:][::-1]), ())
+                          + right.shape[1:])
+    right = right.transpose(
+        tuple(it.chain.from_iterable((2 * i, 2 * i + 1)
+                                     for i in reversed(range(nr_right))))
+        + (2 * nr_right, 2 * nr_right + 1))
+    right = right.reshape((-1,) + right.shape[-2:])
+    out = np.tensordot(left, right, axes=((1, 2), (1, 2)))
+    out_shape = [dim for dim, _ in pmps.shape for rep in (1, 2) if dim > 1]
+    out = out.reshape(out_shape)
+    if global_:
+        assert len(set(out_shape)) == 1
+        out = local_to_global(out, sites=len(out_shape) // 2)
+    return out
+
+
+def _pmps_dm_to_array_ltr(ltens):
+    """Contract the local tensors of a PMPS and its complex conjugate from
+    left to right (see :func:`pmps_dm_to_array`)
+
+    :returns: Array with axes 0 phys, 1 upper rank, 2 lower rank
+
     """
     out = np.ones((1, 1, 1))
     # Axes: 0 phys, 1 upper rank, 2 lower rank
-    for lt in pmps.lt:
+    for lt in ltens:
         out = np.tensordot(out, lt, axes=(1, 0))
         # Axes: 0 phys, 1 lower rank, 2 phys, 3 anc, 4 upper rank
         out = np.tensordot(out, lt.conj(), axes=((1, 3), (0, 2)))
@@ -182,11 +220,6 @@ def pmps_dm_to_array(pmps, global_=False):
         # Axes: 0 phys, 1 phys, 2 phys, 3 upper bound, 4 lower rank
         out = out.reshape((-1, out.shape[3], out.shape[4]))
         # Axes: 0 phys, 1 upper rank, 2 lower rank
-    out_shape = [dim for dim, _ in pmps.shape for rep in (1, 2) if dim > 1]
-    out = out.reshape(out_shape)
-    if global_:
-        assert len(set(out_shape)) == 1
-        out = local_to_global(out, sites=len(out_shape) // 2)
     return out
 
 
@@ -406,3 +439,44 @@ def mps_to_mpo(mps):
     :returns: An MPO (density matrix as MPA with two physical legs)
     """
     return pmps_to_mpo(mps_to_pmps(mps))
+
+
+def sample_mps(mps, n_samples, rng=np.random):
+    r"""Random samples from measuring an MPS in the computational basis
+
+    The MPS is right-canonicalized once (on a copy). Then all samples are
+    drawn simultaneously from left to right: On each site, the conditional
+    probabilities of the outcomes given the outcomes on the sites to the
+    left are the squared norms of the partial contractions with the
+    right-normalized local tensors. The runtime scales as
+    :math:`O(n_\mathrm{samples} N d D^2)`.
+
+    :param MPArray mps: An MPA with one physical leg (need not be
+        normalized)
+    :param n_samples: Number of samples
+    :param rng: ``numpy.random.RandomState`` instance (default:
+        ``numpy.random``)
+    :returns: Integer array of shape ``(n_samples, len(mps))``; row
+        ``i`` contains the outcomes of sample ``i``
+
+    """
+    assert_array_equal(mps.ndims, 1)
+    mps = mps.copy()
+    if len(mps) > 1:
+        mps.canonicalize(right=1)
+
+    samples = np.empty((n_samples, len(mps)), dtype=int)
+    # Axes: sample, bond
+    lvec = np.ones((n_samples, 1))
+    for site, lten in enumerate(mps.lt):
+        # Axes: sample, outcome, bond
+        cond = np.tensordot(lvec, lten, axes=(1, 0))
+        probab = np.sum(np.abs(cond)**2, axis=2).cumsum(axis=1)
+        thresholds = rng.random_sample(n_samples) * probab[:, -1]
+        choice = np.sum(probab <= thresholds[:, None], axis=1)
+        choice = np.minimum(choice, lten.shape[1] - 1)
+        samples[:, site] = choice
+        lvec = cond[np.arange(n_samples), choice]
+        # Avoid under- or overflow on long chains
+        lvec /= np.linalg.norm(lvec, axis=1)[:, None]
+    return samples
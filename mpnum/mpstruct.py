@@ -5,12 +5,18 @@ from __future__ import absolute_import, division, print_function
 import itertools as it
 import collections
 
+import numpy as np
 from six.moves import range, zip
 
 
 __all__ = ['LocalTensors']
 
 
+# Source of version numbers for local tensors, see
+# :py:attr:`LocalTensors.versions`
+_version_counter = it.count()
+
+
 def _roview(array):
     """Creates a read only view of the numpy array `view`."""
     view = array.view()
@@ -43,12 +49,18 @@ class LocalTensors(object):
     the leftmost local tensor as well as the right virtual leg of the rightmost
     local tensor as dummy indices of dimension 1.
 
+    Entries of ``_ltens`` may also be lazy placeholders such as
+    :code:`h5py.Dataset`, which provide ``shape`` and are read with
+    ``placeholder[()]`` on first access of the local tensor (see
+    :func:`mpnum.mparray.MPArray.load`).
+
     """
 
     def __init__(self, ltens, cform=(None, None)):
         """
         :param ltens: List of local tensor according to the data structure
-            described at :class:`LocalTensors`.
+            described at :class:`LocalTensors`. Lazy placeholders are
+            allowed as well.
         :param tuple cform: Canoncial form of the local tensors passed in.
             Should follow the conventions of :py:attr:`canonical_form`.
             The following values are equivalent:
@@ -59,6 +71,7 @@ class LocalTensors(object):
 
         """
         self._ltens = list(ltens)
+        self._versions = [next(_version_counter) for _ in self._ltens]
         lcanonical, rcanonical = cform
         self._lcanonical = lcanonical or 0
         self._rcanonical = rcanonical or len(self._ltens)
@@ -85,6 +98,7 @@ class LocalTensors(object):
         and NO slices.
         """
         self._ltens[index] = tens
+        self._versions[index] = next(_version_counter)
         # If a canonical tensor is set next to a slice in canonical form,
         # the size of the canonical slice will increase by one
         # (equality case; first argument to max/min). If a canoical
@@ -100,6 +114,14 @@ class LocalTensors(object):
             self._lcanonical = min(index, self._lcanonical)
             self._rcanonical = max(index + 1, self._rcanonical)
 
+    def _get(self, index):
+        """Return the local tensor at site ``index``, which is read first if
+        it is still a lazy placeholder"""
+        lten = self._ltens[index]
+        if not isinstance(lten, np.ndarray):
+            lten = self._ltens[index] = lten[()]
+        return lten
+
     def update(self, index, tens, canonicalization=None):
         """Update the local tensor at site ``index`` to the new value ``tens``.
         Checks the rank and shape of the new values to keep the MPA consistent.
@@ -153,15 +175,16 @@ class LocalTensors(object):
         break basic MPA functionality such as :func:`dot`.
 
         """
-        for ltens in self._ltens:
-            yield _roview(ltens)
+        for index in range(len(self)):
+            yield _roview(self._get(index))
 
     def __getitem__(self, index):
         """Return a read-only view on the local tensor at site ``index``"""
         if isinstance(index, slice):
-            return (_roview(lten) for lten in self._ltens[index])
+            return (_roview(self._get(i))
+                    for i in range(*index.indices(len(self))))
         else:
-            return _roview(self._ltens[index])
+            return _roview(self._get(index))
 
     def __setitem__(self, index, value):
         """Updates the local tensor at site ``index`` with ``value`` while
@@ -188,7 +211,28 @@ class LocalTensors(object):
         """List of tuples with the dimensions of each tensor leg at each site"""
         return tuple(m.shape for m in self._ltens)
 
+    @property
+    def versions(self):
+        """Tuple of version numbers of the local tensors
+
+        The version number of a site changes whenever its local tensor is
+        replaced through :func:`update`. Version numbers are never reused
+        by other sites or other instances, so equal version numbers imply
+        equal local tensors. Copies keep the version numbers of the
+        original. This allows to cache quantities computed from the local
+        tensors, see e.g. :class:`~mpnum.mparray.Environments`.
+
+        """
+        return tuple(self._versions)
+
+    def version(self, index):
+        """Version number of the local tensor at site ``index``, see
+        :py:attr:`versions`"""
+        return self._versions[index]
+
     def copy(self):
         """Returns a deep copy of the local tensors"""
-        ltens = (lt.copy() for lt in self._ltens)
-        return type(self)(ltens, cform=self.canonical_form)
+        ltens = (self._get(i).copy() for i in range(len(self)))
+        result = type(self)(ltens, cform=self.canonical_form)
+        result._versions = list(self._versions)
+        return result
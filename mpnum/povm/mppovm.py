@@ -142,6 +142,7 @@ import numpy as np
 import mpnum.factory as factory
 import mpnum.mparray as mp
 import mpnum.mpsmpo as mpsmpo
+from ..utils import contraction_plan
 from ..utils.pmf import project_pmf
 
 
@@ -467,30 +468,22 @@ class MPPovm(mp.MPArray):
         This function contracts the same tensor network as
         :func:`self._pmf_as_array_pmps_ltr`, but it starts at both
         ends of the chain and proceeds to a certain position in the
-        middle of the chain. We choose the position such that the
-        maximal size of all intermediate results is minimal. This
-        might also minimize runtime in some cases.
+        middle of the chain. We choose the position with
+        :func:`~mpnum.utils.contraction_plan` such that the number of
+        operations is minimal and, among those positions, the maximal
+        size of all intermediate results.
 
         """
         # Axes of p_left and p_right (below):
         # 0 probab, 1 POVM leg , 2 PMPS leg , 3 PMPS-cc leg
         #
-        # p_size[i, j] will contain the p_left.size (i = 0) or
-        # p_right.size (i = 1) for j + 1 probabilities in p_left and
-        # the rest in p_right.
-        cp = np.cumprod(self.outdims, dtype=int)
-        p_size = np.array([cp[:-1], cp[-1] // cp[:-1]])
-        ranks = np.array(state.ranks, int) ** 2 * np.array(self.ranks, int)
-        p_size *= ranks[None, :]
-        # For a given possible choice of n_left, compute the maximum
-        # value of max(p_left.size, p_right.size) encountered during
-        # the computation. Considering all sizes during the
-        # computation can become necessary in some cases. See the
-        # benchmark tests for possible advantages.
-        p_size_max = [max(it.chain(p_size[0, :i], p_size[1, i:]))
-                      for i in range(p_size.shape[1])]
-        # Choose the n_left with the minimal maximum array size.
-        n_left = np.argmin(p_size_max) + 1
+        # The bonds of the contracted network are given by the POVM leg,
+        # the PMPS leg and the PMPS-cc leg.
+        ranks = [r_povm * r_state**2
+                 for r_povm, r_state in zip(self.ranks, state.ranks)]
+        n_left = contraction_plan(self.outdims, ranks, tree=False)
+        # Both parts must contain at least one site
+        n_left = min(max(n_left, 1), len(self) - 1)
 
         left = MPPovm(self.lt[:n_left])
         p_left = left._pmf_as_array_pmps_ltr(state, partial=True)
@@ -604,29 +597,10 @@ class MPPovm(mp.MPArray):
         other = MPPovm(mp.dot(tr, other).lt)
 
         # Compute all inner products between elements from self and other
-        inner = mp.dot(self.conj(), other,
-                       axes=((1, 2), (1, 2)), astype=mp.MPArray)
+        inner = abs(self._elem_inner(self, other))**2
         # Compute squared norms of all elements from inner products
-        snormsq = mp.dot(self.conj(), self,
-                         axes=((1, 2), (1, 2)), astype=mp.MPArray)
-        eye3d = mp.MPArray.from_kron(
-            # Drop inner products between different elements
-            np.fromfunction(lambda i, j, k: (i == j) & (j == k), [outdim] * 3)
-            for outdim in self.outdims
-        )
-        snormsq = mp.dot(eye3d, snormsq, axes=((1, 2), (0, 1)))
-        onormsq = mp.dot(other.conj(), other,
-                         axes=((1, 2), (1, 2)), astype=mp.MPArray)
-        eye3d = mp.MPArray.from_kron(
-            # Drop inner products between different elements
-            np.fromfunction(lambda i, j, k: (i == j) & (j == k), [outdim] * 3)
-            for outdim in other.outdims
-        )
-        onormsq = mp.dot(eye3d, onormsq, axes=((1, 2), (0, 1)))
-        inner = abs(mp.prune(inner, True).to_array_global())**2
-        inner = inner.reshape(tuple(d for d in inner.shape if d > 1))
-        snormsq = mp.prune(snormsq, True).to_array().real
-        onormsq = mp.prune(onormsq, True).to_array().real
+        snormsq = self._elem_inner(self, self, diagonal=True).real
+        onormsq = self._elem_inner(other, other, diagonal=True).real
         assert (snormsq > 0).all()
         assert (onormsq > 0).all()
         assert inner.shape == snormsq.shape + onormsq.shape
@@ -656,6 +630,50 @@ class MPPovm(mp.MPArray):
 
         return match, prefactors
 
+    @staticmethod
+    def _elem_inner(povm1, povm2, diagonal=False):
+        """Frobenius inner products between the POVM elements of ``povm1``
+        and ``povm2``
+
+        The transfer matrices are contracted from left to right (see
+        :func:`mpnum.mparray.inner`) while the outcome legs are kept open.
+        This avoids building the MPA of all inner products, whose rank is
+        the product of the ranks of ``povm1`` and ``povm2``.
+
+        :param diagonal: If ``True``, only compute the inner products
+            between elements with the same outcome (``povm1`` and
+            ``povm2`` must have the same outcome dimensions)
+        :returns: Array with the outcome legs of ``povm1`` followed by the
+            outcome legs of ``povm2`` (or only the outcome legs of
+            ``povm1`` if ``diagonal`` is ``True``). Outcome legs of
+            dimension one are omitted.
+
+        """
+        # Axes: outcomes1, outcomes2, bond of povm1, bond of povm2
+        lvec = np.ones((1, 1, 1, 1))
+        for lt1, lt2 in zip(povm1.lt, povm2.lt):
+            # Axes: outcomes1, outcomes2, bond2, outcome1, hilbert,
+            # hilbert, bond1'
+            lvec = np.tensordot(lvec, lt1.conj(), axes=(2, 0))
+            if diagonal:
+                lvec = np.stack([
+                    np.tensordot(lvec[:, :, :, k], lt2[:, k],
+                                 axes=((2, 3, 4), (0, 1, 2)))
+                    for k in range(lt2.shape[1])], axis=1)
+            else:
+                # Axes: outcomes1, outcomes2, outcome1, bond1', outcome2,
+                # bond2'
+                lvec = np.tensordot(lvec, lt2, axes=((2, 4, 5), (0, 2, 3)))
+                lvec = lvec.transpose((0, 2, 1, 4, 3, 5))
+            lvec = lvec.reshape((lvec.shape[0] * lvec.shape[1], -1)
+                                + lvec.shape[-2:])
+
+        shape1 = tuple(lt.shape[1] for lt in povm1.lt if lt.shape[1] > 1)
+        if diagonal:
+            return lvec.reshape(shape1)
+        shape2 = tuple(lt.shape[1] for lt in povm2.lt if lt.shape[1] > 1)
+        return lvec.reshape(shape1 + shape2)
+
     @staticmethod
     def _sample_cond_single(rng, marginal_pmf, n_group, out, eps):
         """Single sample from conditional probab. (call :func:`self.sample`)"""
@@ -8,8 +8,8 @@ from scipy import linalg
 from scipy.sparse.linalg import aslinearoperator
 from six.moves import range, zip
 
-__all__ = ['block_diag', 'matdot', 'mkron', 'partial_trace',
-           'truncated_svd', 'randomized_svd']
+__all__ = ['block_diag', 'contraction_costs', 'contraction_plan', 'matdot',
+           'mkron', 'partial_trace', 'truncated_svd', 'randomized_svd']
 
 
 def partial_trace(array, traceout):
@@ -36,6 +36,90 @@ def matdot(A, B, axes=((-1,), (0,))):
     return np.tensordot(A, B, axes=axes)
 
 
+def contraction_costs(dims, ranks, tree=True):
+    """Estimate the cost of contracting a chain of tensors completely
+
+    Site ``i`` of the chain is a tensor with a left virtual leg of size
+    ``ranks[i - 1]``, physical legs of total size ``dims[i]`` and a right
+    virtual leg of size ``ranks[i]`` (the outermost virtual legs have size
+    one). We consider the following orders:
+
+    * ``k`` (integer from ``0`` to ``len(dims)``): Contract sites
+      ``[:k]`` from left to right and sites ``[k:]`` from right to left,
+      then contract both parts. ``len(dims)`` is left to right and ``0`` is
+      right to left.
+
+    * ``'tree'``: Split the chain in halves recursively and contract
+      neighbouring parts pairwise.
+
+    :param dims: Total size of the physical legs on each site
+    :param ranks: Sizes of the ``len(dims) - 1`` virtual legs
+    :param tree: Whether to consider the order ``'tree'``
+        (default: ``True``)
+    :returns: Dictionary mapping each order to ``(flops, peak)`` where
+        ``flops`` is the number of multiply-adds and ``peak`` the largest
+        number of entries of an intermediate result or the result
+
+    """
+    dims = [int(d) for d in dims]
+    bonds = [1] + [int(r) for r in ranks] + [1]
+    nr_sites = len(dims)
+    assert len(bonds) == nr_sites + 1
+    # prods[i] = prod(dims[:i])
+    prods = [1]
+    for dim in dims:
+        prods.append(prods[-1] * dim)
+    total = prods[-1]
+
+    # Cost and result size of adding site i to the left or right part
+    lflops = [prods[i] * bonds[i] * dims[i] * bonds[i + 1]
+              for i in range(nr_sites)]
+    lsizes = [prods[i + 1] * bonds[i + 1] for i in range(nr_sites)]
+    rflops = [bonds[i] * dims[i] * bonds[i + 1] * (total // prods[i + 1])
+              for i in range(nr_sites)]
+    rsizes = [bonds[i] * (total // prods[i]) for i in range(nr_sites)]
+
+    costs = {}
+    for k in range(nr_sites + 1):
+        flops = sum(lflops[:k]) + sum(rflops[k:])
+        if 0 < k < nr_sites:
+            flops += prods[k] * bonds[k] * (total // prods[k])
+        costs[k] = flops, max(lsizes[:k] + rsizes[k:] + [total])
+
+    if tree:
+        def tree_costs(start, stop):
+            size = bonds[start] * (prods[stop] // prods[start]) * bonds[stop]
+            if stop - start == 1:
+                return 0, size
+            mid = (start + stop) // 2
+            lflops, lpeak = tree_costs(start, mid)
+            rflops, rpeak = tree_costs(mid, stop)
+            return (lflops + rflops + size * bonds[mid],
+                    max(lpeak, rpeak, size))
+        costs['tree'] = tree_costs(0, nr_sites)
+    return costs
+
+
+def contraction_plan(dims, ranks, tree=True):
+    """Cheapest order for contracting a chain of tensors completely
+
+    Returns the order from :func:`contraction_costs` with the smallest
+    number of operations; among those, the one with the smallest peak
+    memory. Remaining ties go to the smallest split ``k``, with
+    ``'tree'`` last, so the result does not depend on dictionary order.
+
+    >>> contraction_plan([2] * 6, [4, 16, 32, 16, 4])
+    3
+    >>> contraction_plan([64, 2, 2, 2], [2, 2, 2])
+    0
+
+    """
+    costs = contraction_costs(dims, ranks, tree)
+    # min() returns the first minimum in the order of the candidates
+    orders = list(range(len(dims) + 1)) + (['tree'] if tree else [])
+    return min(orders, key=lambda order: costs[order])
+
+
 def mkron(*args):
     """np.kron() with an arbitrary number of n >= 1 arguments"""
     if len(args) == 1:
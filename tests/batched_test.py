@@ -0,0 +1,105 @@
+# encoding: utf-8
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import pytest as pt
+from numpy.testing import assert_array_almost_equal
+
+import mpnum.batched as bt
+import mpnum.factory as factory
+import mpnum.mparray as mp
+from mpnum._testing import assert_mpa_almost_equal
+
+BATCHSIZE = 4
+
+
+def _random_batch(nr_sites, ldims, rank, rgen, dtype):
+    mpas = [factory.random_mpa(nr_sites, ldims, rank, randstate=rgen,
+                               dtype=dtype)
+            for _ in range(BATCHSIZE)]
+    return mpas, bt.BatchedMPArray.from_mpas(mpas)
+
+
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_from_and_to_mpas(nr_sites, local_dim, rank, rgen, dtype):
+    mpas, batch = _random_batch(nr_sites, local_dim, rank, rgen, dtype)
+    assert batch.batchsize == BATCHSIZE
+    assert batch.ranks == mpas[0].ranks
+    assert batch.shape == mpas[0].shape
+    assert batch.dtype == dtype
+    for mpa, member in zip(mpas, batch.to_mpas()):
+        assert_mpa_almost_equal(member, mpa, full=True)
+
+    mpas[0] = factory.random_mpa(nr_sites, local_dim + 1, rank,
+                                 randstate=rgen, dtype=dtype)
+    with pt.raises(ValueError):
+        bt.BatchedMPArray.from_mpas(mpas)
+
+
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_dot_inner_norm(nr_sites, local_dim, rank, rgen, dtype):
+    mpos, mpo_batch = _random_batch(nr_sites, (local_dim, local_dim), rank,
+                                    rgen, dtype)
+    mpss, mps_batch = _random_batch(nr_sites, local_dim, rank, rgen, dtype)
+
+    product = bt.dot(mpo_batch, mps_batch)
+    for mpo, mps, member in zip(mpos, mpss, product.to_mpas()):
+        assert_mpa_almost_equal(member, mp.dot(mpo, mps), full=True)
+    product = bt.dot(mpos[0], mps_batch)
+    for mps, member in zip(mpss, product.to_mpas()):
+        assert_mpa_almost_equal(member, mp.dot(mpos[0], mps), full=True)
+
+    assert_array_almost_equal(
+        bt.inner(mpo_batch, mpo_batch.conj()),
+        [mp.inner(mpo, mpo.conj()) for mpo in mpos])
+    assert_array_almost_equal(bt.inner(mpss[0], mps_batch),
+                              [mp.inner(mpss[0], mps) for mps in mpss])
+    assert_array_almost_equal(bt.norm(mpo_batch),
+                              [mp.norm(mpo) for mpo in mpos])
+
+
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_canonicalize(nr_sites, local_dim, rank, rgen):
+    mpas, batch = _random_batch(nr_sites, (local_dim, local_dim), rank,
+                                rgen, np.complex_)
+    for left, right in [(None, None), (None, 'afull'), ('afull', None),
+                        (1, 2), (None, -1)]:
+        if nr_sites < 3 and (left, right) == (1, 2):
+            continue
+        if nr_sites < 2 and right == -1:
+            continue
+        batch.canonicalize(left=left, right=right)
+        for i, (mpa, member) in enumerate(zip(mpas, batch.to_mpas())):
+            assert_mpa_almost_equal(member, mpa, full=True)
+            member.canonicalize(left=left, right=right)
+            assert_array_almost_equal(member.lt[0].ravel(),
+                                      batch[i].lt[0].ravel())
+
+    with pt.raises(IndexError):
+        batch.canonicalize(left=nr_sites + 1)
+    with pt.raises(ValueError):
+        batch.canonicalize(left=nr_sites, right=nr_sites)
+
+
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_compress(nr_sites, local_dim, rank, rgen, dtype):
+    mpas, batch = _random_batch(nr_sites, local_dim, rank, rgen, dtype)
+    overlap, truncerrs = batch.compress(rank=2, return_truncerr=True)
+    assert truncerrs.shape == (BATCHSIZE, nr_sites - 1)
+    for i, mpa in enumerate(mpas):
+        compr, want_overlap, want_truncerrs = mpa.compression(
+            rank=2, direction='right', return_truncerr=True)
+        assert batch.ranks == compr.ranks
+        assert_mpa_almost_equal(batch[i], compr, full=True)
+        assert_array_almost_equal(overlap[i], want_overlap)
+        assert_array_almost_equal(truncerrs[i], want_truncerrs)
+
+    mpas, batch = _random_batch(nr_sites, local_dim, rank, rgen, dtype)
+    batch.compress(relerr=0.1)
+    for mpa, member in zip(mpas, batch.to_mpas()):
+        compr, _ = mpa.compression(relerr=0.1, direction='right')
+        assert all(r1 >= r2 for r1, r2 in zip(batch.ranks, compr.ranks))
+        assert mp.normdist(member, mpa) <= mp.normdist(compr, mpa) + 1e-10
@@ -0,0 +1,259 @@
+# encoding: utf-8
+from __future__ import absolute_import, division, print_function
+
+import functools as ft
+
+import numpy as np
+import pytest as pt
+from numpy.testing import assert_almost_equal, assert_array_almost_equal
+from scipy.sparse.linalg import eigsh
+
+import mpnum.blocksparse as bs
+import mpnum.factory as factory
+import mpnum.linalg
+import mpnum.mparray as mp
+
+# labels, modulus
+SYMMETRIES = [([0, 1], None), ([0, 1, 1, 2], None), ([0, 1, 2], 3)]
+BS_TEST_PARAMETERS = [(1, 1), (2, 2), (4, 2), (5, 1)]
+
+
+def _random_symmetric(flows, labels, modulus, charge, rgen, dtype):
+    """Random array with one leg for each entry of ``flows`` and charge
+    ``charge``"""
+    labels = np.asarray(labels)
+    shape = (len(labels),) * len(flows)
+    total = sum(flow * labels[idx]
+                for flow, idx in zip(flows, np.indices(shape)))
+    mask = total - charge
+    if modulus is not None:
+        mask %= modulus
+    randfunc = factory._zrandn if dtype == np.complex_ else factory._randn
+    return randfunc(shape, rgen) * (mask == 0)
+
+
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('labels, modulus', SYMMETRIES)
+def test_tensor_from_dense(labels, modulus, rgen, dtype):
+    legs = [bs.Leg(labels, 1), bs.Leg(labels, -1), bs.Leg(labels, 1)]
+    array = _random_symmetric([1, -1, 1], labels, modulus, 0, rgen, dtype)
+    tens = bs.BlockSparseTensor.from_dense(array, legs, modulus, charge=0)
+    assert_array_almost_equal(tens.to_dense(), array)
+    assert tens.size < array.size
+    assert_array_almost_equal(tens.conj().to_dense(), array.conj())
+    assert_array_almost_equal(tens.transpose((2, 0, 1)).to_dense(),
+                              array.transpose((2, 0, 1)))
+
+    with pt.raises(ValueError):
+        bs.BlockSparseTensor.from_dense(array + 1, legs, modulus)
+
+
+@pt.mark.parametrize('labels, modulus', SYMMETRIES)
+def test_tensordot_and_fuse(labels, modulus, rgen):
+    dtype = np.complex_
+    legs_a = [bs.Leg(labels, 1), bs.Leg(labels, -1), bs.Leg(labels, -1)]
+    legs_b = [bs.Leg(labels, 1), bs.Leg(labels, -1), bs.Leg(labels, -1)]
+    arr_a = _random_symmetric([1, -1, -1], labels, modulus, 0, rgen, dtype)
+    arr_b = _random_symmetric([1, -1, -1], labels, modulus, 0, rgen, dtype)
+    a = bs.BlockSparseTensor.from_dense(arr_a, legs_a, modulus)
+    b = bs.BlockSparseTensor.from_dense(arr_b, legs_b, modulus)
+
+    res = bs.tensordot(a, b, ((2,), (0,)))
+    assert_array_almost_equal(res.to_dense(),
+                              np.tensordot(arr_a, arr_b, axes=(2, 0)))
+    with pt.raises(ValueError):
+        bs.tensordot(a, b, ((0,), (0,)))
+
+    fused = bs.fuse(res, 1)
+    shape = res.shape
+    assert_array_almost_equal(
+        fused.to_dense(),
+        res.to_dense().reshape((shape[0], shape[1] * shape[2], shape[3])))
+
+
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('labels, modulus', SYMMETRIES)
+@pt.mark.parametrize('nr_sites, charge', BS_TEST_PARAMETERS)
+def test_from_array_inner(nr_sites, charge, labels, modulus, rgen, dtype):
+    arr1 = _random_symmetric([1] * nr_sites, labels, modulus, charge, rgen,
+                             dtype)
+    arr2 = _random_symmetric([1] * nr_sites, labels, modulus, charge, rgen,
+                             dtype)
+    mps1 = bs.from_array(arr1, labels, modulus=modulus, charge=charge)
+    mps2 = bs.from_array(arr2, labels, modulus=modulus, charge=charge)
+    assert_array_almost_equal(mps1.to_mparray().to_array(), arr1)
+    assert mps1.size <= mp.MPArray.from_array(arr1, 1).size
+
+    assert_almost_equal(bs.inner(mps1, mps2), np.vdot(arr1, arr2))
+    assert_almost_equal(bs.norm(mps1), np.linalg.norm(arr1))
+
+    # States with different charges are orthogonal
+    mps3 = bs.from_array(np.ones((1,) * nr_sites), [0], modulus=modulus)
+    mps3.lt[-1] = bs.BlockSparseTensor(
+        mps3.lt[-1].legs[:-1] + [bs.Leg([charge + 1], -1)], {}, modulus)
+    assert bs.inner(mps3, mps3) == 0
+
+
+@pt.mark.parametrize('labels, modulus', SYMMETRIES)
+@pt.mark.parametrize('nr_sites, charge', BS_TEST_PARAMETERS)
+def test_canonicalize_compress(nr_sites, charge, labels, modulus, rgen):
+    arr = _random_symmetric([1] * nr_sites, labels, modulus, charge, rgen,
+                            np.complex_)
+    mps = bs.from_array(arr, labels, modulus=modulus, charge=charge)
+
+    mps.canonicalize(left='afull')
+    dense = mps.to_mparray()
+    assert dense.canonical_form == (0, len(dense))
+    assert_array_almost_equal(dense.to_array(), arr)
+    for lten in dense.lt[:-1]:
+        lten = lten.reshape((-1, lten.shape[-1]))
+        assert_array_almost_equal(np.dot(lten.conj().T, lten),
+                                  np.eye(lten.shape[1]))
+    mps.canonicalize(right='afull')
+    for lten in mps.to_mparray().lt[1:]:
+        lten = lten.reshape((lten.shape[0], -1))
+        assert_array_almost_equal(np.dot(lten, lten.conj().T),
+                                  np.eye(lten.shape[0]))
+    assert_array_almost_equal(mps.to_mparray().to_array(), arr)
+
+    # Truncation discards the same weight as the dense compression
+    rank = 2
+    dense = mp.MPArray.from_array(arr, 1)
+    _, truncerrs_dense = dense.compress(method='svd', rank=rank,
+                                        return_truncerr=True)
+    truncerrs = mps.compress(rank=rank)
+    assert max(mps.ranks + (0,)) <= rank
+    assert_array_almost_equal(truncerrs, truncerrs_dense)
+    assert_array_almost_equal(mps.to_mparray().to_array(), dense.to_array())
+
+
+@pt.mark.parametrize('labels, modulus', SYMMETRIES)
+@pt.mark.parametrize('nr_sites, charge', [(1, 1), (2, 2), (3, 1)])
+def test_dot(nr_sites, charge, labels, modulus, rgen):
+    dtype = np.complex_
+    op = _random_symmetric([1, -1] * nr_sites, labels, modulus, 0, rgen,
+                           dtype)
+    arr = _random_symmetric([1] * nr_sites, labels, modulus, charge, rgen,
+                            dtype)
+    mpo = bs.from_array(op, labels, ndims=2, modulus=modulus)
+    mps = bs.from_array(arr, labels, modulus=modulus, charge=charge)
+    dense_mpo = mp.MPArray.from_array(op, 2)
+    dense_mps = mp.MPArray.from_array(arr, 1)
+
+    res = bs.dot(mpo, mps)
+    assert res.charge == (charge if modulus is None else charge % modulus)
+    assert_array_almost_equal(res.to_mparray().to_array(),
+                              mp.dot(dense_mpo, dense_mps).to_array())
+    res = bs.dot(mpo, mpo)
+    assert_array_almost_equal(res.to_mparray().to_array(),
+                              mp.dot(dense_mpo, dense_mpo).to_array())
+
+
+@pt.mark.parametrize('labels, modulus', SYMMETRIES)
+def test_product_state(labels, modulus):
+    indices = [len(labels) - 1, 0, 1, len(labels) - 1]
+    mps = bs.product_state(indices, labels, modulus)
+    assert mps.ranks == (1, 1, 1)
+    want_charge = sum(labels[i] for i in indices)
+    assert mps.charge == (want_charge if modulus is None
+                          else want_charge % modulus)
+    want = np.zeros((len(labels),) * len(indices))
+    want[tuple(indices)] = 1
+    assert_array_almost_equal(mps.to_mparray().to_array(), want)
+
+
+@pt.mark.parametrize('var_sites', [1, 2])
+@pt.mark.parametrize('labels, modulus', SYMMETRIES)
+def test_eig(labels, modulus, var_sites, rgen):
+    nr_sites, charge = 4, 1
+    op = _random_symmetric([1, -1] * nr_sites, labels, modulus, 0, rgen,
+                           np.complex_)
+    # Make the operator hermitian: Swap row and column legs on each site
+    op = op + op.transpose(np.arange(2 * nr_sites).reshape((-1, 2))[:, ::-1]
+                           .ravel()).conj()
+    mpo = bs.from_array(op, labels, ndims=2, modulus=modulus)
+
+    # Smallest eigenvalue within the charge sector
+    dense = mp.MPArray.from_array(op, 2).to_array_global()
+    dense = dense.reshape((len(labels)**nr_sites,) * 2)
+    charges = sum(np.ix_(*[labels] * nr_sites)).ravel()
+    sector = (charges if modulus is None else charges % modulus) == charge
+    want = np.linalg.eigvalsh(dense[np.ix_(sector, sector)])[0]
+
+    if var_sites == 1:
+        # Single-site updates do not increase the rank
+        startvec = bs.from_array(
+            _random_symmetric([1] * nr_sites, labels, modulus, charge, rgen,
+                              np.complex_),
+            labels, modulus=modulus, charge=charge)
+    else:
+        indices = [labels.index(1)] + [labels.index(0)] * (nr_sites - 1)
+        startvec = bs.product_state(indices, labels, modulus)
+    eigs = ft.partial(eigsh, k=1, which='SA', tol=1e-10)
+    eigval, eigvec, history = mpnum.linalg.eig(
+        mpo, num_sweeps=30, var_sites=var_sites, startvec=startvec,
+        eigs=eigs, rank_schedule=len(labels)**2, eigval_tol=1e-10,
+        return_history=True)
+    assert isinstance(eigvec, bs.BlockSparseMPArray)
+    assert eigvec.charge == charge
+    assert len(history) < 30
+    assert_almost_equal(eigval, want)
+    assert_almost_equal(bs.norm(eigvec), 1)
+    # The eigenvector error is of the order of the square root of the
+    # eigenvalue error
+    vec = eigvec.to_mparray().to_array().ravel()
+    assert_array_almost_equal(np.dot(dense, vec), eigval * vec, decimal=4)
+
+    with pt.raises(ValueError):
+        mpnum.linalg.eig(mpo, num_sweeps=1, startvec_rank=4)
+    with pt.raises(ValueError):
+        mpnum.linalg.eig(mpo, num_sweeps=1, var_sites=1, startvec=startvec,
+                         expansion=1e-3)
+    with pt.raises(ValueError):
+        mpnum.linalg.eig(mpo, num_sweeps=1, startvec=startvec,
+                         randstate=rgen)
+
+
+def test_eig_product_state(rgen):
+    # Hard-core bosons with hopping, interaction and a random potential
+    nr_sites, charge, labels = 6, 2, [0, 1]
+    a, n = np.array([[0, 1], [0, 0]]), np.diag([0, 1])
+    terms = [np.kron(a.T, a) + np.kron(a, a.T) - 0.3 * np.kron(n, n) +
+             rgen.randn() * np.kron(n, np.eye(2))
+             for _ in range(nr_sites - 1)]
+    dense_mpo = mp.local_sum([mp.MPArray.from_array_global(
+        term.reshape((2,) * 4), ndims=2) for term in terms])
+    mpo = bs.from_array(dense_mpo.to_array(), labels, ndims=2)
+    mpo.compress(relerr=1e-12)
+
+    dense = dense_mpo.to_array_global().reshape((2**nr_sites,) * 2)
+    sector = sum(np.ix_(*[labels] * nr_sites)).ravel() == charge
+    want = np.linalg.eigvalsh(dense[np.ix_(sector, sector)])[[0, -1]]
+
+    startvec = bs.product_state([1] * charge + [0] * (nr_sites - charge),
+                                labels)
+    eigs = ft.partial(eigsh, k=1, which='SA', tol=1e-8)
+    eigval, eigvec = mpnum.linalg.eig(mpo, num_sweeps=10, startvec=startvec,
+                                      eigs=eigs, rank_schedule=8,
+                                      eigval_tol=1e-10)
+    assert eigvec.charge == charge
+    assert max(eigvec.ranks) > 1
+    assert_almost_equal(eigval, want[0])
+
+    # Any callable is used for all local problems, including those on
+    # charge sectors with fewer than three states
+    def eigs_largest(op, v0):
+        return eigsh(op, k=1, which='LA', v0=v0, tol=1e-8)
+
+    eigval, _ = mpnum.linalg.eig(mpo, num_sweeps=10, startvec=startvec,
+                                 eigs=eigs_largest, rank_schedule=8,
+                                 eigval_tol=1e-10)
+    assert_almost_equal(eigval, want[1])
+
+    # The rank of a product state cannot grow without rank_schedule or
+    # with single-site updates
+    with pt.raises(ValueError):
+        mpnum.linalg.eig(mpo, num_sweeps=1, startvec=startvec, eigs=eigs)
+    with pt.raises(ValueError):
+        mpnum.linalg.eig(mpo, num_sweeps=1, var_sites=1, startvec=startvec,
+                         eigs=eigs, rank_schedule=8)
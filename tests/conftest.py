@@ -11,6 +11,6 @@ def pytest_namespace():
     )
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture
 def rgen():
     return np.random.RandomState(seed=3476583865)
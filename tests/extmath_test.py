@@ -112,3 +112,15 @@ def test_randomized_svd(rows, cols, rank, dtype, transpose, n_iter, target_gen,
     assert_allclose(s.ravel() - s_ref, 0, atol=1e-3)
     # Check that singular values are returned in descending order
     assert_array_equal(s, np.sort(s)[::-1])
+
+
+@pt.mark.parametrize('nr_sites', [2, 3, 5])
+def test_contraction_plan_ties(nr_sites):
+    # Symmetric chain: Splits k and nr_sites - k cost the same
+    dims, ranks = [3] * nr_sites, [3] * (nr_sites - 1)
+    costs = em.contraction_costs(dims, ranks, tree=False)
+    assert costs[0] == costs[nr_sites]
+    best = min(costs.values())
+    ties = [k for k in range(nr_sites + 1) if costs[k] == best]
+    assert len(ties) > 1
+    assert em.contraction_plan(dims, ranks, tree=False) == ties[0]
@@ -5,7 +5,7 @@ from __future__ import division, print_function
 
 import numpy as np
 import pytest as pt
-from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_almost_equal, assert_array_almost_equal
 
 import mpnum.factory as factory
 from mpnum._testing import assert_correct_normalization
@@ -44,3 +44,27 @@ def test_diagonal_mpa(nr_sites, local_dim, _, rgen, dtype):
 
     if nr_sites > 1:
         assert max(mpa_mp.ranks) == local_dim
+
+
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_from_function(nr_sites, local_dim, rank, rgen):
+    mpa = factory.random_mpa(nr_sites, local_dim, rank, randstate=rgen)
+    queried = []
+
+    def func(indices):
+        queried.append(len(indices))
+        return mpa.get_many(indices)
+
+    result = factory.from_function(func, [local_dim] * nr_sites, rank,
+                                   tol=1e-10, randstate=rgen)
+    assert_array_almost_equal(result.to_array(), mpa.to_array())
+    assert max(result.ranks + (1,)) <= max(mpa.ranks + (1,))
+    # Only fibers on one site are queried at a time
+    assert max(queried) <= local_dim * max(mpa.ranks + (1,))**2
+
+    # Ranks which the function does not need are removed
+    result = factory.from_function(lambda idx: np.prod(idx + 1., axis=1),
+                                   [local_dim] * nr_sites, 5, randstate=rgen)
+    assert result.ranks == (1,) * (nr_sites - 1)
+    assert_almost_equal(result.get((local_dim - 1,) * nr_sites).to_array(),
+                        local_dim**nr_sites)
@@ -8,7 +8,8 @@ import functools as ft
 import numpy as np
 import pytest as pt
 from _pytest.mark import matchmark
-from numpy.testing import assert_almost_equal
+from numpy.testing import (assert_almost_equal, assert_array_almost_equal,
+                           assert_array_equal)
 from scipy.sparse.linalg import eigsh
 
 import mpnum as mp
@@ -60,6 +61,41 @@ def test_eig(nr_sites, local_dim, rank, which, var_sites, rgen, request):
     assert_almost_equal(1, abs(overlap), decimal=14)
 
 
+@pt.mark.parametrize('var_sites', [1, 2, 3])
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+def test_eig_local_op_linear(var_sites, dtype, rgen):
+    randfunc = ft.partial(factory._randfuncs[dtype], randstate=rgen)
+    leftvec = randfunc((2, 5, 2))
+    mpo_ltens = [randfunc((5, 3, 3, 4))]
+    mpo_ltens += [randfunc((4, 3, 3, 4)) for _ in range(var_sites - 1)]
+    rightvec = randfunc((2, 4, 2))
+    op = mpnum.linalg._eig_local_op(leftvec, mpo_ltens, rightvec)
+    linop = mpnum.linalg._eig_local_op_linear(leftvec, mpo_ltens, rightvec)
+    assert linop.shape == op.shape
+    vec = randfunc((op.shape[1],))
+    assert_array_almost_equal(linop.matvec(vec), op.dot(vec))
+    assert_array_almost_equal(linop.matvec(vec[:, None]), op.dot(vec)[:, None])
+
+
+@pt.mark.parametrize('var_sites', [1, 2])
+@pt.mark.parametrize('nr_sites, local_dim, rank', [(4, 3, 2), (6, 2, 4)])
+def test_eig_matfree(nr_sites, local_dim, rank, var_sites, rgen):
+    mpo = factory.random_mpo(nr_sites, local_dim, rank, randstate=rgen,
+                             hermitian=True, normalized=True)
+    mpo.canonicalize()
+    startvec = factory.random_mpa(nr_sites, local_dim, 3 * rank,
+                                  randstate=rgen, dtype=np.complex_,
+                                  normalized=True)
+    eigs = ft.partial(eigsh, k=1, which='SA', tol=1e-10)
+    eigval, eigvec = mp.eig(mpo, num_sweeps=3, var_sites=var_sites,
+                            startvec=startvec, eigs=eigs)
+    eigval_mf, eigvec_mf = mp.eig(mpo, num_sweeps=3, var_sites=var_sites,
+                                  startvec=startvec, eigs=eigs, matfree=True)
+    assert_almost_equal(eigval, eigval_mf)
+    overlap = mp.inner(eigvec, eigvec_mf)
+    assert_almost_equal(abs(overlap), 1)
+
+
 @pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
 def test_eig_sum(nr_sites, local_dim, rank, rgen):
     # Need at least three sites for var_sites = 2
@@ -94,6 +130,108 @@ def test_eig_sum(nr_sites, local_dim, rank, rgen):
     assert_almost_equal(abs(overlap), 1)
 
 
+@pt.mark.parametrize('var_sites', [1, 2])
+@pt.mark.parametrize('nr_sites, local_dim, rank', [(4, 3, 2), (6, 2, 4)])
+def test_eig_sum_matfree(nr_sites, local_dim, rank, var_sites, rgen):
+    mpo = factory.random_mpo(nr_sites, local_dim, rank, randstate=rgen,
+                             hermitian=True, normalized=True)
+    mps = factory.random_mpa(nr_sites, local_dim, rank, randstate=rgen,
+                             dtype=np.complex_, normalized=True)
+    mpas = [mpo, mps, mpo]
+    startvec = factory.random_mpa(nr_sites, local_dim, 3 * rank,
+                                  randstate=rgen, dtype=np.complex_,
+                                  normalized=True)
+    eigs = ft.partial(eigsh, k=1, which='SA', tol=1e-10)
+    eigval, eigvec = mp.eig_sum(mpas, num_sweeps=3, var_sites=var_sites,
+                                startvec=startvec, eigs=eigs)
+    eigval_mf, eigvec_mf = mp.eig_sum(mpas, num_sweeps=3, var_sites=var_sites,
+                                      startvec=startvec, eigs=eigs,
+                                      matfree=True)
+    assert_almost_equal(eigval, eigval_mf)
+    overlap = mp.inner(eigvec, eigvec_mf)
+    assert_almost_equal(abs(overlap), 1)
+
+
+@pt.mark.parametrize('matfree', [False, True])
+@pt.mark.parametrize('var_sites', [1, 2])
+def test_eig_sum_workers(var_sites, matfree, rgen):
+    nr_sites, local_dim, rank = 5, 2, 3
+    mpas = [factory.random_mpo(nr_sites, local_dim, rank, randstate=rgen,
+                               hermitian=True, normalized=True)
+            for _ in range(3)]
+    mpas.append(factory.random_mpa(nr_sites, local_dim, rank, randstate=rgen,
+                                   dtype=np.complex_, normalized=True))
+    startvec = factory.random_mpa(nr_sites, local_dim, 2 * rank,
+                                  randstate=rgen, dtype=np.complex_,
+                                  normalized=True)
+    eigs = ft.partial(eigsh, k=1, which='SA', tol=1e-10)
+    eigval, eigvec = mp.eig_sum(mpas, num_sweeps=2, var_sites=var_sites,
+                                startvec=startvec, eigs=eigs, matfree=matfree)
+    for workers in [1, 3]:
+        eigval_w, eigvec_w = mp.eig_sum(
+            mpas, num_sweeps=2, var_sites=var_sites, startvec=startvec,
+            eigs=eigs, matfree=matfree, workers=workers)
+        # Results must be bitwise identical
+        assert eigval_w == eigval
+        for lten, lten_w in zip(eigvec.lt, eigvec_w.lt):
+            assert_array_equal(lten_w, lten)
+
+
+@pt.mark.parametrize('var_sites', [1, 2])
+def test_eig_history_and_tol(var_sites, rgen):
+    nr_sites, gamma, rank = 10, 0.61, 6
+    mpo = physics.mpo_cH(physics.cXY_local_terms(nr_sites, gamma))
+    eigs = ft.partial(eigsh, k=1, which='SA', tol=1e-8)
+    startvec = factory.random_mpa(nr_sites, 2, rank, randstate=rgen,
+                                  dtype=np.complex_, normalized=True)
+    eigval, eigvec, history = mp.eig(
+        mpo, num_sweeps=20, var_sites=var_sites, startvec=startvec,
+        eigs=eigs, eigval_tol=1e-8, overlap_tol=1e-8, return_history=True)
+    assert 1 < len(history) < 20
+    assert history[0]['overlap'] is None
+    assert 1 - history[-1]['overlap'] <= 1e-8
+    assert abs(history[-1]['eigvals'][-1] - history[-2]['eigvals'][-1]) <= 1e-8
+    assert history[-1]['eigvals'][-1] == eigval
+    for record in history:
+        assert record['time'] >= 0
+        assert record['truncerrs'].shape == (len(record['eigvals']),
+                                             var_sites - 1)
+        assert (record['truncerrs'] >= 0).all()
+        assert_almost_equal(record['truncerr'], record['truncerrs'].sum())
+    assert len(history[0]['eigvals']) == 2 * (nr_sites - var_sites) + 1
+    assert len(history[1]['eigvals']) == 2 * (nr_sites - var_sites)
+
+    eigval_sum, _, history_sum = mp.eig_sum(
+        [mpo], num_sweeps=20, var_sites=var_sites, startvec=startvec,
+        eigs=eigs, eigval_tol=1e-8, return_history=True)
+    assert len(history_sum) < 20
+    assert_almost_equal(eigval_sum, eigval)
+
+
+@pt.mark.parametrize('var_sites, expansion', [
+    (1, (1e-1, 1e-2, 1e-3, 0)), (1, 1e-2), (2, None)])
+def test_eig_rank_schedule(var_sites, expansion, rgen):
+    nr_sites, gamma, tol = 10, 0.61, 1e-3
+    E0 = physics.cXY_E0(nr_sites, gamma)
+    mpo = physics.mpo_cH(physics.cXY_local_terms(nr_sites, gamma))
+    eigs = ft.partial(eigsh, k=1, which='SA', tol=1e-8)
+    E0_mp, eigvec = mp.eig(
+        mpo, num_sweeps=6, var_sites=var_sites, rank_schedule=(2, 4, 8),
+        expansion=expansion, randstate=rgen, eigs=eigs)
+    assert abs(E0_mp - E0) <= tol
+    assert max(eigvec.ranks) == 8
+    full_rank = mp.full_rank(eigvec.shape)
+    assert all(r <= f for r, f in zip(eigvec.ranks, full_rank))
+    assert_almost_equal(mp.norm(eigvec), 1)
+
+
+def test_eig_expansion_requires_single_site(rgen):
+    mpo = factory.random_mpo(4, 2, 2, randstate=rgen, hermitian=True)
+    with pt.raises(ValueError):
+        mp.eig(mpo, num_sweeps=1, var_sites=2, startvec_rank=2,
+               expansion=1e-2)
+
+
 @pt.mark.parametrize('nr_sites, gamma, rank, tol', [
     (10, 0.61, 6, 1e-3),
     pt.mark.verylong((50, 0.95, 16, 1e-12)),
@@ -46,6 +46,65 @@ def test_from_full(nr_sites, local_dim, _, rgen, dtype):
     assert mpo.dtype == dtype
 
 
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_from_full_truncated(nr_sites, local_dim, rank, rgen, dtype):
+    mpo = factory.random_mpa(nr_sites, (local_dim, local_dim), rank,
+                             randstate=rgen, dtype=dtype)
+    array = mpo.to_array()
+    for kwargs in [dict(rank=2), dict(relerr=0.1), dict(rank=2, relerr=0.1)]:
+        result = mp.MPArray.from_array(array, 2, **kwargs)
+        compr, _ = mp.MPArray.from_array(array, 2).compression(
+            direction='right', **kwargs)
+        assert result.ranks == compr.ranks
+        assert_array_almost_equal(result.to_array(), compr.to_array())
+        assert_correct_normalization(result, len(result) - 1, len(result))
+
+    result = mp.MPArray.from_array_global(mpo.to_array_global(), 2,
+                                          rank=max(mpo.ranks + (1,)))
+    assert_array_almost_equal(result.to_array(), array)
+
+
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_from_array_streamed(nr_sites, local_dim, rank, rgen, dtype, tmpdir):
+    mpo = factory.random_mpa(nr_sites, (local_dim, local_dim), rank,
+                             randstate=rgen, dtype=dtype)
+    array = mpo.to_array()
+    stored = np.lib.format.open_memmap(str(tmpdir / 'array.npy'), mode='w+',
+                                       dtype=dtype, shape=array.shape)
+    stored[...] = array
+    result = mp.MPArray.from_array_streamed(stored, 2, blocksize=20)
+    assert_array_almost_equal(result.to_array(), array)
+    assert result.dtype == dtype
+    full = mp.MPArray.from_array(array, 2)
+    assert all(r1 <= r2 for r1, r2 in zip(result.ranks, full.ranks))
+
+    result = mp.MPArray.from_array_streamed(stored, 2, blocksize=20,
+                                            rank=max(mpo.ranks + (1,)))
+    assert result.ranks == mpo.ranks
+    assert_array_almost_equal(result.to_array(), array)
+    result = mp.MPArray.from_array_streamed(stored, 2, blocksize=20, rank=2)
+    assert max(result.ranks + (1,)) <= 2
+
+
+def test_from_array_streamed_memory(rgen, tmpdir):
+    tracemalloc = pt.importorskip('tracemalloc')
+    mps = factory.random_mpa(14, 2, 3, randstate=rgen)
+    stored = np.lib.format.open_memmap(str(tmpdir / 'array.npy'), mode='w+',
+                                       dtype=mps.dtype, shape=(2,) * 14)
+    stored[...] = mps.to_array()
+    tracemalloc.start()
+    try:
+        result = mp.MPArray.from_array_streamed(stored, 1, blocksize=64)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Neither the array nor the remainders are loaded into memory
+    assert peak < stored.nbytes / 2
+    assert_almost_equal(mp.normdist(result, mps) / mp.norm(mps), 0)
+
+
 def test_from_inhomogenous(rgen):
     array = rgen.randn(4, 3, 3, 3)
     mpa = mp.MPArray.from_array(array, ndims=(2, 1, 1))
@@ -130,6 +189,59 @@ def test_transpose_axes(rgen):
     assert_correct_normalization(mpa_t)
 
 
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+@pt.mark.parametrize('chunksize', [None, 3])
+def test_get_many(nr_sites, local_dim, rank, chunksize, rgen, dtype):
+    mpa = factory.random_mpa(nr_sites, local_dim, rank, randstate=rgen,
+                             dtype=dtype)
+    indices = rgen.randint(local_dim, size=(10, nr_sites))
+    values = mpa.get_many(indices, chunksize=chunksize)
+    assert values.dtype == dtype
+    assert_array_almost_equal(values, mpa.to_array()[tuple(indices.T)])
+    assert_almost_equal(values[0], mpa.get(indices[0]).to_array())
+
+    values = mpa.get_many(np.zeros((0, nr_sites), dtype=int),
+                          chunksize=chunksize)
+    assert values.shape == (0,) and values.dtype == dtype
+    with pt.raises(ValueError):
+        mpa.get_many(indices, chunksize=0)
+
+
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_contract_chain_orders(nr_sites, local_dim, rank, rgen):
+    mpo = factory.random_mpa(nr_sites, (local_dim, local_dim), rank,
+                             randstate=rgen, dtype=np.complex_)
+    array = mpo.to_array()
+    costs = utils.contraction_costs([local_dim**2] * nr_sites, mpo.ranks)
+    assert set(costs) == set(range(nr_sites + 1)) | {'tree'}
+    for order in costs:
+        result = mp._contract_chain(list(mpo.lt), order)
+        assert_array_almost_equal(result[0, ..., 0], array)
+
+
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+@pt.mark.parametrize('chunk_sites', [None, 0, 1])
+def test_to_array_chunked(nr_sites, local_dim, rank, chunk_sites, rgen,
+                          tmpdir):
+    mpo = factory.random_mpa(nr_sites, (local_dim, local_dim), rank,
+                             randstate=rgen, dtype=np.complex_)
+    array = mpo.to_array()
+    assert_array_almost_equal(mpo.to_array(chunk_sites=chunk_sites or 0),
+                              array)
+
+    out = np.memmap(str(tmpdir / 'out.npy'), dtype=mpo.dtype, mode='w+',
+                    shape=array.shape)
+    result = mpo.to_array(out=out, chunk_sites=chunk_sites)
+    assert result is out
+    assert_array_almost_equal(out, array)
+
+    out = np.zeros_like(array)
+    result = mpo.to_array_global(out=out, chunk_sites=chunk_sites)
+    assert result is out
+    assert_array_almost_equal(out, mpo.to_array_global())
+
+
 @pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
 def test_dump_and_load(tmpdir, dtype):
     mpa = factory.random_mpa(5, [(4,), (2, 3), (1,), (4,), (4, 3)],
@@ -148,6 +260,67 @@ def test_dump_and_load(tmpdir, dtype):
     assert_mpa_identical(mpa, mpa_loaded)
 
 
+@pt.mark.parametrize('compression', [None, 'gzip', 'lzf'])
+def test_dump_and_load_lazy(tmpdir, compression):
+    mpa = factory.random_mpa(6, [(4,), (2, 3), (1,), (4,), (4, 3), (2,)],
+                             (4, 7, 1, 3, 2), dtype=np.complex_)
+    mpa.canonicalize(left=2, right=4)
+    path = str(tmpdir / 'dump_load_lazy_test.h5')
+    mpa.dump(path, compression=compression, chunks=True)
+
+    mpa_loaded = mp.MPArray.load(path, lazy=True)
+
+    def is_read():
+        return [isinstance(lten, np.ndarray)
+                for lten in mpa_loaded._lt._ltens]
+
+    assert not any(is_read())
+    assert mpa_loaded.shape == mpa.shape
+    assert mpa_loaded.ranks == mpa.ranks
+    assert not any(is_read())
+    assert_array_equal(mpa_loaded.lt[1], mpa.lt[1])
+    assert is_read() == [False, True, False, False, False, False]
+    assert_mpa_identical(mpa, mpa_loaded)
+
+    for sites, cform in [(slice(1, 5), (1, 3)), (slice(3, None), (0, 1)),
+                         (slice(None, 2), (1, 2))]:
+        for lazy in (False, True):
+            window = mp.MPArray.load(path, lazy=lazy, sites=sites)
+            assert window.canonical_form == cform
+            for lten, want in zip(window.lt, mpa.lt[sites]):
+                assert_array_equal(lten, want)
+
+
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+def test_dump_and_load_mmap(tmpdir, dtype):
+    mpa = factory.random_mpa(6, [(4,), (2, 3), (1,), (4,), (4, 3), (2,)],
+                             (4, 7, 1, 3, 2), dtype=dtype)
+    mpa.canonicalize(left=2, right=4)
+    path = str(tmpdir / 'dump_load_mmap_test.mpnum')
+    mpa.dump_mmap(path)
+
+    mpa_loaded = mp.MPArray.load_mmap(path)
+    assert_mpa_identical(mpa, mpa_loaded)
+    assert mpa_loaded.dtype == dtype
+    for lten in mpa_loaded.lt:
+        assert isinstance(lten.base, np.memmap) or \
+            isinstance(lten.base.base, np.memmap)
+        assert lten.ctypes.data % 64 == 0
+        with pt.raises(ValueError):
+            lten[...] = 0
+
+    mpa_loaded.canonicalize()
+    assert_array_equal(mp.MPArray.load_mmap(path).lt[0], mpa.lt[0])
+    window = mp.MPArray.load_mmap(path, sites=slice(1, 5))
+    assert window.canonical_form == (1, 3)
+    for lten, want in zip(window.lt, mpa.lt[1:5]):
+        assert_array_equal(lten, want)
+
+    mpa.dump(str(tmpdir / 'dump_load_mmap_test.h5'))
+    with pt.raises(ValueError):
+        mp.MPArray.load_mmap(str(tmpdir / 'dump_load_mmap_test.h5'))
+
+
 ###############################################################################
 #                            Algebraic operations                             #
 ###############################################################################
@@ -267,6 +440,57 @@ def test_dot_multiaxes(rgen):
     assert_array_almost_equal(mpa_prod, vec_prod)
 
 
+@pt.mark.parametrize('method', ['zipup', 'densitymatrix', 'var'])
+@pt.mark.parametrize('ndims', [1, 2])
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_dot_compressed(nr_sites, local_dim, rank, ndims, method, rgen):
+    mpo = factory.random_mpa(nr_sites, (local_dim, local_dim), rank,
+                             randstate=rgen, dtype=np.complex_)
+    mpa = factory.random_mpa(nr_sites, (local_dim,) * ndims, rank,
+                             randstate=rgen, dtype=np.complex_)
+    exact = mp.dot(mpo, mpa)
+
+    # Without truncation, the product is exact
+    res = mp.dot_compressed(mpo, mpa, method=method)
+    assert_array_almost_equal(res.to_array(), exact.to_array())
+    assert res.ndims == exact.ndims
+
+    if nr_sites < 2:
+        return
+    res = mp.dot_compressed(mpo, mpa, rank=rank, method=method)
+    assert max(res.ranks) <= rank
+    svd, _ = exact.compression('svd', rank=rank)
+    if method == 'zipup' and max(mpa.ranks) > 1:
+        # For a product of unitaries, the truncation basis is orthonormal
+        # and zip-up is as accurate as SVD compression
+        unitaries = mp.chain(mp.MPArray.from_array(
+            factory._unitary_haar(local_dim, rgen), ndims=2)
+            for _ in range(nr_sites))
+        exact = mp.dot(unitaries, mpa)
+        trunc_rank = max(mpa.ranks) - 1
+        res = mp.dot_compressed(unitaries, mpa, rank=trunc_rank,
+                                method=method)
+        svd, _ = exact.compression('svd', rank=trunc_rank)
+        assert max(res.ranks) <= trunc_rank
+        assert mp.normdist(svd, exact) > 1e-2
+        assert_almost_equal(mp.normdist(res, exact), mp.normdist(svd, exact))
+    elif method == 'densitymatrix':
+        # The density matrix algorithm is as accurate as SVD compression
+        assert_almost_equal(mp.normdist(res, exact), mp.normdist(svd, exact))
+    elif method == 'var':
+        assert mp.normdist(res, exact) <= 1.01 * mp.normdist(svd, exact) + 1e-8
+        # Fitting to the exact product from a random start
+        start = factory.random_mpa(nr_sites, exact.shape, rank,
+                                   randstate=rgen, dtype=np.complex_)
+        res = mp.dot_compressed(mpo, mpa, rank=rank, method='var',
+                                num_sweeps=2, startmpa=start)
+        assert max(res.ranks) <= rank
+        assert mp.normdist(res, exact) <= 1.01 * mp.normdist(svd, exact) + 1e-8
+
+    with pt.raises(ValueError):
+        mp.dot_compressed(mpo, mpa, method='foo')
+
+
 @pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
 @pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
 def test_partialdot(nr_sites, local_dim, rank, rgen, dtype):
@@ -393,6 +617,23 @@ def test_inner_mat(nr_sites, local_dim, rank, rgen, dtype):
     assert inner_mp.dtype == dtype
 
 
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+@pt.mark.parametrize('chunksize', [None, 2])
+def test_gram(nr_sites, local_dim, rank, chunksize, rgen, dtype):
+    mpas = [factory.random_mpa(nr_sites, (local_dim, local_dim), r,
+                               randstate=rgen, dtype=dtype)
+            for r in (rank, 1, rank, 2, rank)]
+    gram_mp = mp.gram(mpas, chunksize=chunksize)
+    gram_np = np.array([[mp.inner(a, b) for b in mpas] for a in mpas])
+    assert_array_almost_equal(gram_mp, gram_np)
+    assert gram_mp.dtype == dtype
+
+    assert mp.gram([], chunksize=chunksize).shape == (0, 0)
+    with pt.raises(ValueError):
+        mp.gram(mpas, chunksize=0)
+
+
 @pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
 @pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
 def test_sandwich(nr_sites, local_dim, rank, rgen, dtype):
@@ -421,6 +662,34 @@ def test_sandwich(nr_sites, local_dim, rank, rgen, dtype):
     assert_almost_equal(res_sandwich, res_arr)
 
 
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_environments(nr_sites, local_dim, rank, rgen, dtype):
+    mps = factory.random_mpa(nr_sites, local_dim, rank,
+                             randstate=rgen, dtype=dtype, normalized=True)
+    mps2 = factory.random_mpa(nr_sites, local_dim, rank,
+                              randstate=rgen, dtype=dtype, normalized=True)
+    mpo = factory.random_mpa(nr_sites, [local_dim] * 2, rank,
+                             randstate=rgen, dtype=dtype, normalized=True)
+
+    envs = mp.Environments(mps, None, mps2)
+    for pos in range(nr_sites + 1):
+        assert_almost_equal(envs.contract(pos), mp.inner(mps2, mps))
+    envs = mp.Environments(mps, mpo, mps2)
+    for pos in range(nr_sites + 1):
+        assert_almost_equal(envs.contract(pos), mp.sandwich(mpo, mps, mps2))
+
+    # Changing a site only invalidates environments which depend on it
+    site = nr_sites // 2
+    lvecs = [envs.left(pos) for pos in range(nr_sites + 1)]
+    rvecs = [envs.right(pos) for pos in range(nr_sites + 1)]
+    mps.lt[site] = 2 * mps.lt[site]
+    for pos in range(nr_sites + 1):
+        assert (envs.left(pos) is lvecs[pos]) == (pos <= site)
+        assert (envs.right(pos) is rvecs[pos]) == (pos > site)
+    assert_almost_equal(envs.contract(), mp.sandwich(mpo, mps, mps2))
+
+
 @pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
 @pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
 def test_norm(nr_sites, local_dim, rank, dtype, rgen):
@@ -432,6 +701,32 @@ def test_norm(nr_sites, local_dim, rank, dtype, rgen):
     assert_almost_equal(np.sum(psi.conj() * psi), mp.norm(mp_psi)**2)
 
 
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_norm_no_side_effects(nr_sites, local_dim, rank, rgen):
+    mpo = factory.random_mpa(nr_sites, (local_dim, local_dim), rank,
+                             randstate=rgen, dtype=np.complex_)
+    versions, cform = mpo.lt.versions, mpo.canonical_form
+    value = mp.norm(mpo)
+    assert_almost_equal(value, np.linalg.norm(mpo.to_array()))
+    assert mpo.lt.versions == versions
+    assert mpo.canonical_form == cform
+    assert mp.norm(mpo) is value
+
+    # The cached value is not used after changes
+    mpo.lt[0] = 2 * mpo.lt[0]
+    assert_almost_equal(mp.norm(mpo), 2 * value)
+    mpo.canonicalize()
+    assert_almost_equal(mp.norm(mpo), 2 * value)
+
+    mpo2 = factory.random_mpa(nr_sites, (local_dim, local_dim), rank,
+                              randstate=rgen, dtype=np.complex_)
+    versions2 = mpo2.lt.versions
+    assert_almost_equal(mp.normdist(mpo, mpo2),
+                        np.linalg.norm(mpo.to_array() - mpo2.to_array()))
+    assert mpo2.lt.versions == versions2
+    assert_almost_equal(mp.normdist(mpo, mpo), 0)
+
+
 @pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
 @pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
 def test_normdist(nr_sites, local_dim, rank, dtype, rgen):
@@ -1340,6 +1635,47 @@ def test_compression_result_properties(nr_sites, local_dims, rank,
         assert_array_almost_equal(alt_compr, compr)
 
 
+@pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
+@pt.mark.parametrize('direction', ['left', 'right'])
+@pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
+def test_compress_svd_truncerr(nr_sites, local_dim, rank, direction, dtype,
+                               rgen):
+    mpa = 4.2 * factory.random_mpa(nr_sites, local_dim, rank * 2,
+                                   normalized=True, dtype=dtype,
+                                   randstate=rgen)
+    psi = mpa.to_array()
+    compr, overlap, truncerrs = mpa.compression(
+        'svd', rank=rank, direction=direction, return_truncerr=True)
+    assert truncerrs.shape == (nr_sites - 1,)
+    assert (truncerrs >= 0).all()
+    diff = np.linalg.norm(psi - compr.to_array())**2
+    assert_almost_equal(truncerrs.sum() / 4.2**2, diff / 4.2**2)
+
+    overlap2, truncerrs2 = mpa.compress(
+        'svd', rank=rank, direction=direction, return_truncerr=True)
+    assert_almost_equal(overlap, overlap2)
+    assert_array_almost_equal(truncerrs, truncerrs2)
+
+    if nr_sites > 1:
+        # The discarded weight on each bond is the sum of the squares of
+        # the discarded singular values
+        compr, _, truncerrs = mp.MPArray.from_array(psi, 1).compression(
+            'svd', rank=1, direction=direction, return_truncerr=True)
+        n_left = 1 if direction == 'right' else nr_sites - 1
+        sv = np.linalg.svd(psi.reshape((local_dim**n_left, -1)),
+                           compute_uv=False)
+        assert_almost_equal(truncerrs[n_left - 1], np.sum(sv[1:]**2))
+
+    # Variational compression does not truncate singular values
+    with pt.raises(ValueError) as exc:
+        mpa.compression('var', rank=rank, num_sweeps=1,
+                        return_truncerr=True)
+    assert 'return_truncerr' in str(exc.value)
+    with pt.raises(ValueError):
+        mpa.copy().compress('var', rank=rank, num_sweeps=1,
+                            return_truncerr=True)
+
+
 @pt.mark.parametrize('dtype', pt.MP_TEST_DTYPES)
 @pt.mark.parametrize('nr_sites, local_dim, rank', pt.MP_TEST_PARAMETERS)
 def test_var_no_worse_than_svd(nr_sites, local_dim, rank, rgen, dtype):
@@ -1359,6 +1695,70 @@ def test_var_no_worse_than_svd(nr_sites, local_dim, rank, rgen, dtype):
     assert overlap_var > overlap_svd * (1 - 1e-14)
 
 
+@pt.mark.parametrize('var_sites', [1, 2])
+def test_var_tol_and_history(var_sites, rgen):
+    nr_sites, local_dim, rank = 6, 2, 3
+    mpa = factory.random_mpa(nr_sites, local_dim, 4 * rank, normalized=True,
+                             randstate=rgen, dtype=np.complex_)
+    startmpa = factory.random_mpa(nr_sites, local_dim, rank, randstate=rgen,
+                                  dtype=np.complex_)
+    compr, overlap, history = mpa.compression(
+        method='var', startmpa=startmpa, var_sites=var_sites, tol=1e-8,
+        max_sweeps=50, return_history=True)
+    assert 1 < len(history) < 50
+    assert all(set(h) == {'overlap', 'time'} for h in history)
+    assert_almost_equal(history[-1]['overlap'], overlap)
+    assert_almost_equal(overlap, mp.inner(mpa, compr))
+    last = [h['overlap'] for h in history[-2:]]
+    assert abs(last[1] - last[0]) <= 1e-8 * last[1]
+
+    # Without `tol`, we do all sweeps
+    overlap, history = mpa.copy().compress(
+        method='var', startmpa=startmpa, var_sites=var_sites, num_sweeps=3,
+        return_history=True)
+    assert len(history) == 3
+    assert_almost_equal(history[-1]['overlap'], overlap)
+
+    with pt.raises(ValueError):
+        mpa.compression(method='var', startmpa=startmpa)
+    with pt.raises(ValueError):
+        mpa.compression(method='var', startmpa=startmpa, num_sweeps=3,
+                        max_sweeps=50)
+
+
+@pt.mark.parametrize('var_sites', [1, 2])
+@pt.mark.parametrize('local_dims', [2, (2, 3)])
+def test_compress_sum(local_dims, var_sites, rgen):
+    nr_sites, rank = 5, 2
+    mpas = [factory.random_mpa(nr_sites, local_dims, rank, randstate=rgen,
+                               dtype=np.complex_, normalized=True)
+            for _ in range(4)]
+    weights = rgen.randn(4) + 1j * rgen.randn(4)
+    startmpa = factory.random_mpa(nr_sites, local_dims, 3, randstate=rgen,
+                                  dtype=np.complex_)
+    compr, overlap = mp.compress_sum(mpas, weights, num_sweeps=2,
+                                     startmpa=startmpa, var_sites=var_sites)
+    expected, overlap_exp = mp.sumup(mpas, weights).compression(
+        method='var', num_sweeps=2, startmpa=startmpa, var_sites=var_sites)
+    assert compr.shape == expected.shape
+    assert_almost_equal(overlap, overlap_exp)
+    assert_array_almost_equal(compr.to_array(), expected.to_array())
+
+    _, overlap, history = mp.compress_sum(
+        mpas, weights, max_sweeps=20, tol=1e-8, startmpa=startmpa,
+        var_sites=var_sites, return_history=True)
+    assert 1 < len(history) < 20
+    assert_almost_equal(history[-1]['overlap'], overlap)
+    with pt.raises(ValueError):
+        mp.compress_sum(mpas, weights, num_sweeps=2, max_sweeps=20,
+                        startmpa=startmpa)
+
+    # Large rank: The sum itself
+    compr, _ = mp.compress_sum(mpas, weights, num_sweeps=1, rank=100)
+    assert_array_almost_equal(compr.to_array(),
+                              mp.sumup(mpas, weights).to_array())
+
+
 @compr_test_params
 def test_compression_rank_noincrease(nr_sites, local_dims, rank,
                                      canonicalize, comparg, rgen):
@@ -240,3 +240,20 @@ def test_mps_to_mpo(nr_sites, local_dim, rank, rgen):
     state.shape = (local_dim,) * (2 * nr_sites)
     state2 = mpo.to_array_global()
     assert_array_almost_equal(state, state2)
+
+
+@pt.mark.parametrize('nr_sites, local_dim, rank', [(1, 3, 1), (3, 2, 3),
+                                                   (4, 3, 2)])
+def test_sample_mps(nr_sites, local_dim, rank, rgen):
+    mps = factory.random_mpa(nr_sites, local_dim, rank, randstate=rgen,
+                             dtype=np.complex_)
+    probab = abs(mps.to_array())**2
+    probab /= probab.sum()
+
+    n_samples = 100000
+    samples = mm.sample_mps(mps, n_samples, rgen)
+    assert samples.shape == (n_samples, nr_sites)
+    counts = np.zeros(probab.shape)
+    np.add.at(counts, tuple(samples.T), 1)
+    # Standard deviation of the relative frequencies is below 0.002
+    assert abs(counts / n_samples - probab).max() < 0.01
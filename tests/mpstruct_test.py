@@ -111,3 +111,21 @@ def test_getitem():
             pass
         else:
             raise AssertionError("Getitem slice over ltens should be read only")
+
+
+def test_versions():
+    mpa = factory.random_mpa(4, 2, 2)
+    versions = mpa.lt.versions
+    assert len(set(versions)) == 4
+    assert mpa.copy().lt.versions == versions
+
+    mpa.lt[2] = 2 * mpa.lt[2]
+    assert mpa.lt.versions[:2] == versions[:2]
+    assert mpa.lt.versions[3] == versions[3]
+    assert mpa.lt.versions[2] not in versions
+
+    versions = mpa.lt.versions
+    mpa.canonicalize(left=2)
+    assert mpa.lt.versions[3] == versions[3]
+    assert all(v1 != v2 for v1, v2 in zip(mpa.lt.versions[:3], versions))
+    assert tuple(mpa.lt.version(i) for i in range(4)) == mpa.lt.versions